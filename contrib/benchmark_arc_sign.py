@@ -0,0 +1,139 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Measure the throughput of ARC signed individual delivery.
+
+This delivers a post to many recipients of a mailing list, the way the
+outgoing runner does with individual delivery, in a throwaway testing
+database, but without sending the messages.  Each recipient's message is
+crafted and ARC signed, with the signature cache turned off, the way they
+were before the cache, with the cache, and with signing offloaded to a pool
+of processes.
+
+This is done for a list whose messages are personalized, with the
+recipients in the signed To header, and for a list whose messages only
+differ in their envelope, e.g. for VERP, which can share their signatures.
+
+Run it from a source checkout with:
+
+    python contrib/benchmark_arc_sign.py [--recipients N] [--processes N]
+
+A 2048-bit signing key is made with openssl, unless one is given.
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import subprocess
+
+from mailman.app.lifecycle import create_list
+from mailman.config import config
+from mailman.handlers.arc_sign import signatures
+from mailman.interfaces.mailinglist import Personalization
+from mailman.mta.deliver import Deliver
+from mailman.testing.helpers import (
+    configuration,
+    specialized_message_from_string as mfs,
+)
+from mailman.testing.layers import ConfigLayer
+
+
+POST = """\
+Authentication-Results: lists.example.com; arc=none; spf=pass
+ smtp.mfrom=aperson@example.com; dkim=pass header.i=@example.com;
+ dmarc=pass
+From: Anne Person <aperson@example.com>
+To: ant@example.com
+Subject: A post
+Message-ID: <ant>
+Date: Thu, 14 Jan 2021 15:00:01 -0800
+
+A typical post.
+"""
+
+
+class NotSending(Deliver):
+    def _deliver_to_recipients(self, mlist, msg, msgdata, recipients,
+                               content=None):
+        if content is None:
+            # Flatten the message, as it would be sent.
+            msg.as_bytes()
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '-r', '--recipients', type=int, default=10000,
+        help='How many recipients to deliver the post to.')
+    parser.add_argument(
+        '-p', '--processes', type=int, default=os.cpu_count(),
+        help='How many signing processes to use.')
+    parser.add_argument(
+        '-k', '--privkey',
+        help='The signing key, in PEM format.')
+    args = parser.parse_args()
+    recipients = ['member{}@example.org'.format(i)
+                  for i in range(args.recipients)]
+    with tempfile.TemporaryDirectory() as tempdir:
+        privkey = args.privkey
+        if privkey is None:
+            privkey = os.path.join(tempdir, 'privkey.pem')
+            subprocess.run(
+                ['openssl', 'genrsa', '-traditional', '-out', privkey,
+                 '2048'],
+                check=True, stderr=subprocess.DEVNULL)
+        ConfigLayer.setUp()
+        ConfigLayer.testSetUp()
+        try:
+            config.push('benchmark', """
+            [ARC]
+            enabled: yes
+            authserv_id: lists.example.com
+            selector: benchmark
+            domain: example.com
+            privkey: {}
+            """.format(privkey))
+            mlist = create_list('ant@example.com')
+            print('{:<14} {:<10} {:>10} {:>14}'.format(
+                'personalize', 'signing', 'time', 'messages/s'))
+            for personalize in (Personalization.full,
+                                Personalization.individual):
+                mlist.personalize = personalize
+                for signing, settings in (
+                        ('uncached', dict(sign_cache_size='0')),
+                        ('cached', {}),
+                        ('{} procs'.format(args.processes), dict(
+                            sign_processes=str(args.processes)))):
+                    signatures.clear()
+                    with configuration('ARC', **settings):
+                        msgdata = dict(recipients=recipients)
+                        start = time.perf_counter()
+                        NotSending().deliver(mlist, mfs(POST), msgdata)
+                        elapsed = time.perf_counter() - start
+                    print('{:<14} {:<10} {:>9.1f}s {:>14.0f}'.format(
+                        personalize.name, signing, elapsed,
+                        len(recipients) / elapsed))
+            config.pop('benchmark')
+        finally:
+            ConfigLayer.testTearDown()
+            ConfigLayer.tearDown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+"""Measure how long it takes to check whether an address is banned.
+
+This bans 10000 literal addresses and 1000 address patterns, split between a
+mailing list and the global bans, in a throwaway testing database.  It then
+reports the time per check for a literal ban, a pattern ban, and an address
+that isn't banned.  The checks are timed with the bans cached, with the
+cache cleared before every check, and by scanning the bans the way they were
+before they were cached.
+
+Run it from a source checkout with:
+
+    python contrib/benchmark_bans.py [--number N]
+"""
+
+import re
+import timeit
+import argparse
+
+from mailman.app.lifecycle import create_list
+from mailman.config import config
+from mailman.database import lookups
+from mailman.database.transaction import transaction
+from mailman.interfaces.bans import IBanManager
+from mailman.model.bans import Ban
+from mailman.testing.layers import ConfigLayer
+
+
+LITERALS = 10000
+PATTERNS = 1000
+EMAILS = (
+    # A literal list ban.
+    'person0@example.com',
+    # A literal global ban.
+    'person{}@example.com'.format(LITERALS - 1),
+    # A global pattern ban, which is one of the last ones tried.
+    'robot{}@spammer.example.org'.format(PATTERNS - 1),
+    # Nobody bans Anne.
+    'anne@example.com',
+    )
+
+
+def scan(store, list_id, email):
+    # Check for a ban the way BanManager.is_banned() used to.
+    for scope in (list_id, None):
+        if store.query(Ban).filter_by(email=email, list_id=scope).count():
+            return True
+    for scope in (list_id, None):
+        for ban in store.query(Ban).filter_by(list_id=scope):
+            if (ban.email.startswith('^') and
+                    re.match(ban.email, email, re.IGNORECASE) is not None):
+                return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '-n', '--number', type=int, default=100,
+        help='How many times to check each address.')
+    args = parser.parse_args()
+    ConfigLayer.setUp()
+    ConfigLayer.testSetUp()
+    try:
+        with transaction():
+            mlist = create_list('ant@example.com')
+            list_id = mlist.list_id
+            # Half of the bans are for the list, and half are global.
+            for i in range(LITERALS):
+                config.db.store.add(Ban(
+                    'person{}@example.com'.format(i),
+                    list_id if i < LITERALS // 2 else None))
+            for i in range(PATTERNS):
+                config.db.store.add(Ban(
+                    r'^robot{}@.*\.example\.org$'.format(i),
+                    list_id if i < PATTERNS // 2 else None))
+        manager = IBanManager(mlist)
+
+        def cold(email):
+            lookups.bans.clear()
+            return manager.is_banned(email)
+
+        print('{:<32} {:>10} {:>10} {:>10}'.format(
+            'Address', 'cached', 'cold', 'scanned'))
+        for email in EMAILS:
+            assert manager.is_banned(email) == scan(
+                config.db.store, list_id, email), email
+            times = [
+                timeit.timeit(lambda: check(email), number=args.number)
+                for check in (
+                    manager.is_banned,
+                    cold,
+                    lambda email: scan(config.db.store, list_id, email),
+                    )]
+            print('{:<32} {:>8.1f}us {:>8.1f}us {:>8.1f}us'.format(
+                email, *(time / args.number * 1e6 for time in times)))
+    finally:
+        ConfigLayer.testTearDown()
+        ConfigLayer.tearDown()
+
+
+if __name__ == '__main__':
+    main()
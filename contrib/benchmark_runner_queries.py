@@ -0,0 +1,117 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Count the SQL queries that runners issue per message.
+
+This posts messages from a member to a number of mailing lists, in a
+throwaway testing database, and runs them through the incoming and pipeline
+runners.  It reports the number of SQL statements and the time per message
+for each runner, with the mailing lists and domains loaded again for every
+message, and with them kept loaded across messages.
+
+Run it from a source checkout with:
+
+    python contrib/benchmark_runner_queries.py [--lists N] [--posts N]
+"""
+
+import time
+import argparse
+
+from mailman.app.lifecycle import create_list
+from mailman.config import config
+from mailman.database.transaction import transaction
+from mailman.runners.incoming import IncomingRunner
+from mailman.runners.pipeline import PipelineRunner
+from mailman.testing.helpers import (
+    configuration,
+    make_testable_runner,
+    specialized_message_from_string as mfs,
+    subscribe,
+)
+from mailman.testing.layers import ConfigLayer
+from sqlalchemy import event
+
+
+POST = """\
+From: Anne Person <aperson@example.com>
+To: {0}
+Subject: A post
+Message-ID: <{1}@example.com>
+
+A typical post.
+"""
+
+
+def run(runner_class, name, statements):
+    runner = make_testable_runner(runner_class, name)
+    del statements[:]
+    start = time.perf_counter()
+    runner.run()
+    return len(statements), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '-l', '--lists', type=int, default=20,
+        help='How many mailing lists to post to.')
+    parser.add_argument(
+        '-p', '--posts', type=int, default=500,
+        help='How many messages to post.')
+    args = parser.parse_args()
+    ConfigLayer.setUp()
+    ConfigLayer.testSetUp()
+    statements = []
+
+    def count(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(config.db.engine, 'before_cursor_execute', count)
+    try:
+        with transaction():
+            mlists = [create_list('list{}@example.com'.format(i))
+                      for i in range(args.lists)]
+            for mlist in mlists:
+                subscribe(mlist, 'Anne')
+        print('{:<10} {:<10} {:>14} {:>14}'.format(
+            'runner', 'lists', 'queries/msg', 'ms/msg'))
+        for keeping, life in (('reloaded', '0s'), ('kept', '1h')):
+            for i in range(args.posts):
+                mlist = mlists[i % len(mlists)]
+                config.switchboards['in'].enqueue(
+                    mfs(POST.format(mlist.posting_address, i)),
+                    listid=mlist.list_id)
+            for runner_class, name in ((IncomingRunner, 'in'),
+                                       (PipelineRunner, 'pipeline')):
+                with configuration('runner.' + name, keep_loaded_life=life):
+                    queries, elapsed = run(runner_class, name, statements)
+                print('{:<10} {:<10} {:>14.1f} {:>14.2f}'.format(
+                    name, keeping, queries / args.posts,
+                    elapsed / args.posts * 1000))
+            # Throw away the messages to be delivered.
+            switchboard = config.switchboards['out']
+            for filebase in switchboard.files:
+                switchboard.dequeue(filebase)
+                switchboard.finish(filebase)
+    finally:
+        event.remove(config.db.engine, 'before_cursor_execute', count)
+        ConfigLayer.testTearDown()
+        ConfigLayer.tearDown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+"""Measure how much of processing a post goes into finding its senders.
+
+This runs a post from a member through a mailing list's posting chain and
+posting pipeline, the way the incoming and pipeline runners do, in a
+throwaway testing database.  It reports how many times the message's senders
+were asked for and found, and the time per post, both with the senders
+cached on the message, and found afresh every time they're asked for, the
+way they were before they were cached.
+
+Run it from a source checkout with:
+
+    python contrib/benchmark_senders.py [--number N]
+"""
+
+import timeit
+import argparse
+
+from mailman.app.lifecycle import create_list
+from mailman.config import config
+from mailman.core.chains import process as process_chain
+from mailman.core.pipelines import process as process_pipeline
+from mailman.database.transaction import transaction
+from mailman.email.message import Message
+from mailman.testing.helpers import (
+    specialized_message_from_string as mfs,
+    subscribe,
+)
+from mailman.testing.layers import ConfigLayer
+
+
+POST = """\
+From: Anne Person <aperson@example.com>
+Reply-To: Anne Person <aperson@example.com>
+Sender: =?utf-8?q?Anne_Pers=C3=B6n?= <aperson@example.com>
+To: ant@example.com
+Subject: A post
+Message-ID: <ant>
+
+A typical post.
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '-n', '--number', type=int, default=200,
+        help='How many posts to process.')
+    args = parser.parse_args()
+    ConfigLayer.setUp()
+    ConfigLayer.testSetUp()
+    counts = dict(asked=0, found=0)
+    find_senders = Message._find_senders
+    get_senders = Message._get_senders
+
+    def counting_find(msg, sender_headers):
+        counts['found'] += 1
+        return find_senders(msg, sender_headers)
+
+    def counting_get(msg):
+        counts['asked'] += 1
+        return get_senders(msg)
+
+    def uncached_get(msg):
+        msg.__dict__.pop('_senders', None)
+        return counting_get(msg)
+
+    try:
+        with transaction():
+            mlist = create_list('ant@example.com')
+            subscribe(mlist, 'Anne')
+
+        def post():
+            msg = mfs(POST)
+            msgdata = dict(original_size=len(POST))
+            process_chain(mlist, msg, msgdata, mlist.posting_chain)
+            process_pipeline(mlist, msg, msgdata, mlist.posting_pipeline)
+            # Throw away the queued messages.
+            for switchboard in config.switchboards.values():
+                for filebase in switchboard.files:
+                    switchboard.dequeue(filebase)
+                    switchboard.finish(filebase)
+            config.db.abort()
+
+        Message._find_senders = counting_find
+        print('{:<10} {:>8} {:>8} {:>10}'.format(
+            '', 'asked', 'found', 'per post'))
+        for name, get in (('cached', counting_get),
+                          ('uncached', uncached_get)):
+            Message._get_senders = get
+            counts.update(asked=0, found=0)
+            post()
+            asked, found = counts['asked'], counts['found']
+            time = timeit.timeit(post, number=args.number)
+            print('{:<10} {:>8} {:>8} {:>8.1f}ms'.format(
+                name, asked, found, time / args.number * 1e3))
+    finally:
+        Message._find_senders = find_senders
+        Message._get_senders = get_senders
+        ConfigLayer.testTearDown()
+        ConfigLayer.tearDown()
+
+
+if __name__ == '__main__':
+    main()
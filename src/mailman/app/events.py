@@ -19,9 +19,12 @@
 
 from mailman.app import domain, membership, moderator, subscriptions
 from mailman.core import i18n, switchboard
+from mailman.database import lookups
+from mailman.handlers import arc_sign
 from mailman.languages import manager as language_manager
+from mailman.model import template
 from mailman.styles import manager as style_manager
-from mailman.utilities import passwords
+from mailman.utilities import passwords, resolver
 from public import public
 from zope import event
 
@@ -30,16 +33,23 @@ from zope import event
 def initialize():
     """Initialize global event subscribers."""
     event.subscribers.extend([
+        arc_sign.handle_ConfigurationUpdatedEvent,
         domain.handle_DomainDeletingEvent,
         i18n.handle_ConfigurationUpdatedEvent,
         language_manager.handle_ConfigurationUpdatedEvent,
+        lookups.handle_ConfigurationUpdatedEvent,
+        lookups.handle_DomainDeletedEvent,
+        lookups.handle_ListDeletedEvent,
+        lookups.handle_MembershipChangeEvent,
         membership.handle_SubscriptionEvent,
         moderator.handle_ListDeletingEvent,
         passwords.handle_ConfigurationUpdatedEvent,
+        resolver.handle_ConfigurationUpdatedEvent,
         style_manager.handle_ConfigurationUpdatedEvent,
         subscriptions.handle_ListDeletingEvent,
         subscriptions.handle_SubscriptionConfirmationNeededEvent,
         subscriptions.handle_SubscriptionInvitationNeededEvent,
         subscriptions.handle_UnsubscriptionConfirmationNeededEvent,
         switchboard.handle_ConfigurationUpdatedEvent,
+        template.handle_ConfigurationUpdatedEvent,
         ])
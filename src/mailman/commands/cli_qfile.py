@@ -20,6 +20,7 @@
 import click
 import pickle
 
+from mailman.core.envelope import is_envelope, load
 from mailman.core.i18n import _
 from mailman.interfaces.command import ICLISubCommand
 from mailman.utilities.interact import interact
@@ -58,11 +59,14 @@ def qfile(doprint, interactive, qfile):
     m = []
     printer = PrettyPrinter(indent=4)
     with open(qfile, 'rb') as fp:
-        while True:
-            try:
-                m.append(pickle.load(fp))
-            except EOFError:
-                break
+        if is_envelope(fp):
+            m.extend(load(fp))
+        else:
+            while True:
+                try:
+                    m.append(pickle.load(fp))
+                except EOFError:
+                    break
     if doprint:
         print(_('[----- start pickle -----]'))
         for i, obj in enumerate(m):
@@ -22,6 +22,8 @@ import unittest
 from click.testing import CliRunner
 from contextlib import ExitStack
 from mailman.commands.cli_qfile import qfile
+from mailman.core import envelope
+from mailman.testing.helpers import specialized_message_from_string as mfs
 from mailman.testing.layers import ConfigLayer
 from pickle import dump
 from tempfile import NamedTemporaryFile
@@ -57,3 +59,28 @@ a simple string
             self._command.invoke(qfile, (tmp_qfile.name, '-i'))
             mock.assert_called_once_with(
                 banner="Number of objects found (see the variable 'm'): 1")
+
+    def test_print_envelope(self):
+        msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+        with NamedTemporaryFile() as tmp_qfile:
+            with open(tmp_qfile.name, 'wb') as fp:
+                envelope.dump(
+                    fp, msg, envelope.message_bytes(msg), dict(foo='yes'))
+            results = self._command.invoke(qfile, (tmp_qfile.name,))
+            self.assertEqual(results.output, """\
+[----- start pickle -----]
+<----- start object 1 ----->
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+
+<----- start object 2 ----->
+{'foo': 'yes'}
+[----- end pickle -----]
+""", results.output)
@@ -0,0 +1,173 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""The envelope queue file format.
+
+The original queue file format is two consecutive pickles, the message object
+followed by the metadata dictionary, so even reading the metadata means
+unpickling the whole message object graph.  An envelope instead stores the
+message as its raw RFC 5322 bytes:
+
+    header | message bytes | attributes pickle | metadata pickle
+
+The fixed size header holds a magic number, the format version and the length
+of the message bytes, so the metadata can be read without touching the
+message.  The attributes pickle holds the extra attributes that Mailman sets
+on message objects, e.g. `original_size`, except for those that the message
+leaves out when it's pickled.  Keeping the metadata last means
+that it can be rewritten in place, exactly as with the original format.
+
+Messages read from an envelope are only parsed when they are first used, and
+a message that is enqueued again without ever being parsed is written back
+out byte for byte.
+"""
+
+import mmap
+import pickle
+import struct
+import email.message
+
+from email.generator import BytesGenerator
+from email.policy import compat32
+from io import BytesIO
+from mailman.email.message import LazyMessage, Message
+from public import public
+
+
+HEADER = struct.Struct('!4sBI')
+MAGIC = b'MMQE'
+VERSION = 1
+
+# Parsing a message recreates these attributes.
+_PARSED_ATTRIBUTES = frozenset(vars(email.message.Message())) - {'_unixfrom'}
+# Don't fold long headers, so that they read back exactly as they were set.
+_POLICY = compat32.clone(max_line_length=0)
+
+
+@public
+def is_envelope(fp):
+    """Return whether a queue file is in the envelope format.
+
+    :param fp: The queue file, open for binary reading and positioned at its
+        start, where it is left.
+    :return: True for an envelope, and False for two pickles.
+    """
+    magic = fp.read(len(MAGIC))
+    fp.seek(-len(magic), 1)
+    return magic == MAGIC
+
+
+@public
+def message_bytes(msg):
+    """Return the raw bytes to store in an envelope for a message.
+
+    :param msg: The message.
+    :type msg: `email.message.Message`
+    :return: The message's bytes, or None if the message can't be faithfully
+        stored in an envelope, in which case it must be pickled instead.
+    :rtype: bytes
+    """
+    if isinstance(msg, LazyMessage) and msg.unparsed is not None:
+        return msg.unparsed
+    if (not isinstance(msg, email.message.Message) or
+            msg.policy is not compat32):
+        return None
+    # Header objects and non-ASCII header values would be read back as their
+    # RFC 2047 encoded form.
+    for part in msg.walk():
+        for value in part.values():
+            if not isinstance(value, str) or not value.isascii():
+                return None
+    fp = BytesIO()
+    try:
+        BytesGenerator(fp, mangle_from_=False, policy=_POLICY).flatten(msg)
+    except (KeyError, LookupError, UnicodeError):
+        # The same problems that Message.as_bytes() has to work around.
+        return None
+    return fp.getvalue()
+
+
+@public
+def dump(fp, msg, raw, data, protocol=pickle.HIGHEST_PROTOCOL):
+    """Write a queue entry in the envelope format.
+
+    :param fp: The file to write to, open for binary writing.
+    :param msg: The message.
+    :type msg: `email.message.Message`
+    :param raw: The message's bytes, as returned by `message_bytes()`.
+    :type raw: bytes
+    :param data: The message metadata.
+    :type data: dict
+    """
+    # Store the same attributes that pickling the message would.
+    state = msg.__getstate__() if isinstance(msg, Message) else vars(msg)
+    attributes = {key: value for key, value in state.items()
+                  if key not in _PARSED_ATTRIBUTES and key != '_raw'}
+    fp.write(HEADER.pack(MAGIC, VERSION, len(raw)))
+    fp.write(raw)
+    pickle.dump(attributes, fp, protocol)
+    pickle.dump(data, fp, protocol)
+
+
+def _unpack(buf):
+    magic, version, length = HEADER.unpack_from(buf)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(
+            'Unsupported queue file version: {!r} {}'.format(magic, version))
+    return HEADER.size, HEADER.size + length
+
+
+@public
+def seek_metadata(fp):
+    """Position an envelope file at its attributes pickle.
+
+    This is where the original format's metadata pickle would start, if the
+    attributes are first read with `pickle.load()`.
+
+    :param fp: The queue file, open for binary reading and positioned at its
+        start.
+    """
+    start, end = _unpack(fp.read(HEADER.size))
+    fp.seek(end)
+
+
+@public
+def load(fp, metadata_only=False):
+    """Read a queue entry in the envelope format.
+
+    The file is memory mapped, so that reading only the metadata doesn't read
+    the message from disk.
+
+    :param fp: The queue file, open for binary reading.
+    :param metadata_only: If True, the message is not read and None is
+        returned in its place.
+    :type metadata_only: bool
+    :return: The message, which is only parsed when it is first used, and the
+        metadata.
+    :rtype: (`LazyMessage`, dict)
+    """
+    with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        start, end = _unpack(buf)
+        metadata = BytesIO(buf[end:])
+        attributes = pickle.load(metadata)
+        data = pickle.load(metadata)
+        if metadata_only:
+            return None, data
+        msg = LazyMessage(buf[start:end])
+    for key, value in attributes.items():
+        setattr(msg, key, value)
+    return msg, data
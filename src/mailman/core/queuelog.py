@@ -0,0 +1,518 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""A switchboard storing its queue in segmented, append-only log files.
+
+The default switchboard writes, fsyncs and renames one file per queue entry,
+and lists the whole queue directory on every pass.  This switchboard instead
+appends entries to a small number of segment files, so that a queue holding
+hundreds of thousands of messages is a handful of files on disk.
+
+Each segment is named by a zero padded sequence number and a random token,
+with a `.seg` extension.  A segment is a sequence of records, each of which
+is a fixed header followed by the entry's file base and its payload.  The
+payload is exactly what the default switchboard writes to a `.pck` file,
+namely the message pickle followed by the metadata pickle.  Writers always
+append to the newest segment while holding the queue's lock file, starting a
+new segment once the newest grows beyond the configured size.
+
+Consumers keep an in-memory index of the entries in their slice, refreshed
+incrementally by reading only the bytes appended since the last pass.  The
+progress of each entry is recorded in a per-segment, per-slice acknowledgment
+log, with one line when the entry is dequeued (the equivalent of the `.bak`
+rename) and one line when it is finished.  A segment whose entries have all
+been finished by every slice is deleted.
+
+Appends are made durable by a group commit: the segment is fsync'd once every
+`commit_batch` enqueues, or when `sync()` is called.  Runners call `sync()` on
+every switchboard before finishing the entry that caused the enqueues, so a
+message is never acknowledged in its source queue before its copy in the
+destination queue is on stable storage.
+"""
+
+import os
+import time
+import email
+import fcntl
+import heapq
+import atexit
+import pickle
+import struct
+import hashlib
+import logging
+import operator
+
+from io import BytesIO
+from lazr.config import as_timedelta
+from mailman.config import config
+from mailman.core.switchboard import MAX_BAK_COUNT, shamax
+from mailman.email.message import Message
+from mailman.interfaces.switchboard import ISwitchboard
+from mailman.utilities.filesystem import makedirs
+from public import public
+from zope.interface import implementer
+
+
+# Every record starts with a magic number, the length of the entry's file base
+# and the length of the payload.
+HEADER = struct.Struct('!4sHI')
+MAGIC = b'MMQ1'
+SEGMENT_EXT = '.seg'
+LOCK_FILE = 'queue.lck'
+SEGMENT_SIZE = 16777216
+COMMIT_BATCH = 64
+COMMIT_INTERVAL = 0.1
+
+elog = logging.getLogger('mailman.error')
+
+
+class _Entry:
+    """An entry in the consumer's index."""
+
+    __slots__ = ('filebase', 'when', 'segment', 'offset', 'length',
+                 'claims', 'claimed')
+
+    def __init__(self, filebase, segment, offset, length):
+        self.filebase = filebase
+        self.when = float(filebase.split('+', 1)[0])
+        self.segment = segment
+        self.offset = offset
+        self.length = length
+        # The number of times this entry has ever been dequeued, and whether
+        # it is currently dequeued but not yet finished.
+        self.claims = 0
+        self.claimed = False
+
+
+class _Segment:
+    """The consumer's read state for one segment."""
+
+    __slots__ = ('name', 'offset', 'ack_offset', 'entries')
+
+    def __init__(self, name):
+        self.name = name
+        # How far into the segment and its acknowledgment log we've read.
+        self.offset = 0
+        self.ack_offset = 0
+        # The file bases of the live entries in our slice.
+        self.entries = set()
+
+
+@public
+@implementer(ISwitchboard)
+class LogSwitchboard:
+    """See `ISwitchboard`."""
+
+    def __init__(self, name, queue_directory,
+                 slice=None, numslices=1, recover=False):
+        """Create a log switchboard object.
+
+        :param name: The queue name.
+        :type name: str
+        :param queue_directory: The queue directory.
+        :type queue_directory: str
+        :param slice: The slice number for this switchboard, or None.  If not
+            None, it must be [0..`numslices`).
+        :type slice: int or None
+        :param numslices: The total number of slices to split this queue
+            directory into.  It must be a power of 2.
+        :type numslices: int
+        :param recover: True if unfinished entries should be recovered.
+        :type recover: bool
+        """
+        assert (numslices & (numslices - 1)) == 0, (
+            'Not a power of 2: {}'.format(numslices))
+        self.name = name
+        self.queue_directory = queue_directory
+        if config.create_paths:
+            makedirs(self.queue_directory, 0o770)
+        self._lower = None
+        self._upper = None
+        if numslices != 1:
+            self._lower = ((shamax + 1) * slice) / numslices
+            self._upper = (((shamax + 1) * (slice + 1)) / numslices) - 1
+        # All consumers of an unsliced queue share one acknowledgment log.
+        self._slice = (slice if numslices > 1 else 0)
+        self._numslices = numslices
+        # Queues without a runner section, e.g. those created by tests, get
+        # the same defaults as [runner.master].
+        section = getattr(config, 'runner.' + name, None)
+        if section is None:
+            self._segment_size = SEGMENT_SIZE
+            self._commit_batch = COMMIT_BATCH
+            self._commit_interval = COMMIT_INTERVAL
+        else:
+            self._segment_size = int(section.segment_size)
+            self._commit_batch = max(int(section.commit_batch), 1)
+            self._commit_interval = as_timedelta(
+                section.commit_interval).total_seconds()
+        # Writer state.
+        self._lock_fd = None
+        self._write_name = None
+        self._write_fd = None
+        self._dirty = {}
+        self._unsynced = 0
+        self._first_unsynced = None
+        # Consumer state.
+        self._segments = {}
+        self._entries = {}
+        atexit.register(self.sync)
+        if recover:
+            self.recover_backup_files()
+
+    def _path(self, filename):
+        return os.path.join(self.queue_directory, filename)
+
+    def _ack_name(self, segment_name):
+        return '{}.ack.{}'.format(segment_name, self._slice)
+
+    def _lock(self):
+        if self._lock_fd is None:
+            self._lock_fd = os.open(
+                self._path(LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o660)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+
+    def _unlock(self):
+        fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _segment_names(self):
+        return sorted(filename for filename in os.listdir(self.queue_directory)
+                      if filename.endswith(SEGMENT_EXT))
+
+    def _writable_segment(self):
+        # This must be called with the lock held.  Writers only ever append to
+        # the newest segment, so older segments are immutable and can safely
+        # be deleted once all their entries are finished.
+        names = self._segment_names()
+        if len(names) > 0:
+            name = names[-1]
+            if os.stat(self._path(name)).st_size >= self._segment_size:
+                name = None
+        else:
+            name = None
+        if name is None:
+            # Segment names are never reused, even if the whole queue is
+            # wiped, so consumers can trust their read state for a name.
+            sequence = (int(names[-1][:10]) + 1 if len(names) > 0 else 1)
+            name = '{:010d}-{}{}'.format(
+                sequence, os.urandom(4).hex(), SEGMENT_EXT)
+        if (name != self._write_name or
+                os.fstat(self._write_fd).st_nlink == 0):
+            fd = self._write_fd
+            if fd is not None and fd not in self._dirty:
+                os.close(fd)
+            self._write_name = name
+            self._write_fd = os.open(
+                self._path(name),
+                os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o660)
+        return self._write_fd
+
+    def enqueue(self, _msg, _metadata=None, **_kws):
+        """See `ISwitchboard`."""
+        if _metadata is None:
+            _metadata = {}
+        data = _metadata.copy()
+        data.update(_kws)
+        list_id = data.get('listid', '--nolist--')
+        now = repr(time.time())
+        if data.get('_plaintext'):
+            protocol = 0
+            msgsave = pickle.dumps(str(_msg), protocol)
+        else:
+            protocol = pickle.HIGHEST_PROTOCOL
+            msgsave = pickle.dumps(_msg, protocol)
+        hashfood = msgsave + list_id.encode('utf-8') + now.encode('utf-8')
+        filebase = now + '+' + hashlib.sha1(hashfood).hexdigest()
+        data['version'] = config.QFILE_SCHEMA_VERSION
+        for k in list(data):
+            if k.startswith('_'):
+                del data[k]
+        data['_parsemsg'] = (protocol == 0)
+        payload = msgsave + pickle.dumps(data, protocol)
+        encoded = filebase.encode('ascii')
+        record = (HEADER.pack(MAGIC, len(encoded), len(payload)) +
+                  encoded + payload)
+        self._lock()
+        try:
+            fd = self._writable_segment()
+            # Readers treat a partial record at the end of a segment as not
+            # yet written, and the lock keeps other writers out until the
+            # whole record is there.
+            view = memoryview(record)
+            while len(view) > 0:
+                view = view[os.write(fd, view):]
+        finally:
+            self._unlock()
+        self._dirty[fd] = self._write_name
+        self._unsynced += 1
+        if self._first_unsynced is None:
+            self._first_unsynced = time.time()
+        if (self._unsynced >= self._commit_batch or
+                time.time() - self._first_unsynced >= self._commit_interval):
+            self.sync()
+        return filebase
+
+    def sync(self):
+        """See `ISwitchboard`."""
+        for fd in list(self._dirty):
+            os.fsync(fd)
+            if fd != self._write_fd:
+                os.close(fd)
+            del self._dirty[fd]
+        self._unsynced = 0
+        self._first_unsynced = None
+
+    def _in_slice(self, filebase):
+        if self._lower is None:
+            return True
+        digest = filebase.split('+', 1)[1]
+        return self._lower <= int(digest, 16) <= self._upper
+
+    def _read_records(self, segment, fp, truncate=False):
+        # Index the records appended since the last pass.  A partial record
+        # at the end of the segment is either still being written, or was
+        # torn by a crash.  In the latter case, and only while holding the
+        # lock, the torn tail is cut off so that appending can continue.
+        size = os.fstat(fp.fileno()).st_size
+        fp.seek(segment.offset)
+        while True:
+            header = fp.read(HEADER.size)
+            if len(header) < HEADER.size:
+                break
+            magic, base_length, length = HEADER.unpack(header)
+            if magic != MAGIC:
+                elog.error('Corrupt queue segment %s at offset %s',
+                           self._path(segment.name), segment.offset)
+                break
+            encoded = fp.read(base_length)
+            if len(encoded) < base_length:
+                break
+            offset = segment.offset + HEADER.size + base_length
+            if size < offset + length:
+                break
+            fp.seek(length, os.SEEK_CUR)
+            segment.offset = offset + length
+            filebase = encoded.decode('ascii')
+            if self._in_slice(filebase):
+                self._entries[filebase] = _Entry(
+                    filebase, segment.name, offset, length)
+                segment.entries.add(filebase)
+        if truncate and size > segment.offset:
+            elog.error('Truncating torn queue segment %s at offset %s',
+                       self._path(segment.name), segment.offset)
+            fp.truncate(segment.offset)
+
+    def _read_acks(self, segment):
+        try:
+            with open(self._path(self._ack_name(segment.name)), 'rb') as fp:
+                fp.seek(segment.ack_offset)
+                data = fp.read()
+        except FileNotFoundError:
+            return
+        # Ignore a trailing partial line; it will be read next time.
+        end = data.rfind(b'\n') + 1
+        segment.ack_offset += end
+        for line in data[:end].decode('ascii').splitlines():
+            action, filebase = line.split(' ', 1)
+            entry = self._entries.get(filebase)
+            if entry is None:
+                continue
+            if action == 'C':
+                entry.claims += 1
+                entry.claimed = True
+            else:
+                del self._entries[filebase]
+                segment.entries.discard(filebase)
+
+    def _refresh(self, truncate=False):
+        names = self._segment_names()
+        for name in set(self._segments) - set(names):
+            # The segment was removed out from under us.
+            for filebase in self._segments.pop(name).entries:
+                self._entries.pop(filebase, None)
+        for name in names:
+            try:
+                size = os.stat(self._path(name)).st_size
+            except FileNotFoundError:
+                continue
+            segment = self._segments.get(name)
+            if segment is None:
+                segment = self._segments[name] = _Segment(name)
+            if size > segment.offset:
+                with open(self._path(name), 'rb+' if truncate else 'rb') as fp:
+                    self._read_records(segment, fp, truncate)
+            self._read_acks(segment)
+        return names
+
+    def _acknowledge(self, entry, action):
+        # The acknowledgment log may be shared with other consumers of this
+        # slice, so our own line is applied to the index by reading the log
+        # back, along with anything the other consumers have written.
+        line = '{} {}\n'.format(action, entry.filebase).encode('ascii')
+        fd = os.open(self._path(self._ack_name(entry.segment)),
+                     os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o660)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        self._read_acks(self._segments[entry.segment])
+
+    def _read_payload(self, entry):
+        with open(self._path(entry.segment), 'rb') as fp:
+            fp.seek(entry.offset)
+            return fp.read(entry.length)
+
+    def _find(self, filebase):
+        entry = self._entries.get(filebase)
+        if entry is None:
+            self._refresh()
+            entry = self._entries.get(filebase)
+        return entry
+
+    def dequeue(self, filebase):
+        """See `ISwitchboard`."""
+        entry = self._find(filebase)
+        if entry is None:
+            raise FileNotFoundError(os.path.join(
+                self.queue_directory, filebase))
+        fp = BytesIO(self._read_payload(entry))
+        # Record the claim before handing out the message.  If this process
+        # crashes uncleanly, the claim is used to re-instate the entry in
+        # order to try again.
+        self._acknowledge(entry, 'C')
+        msg = pickle.load(fp)
+        data = pickle.load(fp)
+        if entry.claims > 1:
+            data['_bak_count'] = entry.claims - 1
+        if data.get('_parsemsg'):
+            original_size = len(msg)
+            msg = email.message_from_string(msg, Message)
+            msg.original_size = original_size
+            data['original_size'] = original_size
+        return msg, data
+
+    def finish(self, filebase, preserve=False):
+        """See `ISwitchboard`."""
+        try:
+            entry = self._find(filebase)
+            if entry is None:
+                raise FileNotFoundError(os.path.join(
+                    self.queue_directory, filebase))
+            if preserve:
+                bad_dir = config.switchboards['bad'].queue_directory
+                psvfile = os.path.join(bad_dir, filebase + '.psv')
+                tmpfile = psvfile + '.tmp'
+                with open(tmpfile, 'wb') as fp:
+                    fp.write(self._read_payload(entry))
+                    fp.flush()
+                    os.fsync(fp.fileno())
+                os.rename(tmpfile, psvfile)
+            self._acknowledge(entry, 'D')
+        except EnvironmentError:
+            elog.exception(
+                'Failed to finish/preserve queue entry: %s', filebase)
+            return
+        segment = self._segments.get(entry.segment)
+        if segment is not None and len(segment.entries) == 0:
+            self._compact()
+
+    def _compact(self):
+        # Delete all but the newest segment once every slice has finished
+        # with them.  Each slice leaves a marker file behind when it has
+        # finished all of its entries in a segment.
+        names = self._refresh()
+        for name in names[:-1]:
+            segment = self._segments.get(name)
+            if segment is None or len(segment.entries) > 0:
+                continue
+            try:
+                if os.stat(self._path(name)).st_size != segment.offset:
+                    # There is a torn record at the end of the segment.
+                    continue
+            except FileNotFoundError:
+                continue
+            marker = self._path('{}.done.{}'.format(name, self._slice))
+            if not os.path.exists(marker):
+                with open(marker, 'wb'):
+                    pass
+            prefix = name + '.done.'
+            done = [filename for filename in os.listdir(self.queue_directory)
+                    if filename.startswith(prefix)]
+            if len(done) < self._numslices:
+                continue
+            self._lock()
+            try:
+                for filename in os.listdir(self.queue_directory):
+                    if filename.startswith(name):
+                        os.remove(self._path(filename))
+            finally:
+                self._unlock()
+            del self._segments[name]
+
+    @property
+    def files(self):
+        """See `ISwitchboard`."""
+        return self.get_files()
+
+    def get_files(self, extension='.pck', count=None):
+        """See `ISwitchboard`.
+
+        For compatibility with the default switchboard, entries which have not
+        yet been dequeued are returned for the `.pck` extension, and entries
+        which have been dequeued but not yet finished are returned for the
+        `.bak` extension.
+        """
+        names = self._refresh()
+        if len(self._entries) == 0 and len(names) > 1:
+            # There may be segments that never had any entries in our slice.
+            self._compact()
+        if extension == '.pck':
+            entries = [entry for entry in self._entries.values()
+                       if not entry.claimed]
+        elif extension == '.bak':
+            entries = [entry for entry in self._entries.values()
+                       if entry.claimed]
+        else:
+            return []
+        # FIFO sort.
+        key = operator.attrgetter('when', 'filebase')
+        if count is None:
+            entries.sort(key=key)
+        else:
+            entries = heapq.nsmallest(count, entries, key=key)
+        return [entry.filebase for entry in entries]
+
+    def recover_backup_files(self):
+        """See `ISwitchboard`."""
+        # Any entry that was dequeued but never finished was being processed
+        # when its runner died.  Such entries are made available again, until
+        # they have been dequeued MAX_BAK_COUNT times, at which point they
+        # are preserved in the bad queue.  While we hold the lock no writer
+        # can be appending, so any partial records are torn and are removed.
+        self._lock()
+        try:
+            self._refresh(truncate=True)
+        finally:
+            self._unlock()
+        for filebase in self.get_files('.bak'):
+            entry = self._entries[filebase]
+            if entry.claims >= MAX_BAK_COUNT:
+                elog.error('.bak file max count, preserving file: %s',
+                           filebase)
+                self.finish(filebase, preserve=True)
+            else:
+                entry.claimed = False
@@ -28,7 +28,6 @@ from lazr.config import as_boolean, as_timedelta
 from mailman.config import config
 from mailman.core.i18n import _
 from mailman.core.logging import reopen
-from mailman.core.switchboard import Switchboard
 from mailman.interfaces.languages import ILanguageManager
 from mailman.interfaces.listmanager import IListManager
 from mailman.interfaces.runner import (
@@ -36,6 +35,8 @@ from mailman.interfaces.runner import (
     RunnerCrashEvent,
     RunnerInterrupt,
 )
+from mailman.utilities.inotify import DirectoryWatcher, inotify_available
+from mailman.utilities.modules import find_name
 from mailman.utilities.string import expand
 from public import public
 from zope.component import getUtility
@@ -71,7 +72,8 @@ class Runner:
         # should not have queue_directory or switchboard instance.
         if self.is_queue_runner:
             self.queue_directory = expand(section.path, None, substitutions)
-            self.switchboard = Switchboard(
+            switchboard_class = find_name(section.switchboard)
+            self.switchboard = switchboard_class(
                 name, self.queue_directory, slice, numslices, True)
         else:
             self.queue_directory = None
@@ -83,6 +85,15 @@ class Runner:
                             self.sleep_time.microseconds / 1.0e6)
         self.max_restarts = int(section.max_restarts)
         self.start = as_boolean(section.start)
+        self.wake_on_change = as_boolean(section.wake_on_change)
+        self.batch_size = int(section.batch_size)
+        self.periodic_interval = as_timedelta(
+            section.periodic_interval).total_seconds()
+        self.keep_loaded_life = as_timedelta(
+            section.keep_loaded_life).total_seconds()
+        # When the periodic work was last done, by the monotonic clock.
+        self._last_periodic = None
+        self._watcher = None
         self._stop = False
         self.status = 0
 
@@ -129,6 +140,10 @@ class Runner:
 
     def run(self):
         """See `IRunner`."""
+        # Start watching the queue directory before the first pass over it, so
+        # that nothing enqueued in the meantime can be missed.
+        self._start_watching()
+        config.db.keep_loaded(self.keep_loaded_life)
         # Start the main loop for this runner.
         with suppress(KeyboardInterrupt, RunnerInterrupt):
             while True:
@@ -136,24 +151,53 @@ class Runner:
                 # queue directory.
                 filecnt = self._one_iteration()
                 # Do the periodic work for the subclass.
-                self._do_periodic()
+                self._periodic(force=True)
                 # If the stop flag is set, we're done.
                 if self._stop:
                     break
+                # Once the queue is empty, load anything that was kept loaded
+                # again for the next entry, so that it sees the changes made
+                # by other processes in the meantime.
+                if filecnt == 0:
+                    config.db.expire_kept()
                 # Give the runner an opportunity to snooze for a while, but
                 # pass it the file count so it can decide whether to do more
                 # work now or not.
                 self._snooze(filecnt)
+        config.db.keep_loaded(0)
+        self._stop_watching()
         self._clean_up()
 
+    def _start_watching(self):
+        if (self.queue_directory is None or not self.wake_on_change or
+                self._watcher is not None):
+            return
+        if not inotify_available():
+            rlog.info('{} runner cannot watch its queue directory; '
+                      'polling instead'.format(self.name))
+            return
+        try:
+            self._watcher = DirectoryWatcher(self.queue_directory)
+        except OSError as error:
+            rlog.error('{} runner cannot watch {}: {}'.format(
+                self.name, self.queue_directory, error))
+
+    def _stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+
     def _one_iteration(self):
         """See `IRunner`."""
         me = self.__class__.__name__
         dlog.debug('[%s] starting oneloop', me)
-        # List all the files in our queue directory.  The switchboard is
-        # guaranteed to hand us the files in FIFO order.
+        # List the files in our queue directory.  The switchboard is
+        # guaranteed to hand us the files in FIFO order.  Any files beyond the
+        # batch size are handled by the next iteration.
         if self.switchboard is None:
             files = []
+        elif self.batch_size > 0:
+            files = self.switchboard.get_files(count=self.batch_size)
         else:
             files = self.switchboard.files
         for filebase in files:
@@ -177,6 +221,9 @@ class Runner:
             try:
                 dlog.debug('[%s] processing onefile', me)
                 self._process_one_file(msg, msgdata)
+                # Make sure that everything we enqueued while processing this
+                # file is on stable storage before it is removed.
+                self._sync_switchboards()
                 dlog.debug('[%s] finishing filebase: %s', me, filebase)
                 self.switchboard.finish(filebase)
             except Exception as error:
@@ -196,6 +243,7 @@ class Runner:
                     shunt = config.switchboards['shunt']
                     new_filebase = shunt.enqueue(msg, msgdata)
                     elog.error('SHUNTING: %s', new_filebase)
+                    self._sync_switchboards()
                     self.switchboard.finish(filebase)
                 except Exception as error:
                     # The message wasn't successfully shunted.  Log the
@@ -207,9 +255,9 @@ class Runner:
                         filebase)
                     self.switchboard.finish(filebase, preserve=True)
                 config.db.abort()
-            # Other work we want to do each time through the loop.
-            dlog.debug('[%s] doing periodic', me)
-            self._do_periodic()
+            # Other work we want to do every once in a while, but not for
+            # every file when the queue is busy.
+            self._periodic()
             dlog.debug('[%s] committing transaction', me)
             config.db.commit()
             dlog.debug('[%s] checking short circuit', me)
@@ -219,6 +267,16 @@ class Runner:
         dlog.debug('[%s] ending oneloop: %s', me, len(files))
         return len(files)
 
+    def _periodic(self, force=False):
+        # Do the periodic work, if it's due.
+        timestamp = time.monotonic()
+        if not (force or self._last_periodic is None or
+                timestamp - self._last_periodic >= self.periodic_interval):
+            return
+        dlog.debug('[%s] doing periodic', self.__class__.__name__)
+        self._last_periodic = timestamp
+        self._do_periodic()
+
     def _process_one_file(self, msg, msgdata):
         """See `IRunner`."""
         # Do some common sanity checking on the message metadata.  It's got to
@@ -277,6 +335,11 @@ class Runner:
         if keepqueued:
             self.switchboard.enqueue(msg, msgdata)
 
+    def _sync_switchboards(self):
+        self.switchboard.sync()
+        for switchboard in config.switchboards.values():
+            switchboard.sync()
+
     def _log(self, exc):
         elog.error('Uncaught runner exception: %s', exc)
         s = StringIO()
@@ -299,7 +362,11 @@ class Runner:
         """See `IRunner`."""
         if filecnt or self.sleep_float <= 0:
             return
-        time.sleep(self.sleep_float)
+        if self._watcher is None:
+            time.sleep(self.sleep_float)
+        else:
+            # Wake up early if anything is added to our queue directory.
+            self._watcher.wait(self.sleep_float)
 
     def _short_circuit(self):
         """See `IRunner`."""
@@ -21,7 +21,9 @@ Messages are represented as email.message.Message objects (or an instance ofa
 subclass).  Metadata is represented as a Python dictionary.  For every
 message/metadata pair in a queue, a single file containing two pickles is
 written.  First, the message is written to the pickle, then the metadata
-dictionary is written.
+dictionary is written.  Queues can instead be configured to write files in
+the envelope format, see `mailman.core.envelope`, and files in either format
+can always be read.
 """
 
 import os
@@ -32,10 +34,12 @@ import hashlib
 import logging
 
 from mailman.config import config
+from mailman.core import envelope
 from mailman.email.message import Message
 from mailman.interfaces.configuration import ConfigurationUpdatedEvent
 from mailman.interfaces.switchboard import ISwitchboard
 from mailman.utilities.filesystem import makedirs
+from mailman.utilities.modules import find_name
 from mailman.utilities.string import expand
 from public import public
 from zope.interface import implementer
@@ -44,9 +48,11 @@ from zope.interface import implementer
 # 20 bytes of all bits set, maximum hashlib.sha.digest() value.  We do it this
 # way for Python 2/3 compatibility.
 shamax = int('0xffffffffffffffffffffffffffffffffffffffff', 16)
-# Small increment to add to time in case two entries have the same time.  This
-# prevents skipping one of two entries with the same time until the next pass.
-DELTA = .0001
+# Directory timestamps are coarse, so a directory listing can miss changes
+# made in the same clock tick as its modification time.  Until a listing was
+# taken this many nanoseconds after that time, it is not trusted and the
+# directory is listed again on the next pass.
+RACY_WINDOW = 1000000000
 # We count the number of times a file has been moved to .bak and recovered.
 # In order to prevent loops and a message flood, when the count reaches this
 # value, we move the file to the bad queue as a .psv.
@@ -91,6 +97,13 @@ class Switchboard:
         if numslices != 1:
             self._lower = ((shamax + 1) * slice) / numslices
             self._upper = (((shamax + 1) * (slice + 1)) / numslices) - 1
+        # The state of the last directory scan, per file extension.
+        self._scans = {}
+        # Queues without a runner section, e.g. those created by tests, get
+        # the same defaults as [runner.master].
+        section = getattr(config, 'runner.' + name, None)
+        self._envelope = (section is not None and
+                          section.queue_format == 'envelope')
         if recover:
             self.recover_backup_files()
 
@@ -106,7 +119,13 @@ class Switchboard:
         list_id = data.get('listid', '--nolist--')
         # Get some data for the input to the sha hash.
         now = repr(time.time())
-        if data.get('_plaintext'):
+        raw = None
+        if self._envelope and not data.get('_plaintext'):
+            raw = envelope.message_bytes(_msg)
+        if raw is not None:
+            protocol = pickle.HIGHEST_PROTOCOL
+            msgsave = raw
+        elif data.get('_plaintext'):
             protocol = 0
             msgsave = pickle.dumps(str(_msg), protocol)
         else:
@@ -134,8 +153,11 @@ class Switchboard:
         data['_parsemsg'] = (protocol == 0)
         # Write to the pickle file the message object and metadata.
         with open(tmpfile, 'wb') as fp:
-            fp.write(msgsave)
-            pickle.dump(data, fp, protocol)
+            if raw is None:
+                fp.write(msgsave)
+                pickle.dump(data, fp, protocol)
+            else:
+                envelope.dump(fp, _msg, raw, data, protocol)
             fp.flush()
             os.fsync(fp.fileno())
         os.rename(tmpfile, filename)
@@ -152,6 +174,8 @@ class Switchboard:
             # process crashes uncleanly the .bak file will be used to
             # re-instate the .pck file in order to try again.
             os.rename(filename, backfile)
+            if envelope.is_envelope(fp):
+                return envelope.load(fp)
             msg = pickle.load(fp)
             data = pickle.load(fp)
         if data.get('_parsemsg'):
@@ -185,33 +209,85 @@ class Switchboard:
             elog.exception(
                 'Failed to unlink/preserve backup file: %s', bakfile)
 
+    def sync(self):
+        """See `ISwitchboard`."""
+        # Every entry is already fsync'd in .enqueue().
+        pass
+
     @property
     def files(self):
         """See `ISwitchboard`."""
         return self.get_files()
 
-    def get_files(self, extension='.pck'):
+    def get_files(self, extension='.pck', count=None):
         """See `ISwitchboard`."""
-        times = {}
+        scan = self._scans.get(extension)
+        if scan is None:
+            scan = self._scans[extension] = _Scan()
+        # Only list the directory when it might have changed since the last
+        # time we looked.  Even then, only the new file names are parsed.
+        stat = os.stat(self.queue_directory)
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if not scan.stable or version != scan.version:
+            now = time.time_ns()
+            self._scan(scan, extension)
+            scan.version = version
+            scan.stable = (now - stat.st_mtime_ns > RACY_WINDOW)
+        files = []
+        for when, filebase in self._live(scan, extension):
+            if count is not None and len(files) >= count:
+                break
+            files.append(filebase)
+        return files
+
+    def _live(self, scan, extension):
+        # The queue is in FIFO order, but it may still hold entries for files
+        # which have since disappeared.  A file which reappears under the same
+        # name, e.g. a recovered backup file, is in there twice, but because
+        # its sort keys are equal, the two entries are adjacent.
+        names = scan.names
+        last = None
+        for key in scan.queue:
+            if key != last and key[1] + extension in names:
+                yield key
+            last = key
+
+    def _scan(self, scan, extension):
+        names = scan.names
+        # By ignoring anything that doesn't end in .pck, we ignore tempfiles
+        # and avoid a race condition.
+        current = {filename for filename in os.listdir(self.queue_directory)
+                   if filename.endswith(extension)}
+        for filename in names.keys() - current:
+            if names.pop(filename) is not None:
+                scan.dead += 1
         lower = self._lower
         upper = self._upper
-        for f in os.listdir(self.queue_directory):
-            # By ignoring anything that doesn't end in .pck, we ignore
-            # tempfiles and avoid a race condition.
-            filebase, ext = os.path.splitext(f)
-            if ext != extension:
-                continue
-            when, digest = filebase.split('+', 1)
-            # Throw out any files which don't match our bitrange.  BAW: test
-            # performance and end-cases of this algorithm.  MAS: both
-            # comparisons need to be <= to get complete range.
-            if lower is None or (lower <= int(digest, 16) <= upper):
-                key = float(when)
-                while key in times:
-                    key += DELTA
-                times[key] = filebase
-        # FIFO sort
-        return [times[k] for k in sorted(times)]
+        new = []
+        for filename in current - names.keys():
+            key = None
+            filebase, ext = os.path.splitext(filename)
+            if ext == extension:
+                when, digest = filebase.split('+', 1)
+                # Throw out any files which don't match our bitrange.  BAW:
+                # test performance and end-cases of this algorithm.  MAS: both
+                # comparisons need to be <= to get complete range.
+                if lower is None or (lower <= int(digest, 16) <= upper):
+                    key = (float(when), filebase)
+                    new.append(key)
+            names[filename] = key
+        queue = scan.queue
+        if scan.dead > len(queue) // 2:
+            queue[:] = list(self._live(scan, extension))
+            scan.dead = 0
+        if len(new) > 0:
+            # New files are usually newer than everything already queued, in
+            # which case they simply go at the end.
+            new.sort()
+            fifo = (len(queue) == 0 or queue[-1] <= new[0])
+            queue.extend(new)
+            if not fifo:
+                queue.sort()
 
     def recover_backup_files(self):
         """See `ISwitchboard`."""
@@ -226,7 +302,10 @@ class Switchboard:
             dst = os.path.join(self.queue_directory, filebase + '.pck')
             with open(src, 'rb+') as fp:
                 try:
-                    # Throw away the message object.
+                    # Throw away the message object, or for envelopes, the
+                    # message attributes.
+                    if envelope.is_envelope(fp):
+                        envelope.seek_metadata(fp)
                     pickle.load(fp)
                     data_pos = fp.tell()
                     data = pickle.load(fp)
@@ -255,6 +334,23 @@ class Switchboard:
                         os.rename(src, dst)
 
 
+class _Scan:
+    """The switchboard's view of its queue directory for one extension."""
+
+    def __init__(self):
+        # The directory's inode and modification time when it was last listed,
+        # and whether that listing can be trusted to be complete.
+        self.version = None
+        self.stable = False
+        # Maps every file name with the extension to its (time, filebase)
+        # sort key, or to None if the file isn't in our slice.
+        self.names = {}
+        # The sort keys in FIFO order, including some for files which have
+        # disappeared since they were added.
+        self.queue = []
+        self.dead = 0
+
+
 @public
 def handle_ConfigurationUpdatedEvent(event):
     """Initialize the global switchboards for input/output."""
@@ -271,4 +367,5 @@ def handle_ConfigurationUpdatedEvent(event):
             substitutions = config.paths
             substitutions['name'] = name
             path = expand(conf.path, None, substitutions)
-            config.switchboards[name] = Switchboard(name, path)
+            switchboard_class = find_name(conf.switchboard)
+            config.switchboards[name] = switchboard_class(name, path)
@@ -0,0 +1,185 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Test the envelope queue file format."""
+
+import os
+import pickle
+import unittest
+
+from email import message_from_string
+from email.header import Header
+from email.policy import SMTP
+from mailman.config import config
+from mailman.core import envelope
+from mailman.core.switchboard import Switchboard
+from mailman.email.message import LazyMessage, Message
+from mailman.testing.helpers import (
+    configuration,
+    specialized_message_from_string as mfs,
+)
+from mailman.testing.layers import ConfigLayer
+from unittest.mock import patch
+
+
+class TestEnvelope(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Subject: A test
+Message-ID: <ant>
+
+Testing
+""")
+        directory = os.path.join(config.QUEUE_DIR, 'in')
+        with configuration('runner.in', queue_format='envelope'):
+            self._switchboard = Switchboard('in', directory)
+
+    def _path(self, filebase, extension='.pck'):
+        return os.path.join(
+            self._switchboard.queue_directory, filebase + extension)
+
+    def _is_envelope(self, filebase, extension='.pck'):
+        with open(self._path(filebase, extension), 'rb') as fp:
+            return envelope.is_envelope(fp)
+
+    def test_roundtrip(self):
+        filebase = self._switchboard.enqueue(self._msg, foo='yes')
+        self.assertTrue(self._is_envelope(filebase))
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msgdata['foo'], 'yes')
+        self.assertEqual(msg.original_size, self._msg.original_size)
+        self.assertIsInstance(msg, LazyMessage)
+        self.assertEqual(msg.as_string(), self._msg.as_string())
+
+    def test_message_is_parsed_lazily(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertIsNotNone(msg.unparsed)
+        # Setting and reading our own attributes doesn't parse the message.
+        msg.foo = 1
+        self.assertEqual(msg.foo, 1)
+        self.assertIsNotNone(msg.unparsed)
+        # But reading the message does.
+        self.assertEqual(msg['subject'], 'A test')
+        self.assertIsNone(msg.unparsed)
+        self.assertEqual(msg.foo, 1)
+        self.assertEqual(msg.sender, 'anne@example.com')
+        self.assertRaises(AttributeError, getattr, msg, 'bar')
+
+    def test_unparsed_message_is_requeued_unchanged(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        with open(self._path(filebase), 'rb') as fp:
+            original = fp.read()
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        with patch('mailman.core.envelope.BytesGenerator') as generator:
+            new_filebase = self._switchboard.enqueue(msg, msgdata)
+        generator.assert_not_called()
+        self.assertIsNotNone(msg.unparsed)
+        with open(self._path(new_filebase), 'rb') as fp:
+            self.assertEqual(fp.read(), original)
+
+    def test_unixfrom(self):
+        self._msg.set_unixfrom('bart@example.com')
+        filebase = self._switchboard.enqueue(self._msg)
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msg.get_unixfrom(), 'bart@example.com')
+        self.assertEqual(msg['from'], 'anne@example.com')
+
+    def test_cached_senders_are_not_stored(self):
+        self.assertEqual(self._msg.sender, 'anne@example.com')
+        self.assertIn('_senders', vars(self._msg))
+        filebase = self._switchboard.enqueue(self._msg)
+        with open(self._path(filebase), 'rb') as fp:
+            envelope.seek_metadata(fp)
+            attributes = pickle.load(fp)
+        self.assertNotIn('_senders', attributes)
+        self.assertIn('original_size', attributes)
+
+    def test_plaintext_is_pickled(self):
+        filebase = self._switchboard.enqueue(
+            self._msg.as_string(), _plaintext=True)
+        self.assertFalse(self._is_envelope(filebase))
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msg['message-id'], '<ant>')
+
+    def test_other_policies_are_pickled(self):
+        msg = message_from_string(self._msg.as_string(), Message, policy=SMTP)
+        filebase = self._switchboard.enqueue(msg)
+        self.assertFalse(self._is_envelope(filebase))
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msg.policy.linesep, '\r\n')
+
+    def test_long_headers_are_not_folded(self):
+        self._msg['X-Long'] = 'word; ' * 40
+        filebase = self._switchboard.enqueue(self._msg)
+        self.assertTrue(self._is_envelope(filebase))
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msg['x-long'], 'word; ' * 40)
+
+    def test_header_objects_are_pickled(self):
+        del self._msg['subject']
+        self._msg['Subject'] = Header('Caf\xe9', 'utf-8')
+        filebase = self._switchboard.enqueue(self._msg)
+        self.assertFalse(self._is_envelope(filebase))
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertIsInstance(msg['subject'], Header)
+
+    def test_read_pickle_format(self):
+        # Files written before the queue was switched to envelopes can still
+        # be read.
+        other = Switchboard('in', self._switchboard.queue_directory)
+        filebase = other.enqueue(self._msg, foo='yes')
+        self.assertFalse(self._is_envelope(filebase))
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msg['message-id'], '<ant>')
+        self.assertEqual(msgdata['foo'], 'yes')
+
+    def test_metadata_only(self):
+        filebase = self._switchboard.enqueue(self._msg, foo='yes')
+        with open(self._path(filebase), 'rb') as fp:
+            msg, msgdata = envelope.load(fp, metadata_only=True)
+        self.assertIsNone(msg)
+        self.assertEqual(msgdata['foo'], 'yes')
+
+    def test_recovery(self):
+        filebase = self._switchboard.enqueue(self._msg, foo='yes')
+        self._switchboard.dequeue(filebase)
+        self._switchboard.recover_backup_files()
+        self.assertTrue(self._is_envelope(filebase))
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msgdata['_bak_count'], 1)
+        self.assertEqual(msgdata['foo'], 'yes')
+        self.assertEqual(msg['message-id'], '<ant>')
+
+    def test_pickled_lazy_message_stays_lazy(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        copy = pickle.loads(pickle.dumps(msg))
+        self.assertIsNotNone(copy.unparsed)
+        self.assertEqual(copy.original_size, msg.original_size)
+        self.assertEqual(copy['message-id'], '<ant>')
+
+    def test_bad_version(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        with open(self._path(filebase), 'rb+') as fp:
+            fp.seek(len(envelope.MAGIC))
+            fp.write(b'\xff')
+        self.assertRaises(ValueError, self._switchboard.dequeue, filebase)
@@ -0,0 +1,198 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Test the segmented log switchboard."""
+
+import os
+import unittest
+
+from mailman.app.lifecycle import create_list
+from mailman.config import config
+from mailman.core.queuelog import LogSwitchboard
+from mailman.core.runner import Runner
+from mailman.testing.helpers import (
+    configuration,
+    get_queue_messages,
+    make_testable_runner,
+    specialized_message_from_string as mfs,
+)
+from mailman.testing.layers import ConfigLayer
+
+
+class StoringRunner(Runner):
+    def _dispose(self, mlist, msg, msgdata):
+        config.switchboards['out'].enqueue(msg, msgdata)
+
+
+class TestLogSwitchboard(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+        self._directory = os.path.join(config.QUEUE_DIR, 'logtest')
+        self._switchboard = LogSwitchboard('logtest', self._directory)
+
+    def _segments(self):
+        return sorted(filename for filename in os.listdir(self._directory)
+                      if filename.endswith('.seg'))
+
+    def test_enqueue_dequeue_finish(self):
+        filebase = self._switchboard.enqueue(self._msg, foo=1)
+        self.assertEqual(self._switchboard.files, [filebase])
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msg['message-id'], '<ant>')
+        self.assertEqual(msgdata['foo'], 1)
+        self.assertEqual(self._switchboard.files, [])
+        self.assertEqual(self._switchboard.get_files('.bak'), [filebase])
+        self._switchboard.finish(filebase)
+        self.assertEqual(self._switchboard.get_files('.bak'), [])
+        self.assertEqual(len(self._segments()), 1)
+
+    def test_fifo_order(self):
+        filebases = [self._switchboard.enqueue(self._msg, n=n)
+                     for n in range(10)]
+        self.assertEqual(self._switchboard.files, filebases)
+
+    def test_plaintext(self):
+        filebase = self._switchboard.enqueue(
+            self._msg.as_string(), _plaintext=True)
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msg['message-id'], '<ant>')
+        self.assertEqual(msgdata['original_size'], msg.original_size)
+
+    def test_entries_visible_to_other_switchboards(self):
+        # Another consumer of the same queue, e.g. in another process, sees
+        # both the entries and their progress.
+        filebases = [self._switchboard.enqueue(self._msg, n=n)
+                     for n in range(3)]
+        other = LogSwitchboard('logtest', self._directory)
+        self.assertEqual(other.files, filebases)
+        other.dequeue(filebases[0])
+        other.finish(filebases[0])
+        self.assertEqual(self._switchboard.files, filebases[1:])
+
+    def test_missing_entry(self):
+        self.assertRaises(FileNotFoundError,
+                          self._switchboard.dequeue, '1234.5+abcdef')
+
+    def test_slices(self):
+        for n in range(20):
+            self._switchboard.enqueue(self._msg, n=n)
+        slice0 = LogSwitchboard('logtest', self._directory, 0, 2)
+        slice1 = LogSwitchboard('logtest', self._directory, 1, 2)
+        files = self._switchboard.files
+        self.assertEqual(sorted(slice0.files + slice1.files), sorted(files))
+        self.assertEqual(set(slice0.files) & set(slice1.files), set())
+
+    @configuration('runner.logtest', segment_size=1)
+    def test_segment_rotation_and_removal(self):
+        # Every entry gets its own segment.
+        switchboard = LogSwitchboard('logtest', self._directory)
+        filebases = [switchboard.enqueue(self._msg, n=n) for n in range(3)]
+        self.assertEqual(len(self._segments()), 3)
+        for filebase in filebases:
+            switchboard.dequeue(filebase)
+            switchboard.finish(filebase)
+        # The newest segment is never removed, since writers may still be
+        # appending to it.
+        segments = self._segments()
+        self.assertEqual(len(segments), 1)
+        self.assertTrue(segments[0].startswith('0000000003-'))
+
+    @configuration('runner.logtest', segment_size=1)
+    def test_segment_removal_waits_for_all_slices(self):
+        switchboard = LogSwitchboard('logtest', self._directory)
+        for n in range(10):
+            switchboard.enqueue(self._msg, n=n)
+        switchboard.enqueue(self._msg, n=10)
+        slice0 = LogSwitchboard('logtest', self._directory, 0, 2)
+        slice1 = LogSwitchboard('logtest', self._directory, 1, 2)
+        for filebase in slice0.files:
+            slice0.dequeue(filebase)
+            slice0.finish(filebase)
+        # The other slice hasn't finished its entries yet.
+        self.assertEqual(len(self._segments()), 11)
+        for filebase in slice1.files:
+            slice1.dequeue(filebase)
+            slice1.finish(filebase)
+        segments = self._segments()
+        self.assertEqual(len(segments), 1)
+        self.assertTrue(segments[0].startswith('0000000011-'))
+
+    def test_recovery(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        # Dequeue the entry, but crash before finishing it.
+        self._switchboard.dequeue(filebase)
+        switchboard = LogSwitchboard(
+            'logtest', self._directory, recover=True)
+        self.assertEqual(switchboard.files, [filebase])
+        msg, msgdata = switchboard.dequeue(filebase)
+        self.assertEqual(msgdata['_bak_count'], 1)
+
+    def test_recovery_preserves_after_max_count(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        self._switchboard.dequeue(filebase)
+        for count in range(2):
+            switchboard = LogSwitchboard(
+                'logtest', self._directory, recover=True)
+            switchboard.dequeue(filebase)
+        switchboard = LogSwitchboard('logtest', self._directory, recover=True)
+        self.assertEqual(switchboard.files, [])
+        self.assertEqual(switchboard.get_files('.bak'), [])
+        bad_dir = config.switchboards['bad'].queue_directory
+        psvfile = os.path.join(bad_dir, filebase + '.psv')
+        self.assertTrue(os.path.isfile(psvfile))
+
+    def test_preserve(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        self._switchboard.dequeue(filebase)
+        self._switchboard.finish(filebase, preserve=True)
+        bad_dir = config.switchboards['bad'].queue_directory
+        self.assertTrue(
+            os.path.isfile(os.path.join(bad_dir, filebase + '.psv')))
+        self.assertEqual(self._switchboard.get_files('.bak'), [])
+
+    def test_torn_record_is_truncated(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        segment = os.path.join(self._directory, self._segments()[0])
+        size = os.stat(segment).st_size
+        with open(segment, 'ab') as fp:
+            fp.write(b'MMQ1\x00')
+        # Readers ignore the partial record.
+        self.assertEqual(self._switchboard.files, [filebase])
+        # Recovery removes it so that appending can continue.
+        switchboard = LogSwitchboard('logtest', self._directory, recover=True)
+        self.assertEqual(os.stat(segment).st_size, size)
+        second = switchboard.enqueue(self._msg)
+        self.assertEqual(switchboard.files, [filebase, second])
+
+    @configuration('runner.in',
+                   switchboard='mailman.core.queuelog.LogSwitchboard')
+    def test_runner_uses_configured_switchboard(self):
+        create_list('test@example.com')
+        runner = make_testable_runner(StoringRunner, 'in')
+        self.assertIsInstance(runner.switchboard, LogSwitchboard)
+        runner.switchboard.enqueue(self._msg, listid='test.example.com')
+        runner.run()
+        self.assertEqual(runner.switchboard.files, [])
+        items = get_queue_messages('out', expected_count=1)
+        self.assertEqual(items[0].msg['message-id'], '<ant>')
@@ -17,7 +17,9 @@
 
 """Test some Runner base class behavior."""
 
+import time
 import unittest
+import threading
 
 from mailman.app.lifecycle import create_list
 from mailman.config import config
@@ -36,6 +38,9 @@ from mailman.testing.helpers import (
     subscribe,
 )
 from mailman.testing.layers import ConfigLayer
+from mailman.utilities.inotify import inotify_available
+from sqlalchemy import event
+from unittest.mock import patch
 
 
 class CrashingRunner(Runner):
@@ -47,6 +52,34 @@ class NonQueueRunner(Runner):
     is_queue_runner = False
 
 
+class RecordingRunner(Runner):
+    def __init__(self, name, slice=None):
+        super().__init__(name, slice)
+        self.handled = []
+
+    def _dispose(self, mlist, msg, msgdata):
+        self.handled.append(msgdata['n'])
+
+
+class PeriodicRunner(RecordingRunner):
+    def __init__(self, name, slice=None):
+        super().__init__(name, slice)
+        self.periodic = []
+
+    def _do_periodic(self):
+        self.periodic.append(list(self.handled))
+
+
+class ListReadingRunner(RecordingRunner):
+    def _dispose(self, mlist, msg, msgdata):
+        super()._dispose(mlist, msg, msgdata)
+        self.handled_by = (mlist.display_name, mlist.domain.mail_host)
+
+    def _snooze(self, filecnt):
+        # Stop once the queue is empty.
+        self.stop()
+
+
 class TestRunner(unittest.TestCase):
     """Test the Runner base class behavior."""
 
@@ -135,3 +168,165 @@ Message-ID: <ant>
         runner = make_testable_runner(NonQueueRunner)
         # This will throw AttributeError on failure.
         runner.run()
+
+    @configuration('runner.in', batch_size=2)
+    def test_batch_size(self):
+        # The runner takes at most batch_size entries from its queue in each
+        # iteration, oldest first.
+        msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+        runner = RecordingRunner('in')
+        for n in range(5):
+            config.switchboards['in'].enqueue(
+                msg, listid='test.example.com', n=n)
+        self.assertEqual(runner._one_iteration(), 2)
+        self.assertEqual(runner.handled, [0, 1])
+        self.assertEqual(runner._one_iteration(), 2)
+        self.assertEqual(runner._one_iteration(), 1)
+        self.assertEqual(runner._one_iteration(), 0)
+        self.assertEqual(runner.handled, [0, 1, 2, 3, 4])
+
+    def _enqueue(self, count):
+        msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+        for n in range(count):
+            config.switchboards['in'].enqueue(
+                msg, listid='test.example.com', n=n)
+
+    def test_periodic_not_per_file(self):
+        # While the runner works through its queue, the periodic work is done
+        # at most once every periodic_interval, instead of after every file.
+        runner = PeriodicRunner('in')
+        self._enqueue(5)
+        self.assertEqual(runner._one_iteration(), 5)
+        self.assertEqual(runner.periodic, [[0]])
+        # It is always done after each pass over the queue.
+        runner.stop()
+        runner.run()
+        self.assertEqual(runner.periodic, [[0], [0, 1, 2, 3, 4]])
+
+    @configuration('runner.in', periodic_interval='0s')
+    def test_periodic_every_file(self):
+        runner = PeriodicRunner('in')
+        self._enqueue(3)
+        self.assertEqual(runner._one_iteration(), 3)
+        self.assertEqual(runner.periodic, [[0], [0, 1], [0, 1, 2]])
+
+    def _run_counting_statements(self):
+        # Run a runner which reads each message's mailing list, and count
+        # the SQL statements it issues.
+        statements = []
+
+        def count(connection, cursor, statement, *args):
+            statements.append(statement)
+
+        runner = ListReadingRunner('in')
+        self._enqueue(10)
+        event.listen(config.db.engine, 'before_cursor_execute', count)
+        try:
+            runner.run()
+        finally:
+            event.remove(config.db.engine, 'before_cursor_execute', count)
+        self.assertEqual(runner.handled, list(range(10)))
+        self.assertEqual(runner.handled_by, ('Test', 'example.com'))
+        return len(statements)
+
+    def test_keep_loaded(self):
+        # Runners can keep the mailing lists and domains they load across
+        # messages, instead of loading them again for every message.
+        with configuration('runner.in', keep_loaded_life='0s'):
+            reloading = self._run_counting_statements()
+        with configuration('runner.in', keep_loaded_life='1m'):
+            keeping = self._run_counting_statements()
+        self.assertLess(keeping, reloading)
+        # Nothing is kept loaded once the runner has stopped.
+        self.assertNotIn('kept', config.db.store.info)
+
+
+class TestRunnerWakeup(unittest.TestCase):
+    """Test waking up idle runners."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+
+    @configuration('runner.in', sleep_time='10s')
+    def test_snooze_wakes_up_on_enqueue(self):
+        if not inotify_available():
+            raise unittest.SkipTest('inotify is not available')
+        runner = CrashingRunner('in')
+        runner._start_watching()
+        self.addCleanup(runner._stop_watching)
+        timer = threading.Timer(
+            0.1, config.switchboards['in'].enqueue, (self._msg,))
+        timer.start()
+        self.addCleanup(timer.join)
+        start = time.time()
+        runner._snooze(0)
+        self.assertLess(time.time() - start, 5)
+
+    @configuration('runner.in', sleep_time='10s')
+    def test_snooze_does_not_miss_earlier_enqueues(self):
+        # Something enqueued after the runner started watching, but before it
+        # snoozes, still wakes it up.
+        if not inotify_available():
+            raise unittest.SkipTest('inotify is not available')
+        runner = CrashingRunner('in')
+        runner._start_watching()
+        self.addCleanup(runner._stop_watching)
+        config.switchboards['in'].enqueue(self._msg)
+        start = time.time()
+        runner._snooze(0)
+        self.assertLess(time.time() - start, 5)
+
+    @configuration('runner.in', sleep_time='10s',
+                   switchboard='mailman.core.queuelog.LogSwitchboard')
+    def test_snooze_wakes_up_on_log_append(self):
+        if not inotify_available():
+            raise unittest.SkipTest('inotify is not available')
+        # Make sure the segment file already exists.
+        config.switchboards['in'].enqueue(self._msg)
+        runner = CrashingRunner('in')
+        runner._start_watching()
+        self.addCleanup(runner._stop_watching)
+        timer = threading.Timer(
+            0.1, config.switchboards['in'].enqueue, (self._msg,))
+        timer.start()
+        self.addCleanup(timer.join)
+        start = time.time()
+        runner._snooze(0)
+        self.assertLess(time.time() - start, 5)
+
+    @configuration('runner.in', sleep_time='10s', wake_on_change='no')
+    def test_snooze_without_wakeups(self):
+        runner = CrashingRunner('in')
+        runner._start_watching()
+        self.assertIsNone(runner._watcher)
+        with patch('mailman.core.runner.time.sleep') as sleep:
+            runner._snooze(0)
+        sleep.assert_called_once_with(10.0)
+
+    @configuration('runner.in', sleep_time='10s')
+    def test_snooze_falls_back_to_polling(self):
+        runner = CrashingRunner('in')
+        with patch('mailman.core.runner.inotify_available',
+                   return_value=False):
+            runner._start_watching()
+        self.assertIsNone(runner._watcher)
+        with patch('mailman.core.runner.time.sleep') as sleep:
+            runner._snooze(0)
+        sleep.assert_called_once_with(10.0)
@@ -21,6 +21,7 @@ import os
 import unittest
 
 from mailman.config import config
+from mailman.core.switchboard import Switchboard
 from mailman.testing.helpers import (
     LogFileMark,
     specialized_message_from_string as mfs,
@@ -72,3 +73,100 @@ Message-ID: <ant>
         bad_dir = config.switchboards['bad'].queue_directory
         psvfile = os.path.join(bad_dir, filebase + '.psv')
         self.assertTrue(os.path.isfile(psvfile))
+
+
+class TestSwitchboardFiles(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+        self._directory = os.path.join(config.QUEUE_DIR, 'filestest')
+        self._switchboard = Switchboard('filestest', self._directory)
+
+    def _age_directory(self):
+        # Make the directory look like it was last changed long ago, so that
+        # the switchboard can trust its listing of it.
+        os.utime(self._directory, (0, 0))
+
+    def test_files_are_updated(self):
+        first = [self._switchboard.enqueue(self._msg, n=n) for n in range(3)]
+        self.assertEqual(self._switchboard.files, first)
+        second = [self._switchboard.enqueue(self._msg, n=n) for n in range(3)]
+        self.assertEqual(self._switchboard.files, first + second)
+        self._switchboard.dequeue(first[1])
+        self.assertEqual(self._switchboard.files,
+                         [first[0], first[2]] + second)
+        self.assertEqual(self._switchboard.get_files('.bak'), [first[1]])
+
+    def test_files_changed_by_another_switchboard(self):
+        other = Switchboard('filestest', self._directory)
+        self.assertEqual(self._switchboard.files, [])
+        filebase = other.enqueue(self._msg)
+        self.assertEqual(self._switchboard.files, [filebase])
+        other.dequeue(filebase)
+        self.assertEqual(self._switchboard.files, [])
+
+    def test_fifo_order(self):
+        # Files are returned in the order they were enqueued, even when they
+        # show up out of order.
+        filebases = [self._switchboard.enqueue(self._msg, n=n)
+                     for n in range(4)]
+        for filebase in filebases:
+            os.rename(os.path.join(self._directory, filebase + '.pck'),
+                      os.path.join(self._directory, filebase + '.tmp'))
+        self.assertEqual(self._switchboard.files, [])
+        for filebase in reversed(filebases):
+            os.rename(os.path.join(self._directory, filebase + '.tmp'),
+                      os.path.join(self._directory, filebase + '.pck'))
+            self._switchboard.files
+        self.assertEqual(self._switchboard.files, filebases)
+
+    def test_count(self):
+        filebases = [self._switchboard.enqueue(self._msg, n=n)
+                     for n in range(5)]
+        self.assertEqual(self._switchboard.get_files(count=2), filebases[:2])
+        self.assertEqual(self._switchboard.get_files(count=10), filebases)
+        self.assertEqual(self._switchboard.get_files(count=0), [])
+
+    def test_unchanged_directory_is_not_listed(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        self._age_directory()
+        self.assertEqual(self._switchboard.files, [filebase])
+        with patch('mailman.core.switchboard.os.listdir') as listdir:
+            self.assertEqual(self._switchboard.files, [filebase])
+        listdir.assert_not_called()
+        # Any change to the directory is noticed.
+        self._switchboard.dequeue(filebase)
+        self.assertEqual(self._switchboard.files, [])
+
+    def test_recent_listing_is_not_trusted(self):
+        # A listing taken in the same clock tick as the directory's last
+        # change may have missed a later change in that same tick.
+        filebase = self._switchboard.enqueue(self._msg)
+        self.assertEqual(self._switchboard.files, [filebase])
+        with patch('mailman.core.switchboard.os.listdir',
+                   return_value=[]) as listdir:
+            self.assertEqual(self._switchboard.files, [])
+        listdir.assert_called_once_with(self._directory)
+
+    def test_recovered_file_is_listed_once(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        self.assertEqual(self._switchboard.files, [filebase])
+        self._switchboard.dequeue(filebase)
+        self.assertEqual(self._switchboard.files, [])
+        self._switchboard.recover_backup_files()
+        self.assertEqual(self._switchboard.files, [filebase])
+
+    def test_slices(self):
+        filebases = [self._switchboard.enqueue(self._msg, n=n)
+                     for n in range(20)]
+        slice0 = Switchboard('filestest', self._directory, 0, 2)
+        slice1 = Switchboard('filestest', self._directory, 1, 2)
+        self.assertEqual(sorted(slice0.files + slice1.files),
+                         sorted(filebases))
+        self.assertEqual(set(slice0.files) & set(slice1.files), set())
@@ -0,0 +1,175 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Effective preferences
+
+Revision ID: 3a2f2c5e9b1d
+Revises: 98224512c9c2
+Create Date: 2022-03-14 10:21:37.218406
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+from mailman.database.types import SAUnicode
+
+
+# revision identifiers, used by Alembic.
+revision = '3a2f2c5e9b1d'
+down_revision = '98224512c9c2'
+
+
+# The system default preferences, as stored in the database.  See
+# mailman.core.constants.
+DEFAULTS = dict(
+    acknowledge_posts=False,
+    receive_list_copy=True,
+    receive_own_postings=True,
+    # DeliveryMode.regular
+    delivery_mode=1,
+    # DeliveryStatus.enabled
+    delivery_status=1,
+    )
+
+
+def upgrade():
+    op.create_table(
+        'effective_preferences',
+        sa.Column('member_id', sa.Integer(), nullable=False),
+        sa.Column('list_id', SAUnicode(), nullable=True),
+        sa.Column('role', sa.Integer(), nullable=True),
+        sa.Column('email', SAUnicode(), nullable=True),
+        sa.Column('acknowledge_posts', sa.Boolean(), nullable=True),
+        sa.Column('preferred_language', SAUnicode(), nullable=True),
+        sa.Column('receive_list_copy', sa.Boolean(), nullable=True),
+        sa.Column('receive_own_postings', sa.Boolean(), nullable=True),
+        sa.Column('delivery_mode', sa.Integer(), nullable=True),
+        sa.Column('delivery_status', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ['member_id'], ['member.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('member_id')
+        )
+    op.create_index(
+        op.f('ix_effective_preferences_email'),
+        'effective_preferences', ['email'], unique=False)
+    op.create_index(
+        op.f('ix_effective_preferences_delivery_status'),
+        'effective_preferences', ['delivery_status'], unique=False)
+    op.create_index(
+        'ix_effective_preferences_delivery', 'effective_preferences',
+        ['list_id', 'role', 'delivery_mode', 'delivery_status'],
+        unique=False)
+    # Calculate every existing member's effective preferences.  Don't import
+    # the table definitions from the models, it may break this migration when
+    # the models are updated in the future (see the Alembic doc).
+    preference_columns = ('acknowledge_posts', 'preferred_language',
+                          'receive_list_copy', 'receive_own_postings',
+                          'delivery_mode', 'delivery_status')
+    preferences_table = sa.sql.table(
+        'preferences',
+        sa.sql.column('id', sa.Integer),
+        sa.sql.column('acknowledge_posts', sa.Boolean),
+        sa.sql.column('preferred_language', SAUnicode),
+        sa.sql.column('receive_list_copy', sa.Boolean),
+        sa.sql.column('receive_own_postings', sa.Boolean),
+        sa.sql.column('delivery_mode', sa.Integer),
+        sa.sql.column('delivery_status', sa.Integer),
+        )
+    member_table = sa.sql.table(
+        'member',
+        sa.sql.column('id', sa.Integer),
+        sa.sql.column('list_id', SAUnicode),
+        sa.sql.column('role', sa.Integer),
+        sa.sql.column('address_id', sa.Integer),
+        sa.sql.column('user_id', sa.Integer),
+        sa.sql.column('preferences_id', sa.Integer),
+        )
+    address_table = sa.sql.table(
+        'address',
+        sa.sql.column('id', sa.Integer),
+        sa.sql.column('email', SAUnicode),
+        sa.sql.column('user_id', sa.Integer),
+        sa.sql.column('preferences_id', sa.Integer),
+        )
+    user_table = sa.sql.table(
+        'user',
+        sa.sql.column('id', sa.Integer),
+        sa.sql.column('_preferred_address_id', sa.Integer),
+        sa.sql.column('preferences_id', sa.Integer),
+        )
+    effective_table = sa.sql.table(
+        'effective_preferences',
+        sa.sql.column('member_id', sa.Integer),
+        sa.sql.column('list_id', SAUnicode),
+        sa.sql.column('role', sa.Integer),
+        sa.sql.column('email', SAUnicode),
+        *(sa.sql.column(name) for name in preference_columns)
+        )
+    subscriber = user_table.alias('subscriber')
+    address = address_table.alias('subscribed_address')
+    owner = user_table.alias('owner')
+    member_preferences = preferences_table.alias('member_preferences')
+    address_preferences = preferences_table.alias('address_preferences')
+    owner_preferences = preferences_table.alias('owner_preferences')
+    columns = [
+        member_table.c.id,
+        member_table.c.list_id,
+        member_table.c.role,
+        address.c.email,
+        ]
+    for name in preference_columns:
+        values = [member_preferences.c[name],
+                  address_preferences.c[name],
+                  owner_preferences.c[name]]
+        # Members fall back to the mailing list's language.
+        if name in DEFAULTS:
+            values.append(sa.literal(DEFAULTS[name]))
+        columns.append(sa.func.coalesce(*values))
+    select = sa.select(*columns).select_from(
+        member_table.outerjoin(
+            subscriber, member_table.c.user_id == subscriber.c.id,
+        ).outerjoin(
+            address, address.c.id == sa.func.coalesce(
+                member_table.c.address_id,
+                subscriber.c._preferred_address_id),
+        ).outerjoin(
+            member_preferences,
+            member_table.c.preferences_id == member_preferences.c.id,
+        ).outerjoin(
+            address_preferences,
+            address.c.preferences_id == address_preferences.c.id,
+        ).outerjoin(
+            owner, address.c.user_id == owner.c.id,
+        ).outerjoin(
+            owner_preferences,
+            owner.c.preferences_id == owner_preferences.c.id))
+    op.get_bind().execute(effective_table.insert().from_select(
+        ('member_id', 'list_id', 'role', 'email') + preference_columns,
+        select))
+
+
+def downgrade():
+    op.drop_index(
+        'ix_effective_preferences_delivery',
+        table_name='effective_preferences')
+    op.drop_index(
+        op.f('ix_effective_preferences_delivery_status'),
+        table_name='effective_preferences')
+    op.drop_index(
+        op.f('ix_effective_preferences_email'),
+        table_name='effective_preferences')
+    op.drop_table('effective_preferences')
@@ -0,0 +1,48 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Mailing list roster versions
+
+Revision ID: 4bd8e1a7c3f0
+Revises: 3a2f2c5e9b1d
+Create Date: 2022-03-21 14:08:52.640193
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+from mailman.database.helpers import exists_in_db, is_sqlite
+
+
+# revision identifiers, used by Alembic.
+revision = '4bd8e1a7c3f0'
+down_revision = '3a2f2c5e9b1d'
+
+
+def upgrade():
+    if not exists_in_db(op.get_bind(), 'mailinglist', 'roster_version'):
+        # SQLite may not have removed it when downgrading.  Existing lists
+        # get their first roster version when their members next change.
+        op.add_column(
+            'mailinglist',
+            sa.Column('roster_version', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    if not is_sqlite(op.get_bind()):
+        # diffcov runs with SQLite so this isn't covered.
+        op.drop_column('mailinglist', 'roster_version')     # pragma: nocover
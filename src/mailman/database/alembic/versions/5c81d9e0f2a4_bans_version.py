@@ -0,0 +1,48 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Mailing list ban versions
+
+Revision ID: 5c81d9e0f2a4
+Revises: 4bd8e1a7c3f0
+Create Date: 2022-03-28 09:47:13.502861
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+from mailman.database.helpers import exists_in_db, is_sqlite
+
+
+# revision identifiers, used by Alembic.
+revision = '5c81d9e0f2a4'
+down_revision = '4bd8e1a7c3f0'
+
+
+def upgrade():
+    if not exists_in_db(op.get_bind(), 'mailinglist', 'bans_version'):
+        # SQLite may not have removed it when downgrading.  Existing lists
+        # get their first ban version when their bans next change.
+        op.add_column(
+            'mailinglist',
+            sa.Column('bans_version', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    if not is_sqlite(op.get_bind()):
+        # diffcov runs with SQLite so this isn't covered.
+        op.drop_column('mailinglist', 'bans_version')     # pragma: nocover
@@ -17,13 +17,14 @@
 
 """Common database support."""
 
+import time
 import logging
 
 from mailman.config import config
 from mailman.interfaces.database import IDatabase
 from mailman.utilities.string import expand
 from public import public
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
 from sqlalchemy.exc import PendingRollbackError
 from sqlalchemy.orm import scoped_session, sessionmaker
 from zope.interface import implementer
@@ -32,6 +33,47 @@ from zope.interface import implementer
 log = logging.getLogger('mailman.database')
 
 
+def _keep(session, obj):
+    # While the session keeps objects loaded, remember the objects of the
+    # read-mostly models, and when they were first kept.  The session's
+    # identity map only holds weak references, so they must be referenced
+    # here to survive until the next transaction.
+    kept = session.info.get('kept')
+    if kept is not None and getattr(obj, 'keep_loaded', False):
+        kept.setdefault(inspect(obj).key, (obj, time.monotonic()))
+
+
+def _expire_on_commit(session):
+    # While the session keeps objects loaded, it isn't expiring them on
+    # commit, so expire everything but the kept objects here.  Those are kept
+    # for at most the session's keep life, and their relationships to objects
+    # which aren't kept are expired.
+    life = session.info.get('keep_life')
+    if life is None:
+        return
+    kept = session.info['kept']
+    timestamp = time.monotonic()
+    for obj in list(session.identity_map.values()):
+        _keep(session, obj)
+        key = inspect(obj).key
+        if key in kept and timestamp - kept[key][1] >= life:
+            del kept[key]
+        if key not in kept:
+            session.expire(obj)
+    for key, (obj, since) in list(kept.items()):
+        if obj not in session:
+            # It was deleted or expunged.
+            del kept[key]
+            continue
+        relationships = [
+            relationship.key
+            for relationship in inspect(obj).mapper.relationships
+            if not getattr(relationship.mapper.class_, 'keep_loaded', False)
+            ]
+        if len(relationships) > 0:
+            session.expire(obj, relationships)
+
+
 @public
 @implementer(IDatabase)
 class SABaseDatabase:
@@ -91,8 +133,33 @@ class SABaseDatabase:
         return self.sessionmaker()
 
     def close_session(self):
+        self.store.info.pop('kept', None)
         self.store.close()
 
+    def keep_loaded(self, life):
+        """See `IDatabase`."""
+        store = self.store
+        self.expire_kept()
+        if life > 0:
+            store.expire_on_commit = False
+            store.info['keep_life'] = life
+            store.info['kept'] = {}
+        else:
+            store.expire_on_commit = True
+            store.info.pop('keep_life', None)
+            store.info.pop('kept', None)
+
+    def expire_kept(self):
+        """See `IDatabase`."""
+        store = self.store
+        kept = store.info.get('kept')
+        if kept is None:
+            return
+        for obj, since in kept.values():
+            if obj in store:
+                store.expire(obj)
+        kept.clear()
+
     def initialize(self, debug=None):
         """See `IDatabase`."""
         # Calculate the engine url.
@@ -121,5 +188,9 @@ class SABaseDatabase:
             poolclass=self.pool_class,
             future=True,
             )
-        self.sessionmaker = scoped_session(sessionmaker(
-            bind=self.engine, expire_on_commit=True, future=True))
+        session_factory = sessionmaker(
+            bind=self.engine, expire_on_commit=True, future=True)
+        event.listen(session_factory, 'loaded_as_persistent', _keep)
+        event.listen(session_factory, 'pending_to_persistent', _keep)
+        event.listen(session_factory, 'after_commit', _expire_on_commit)
+        self.sessionmaker = scoped_session(session_factory)
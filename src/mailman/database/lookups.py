@@ -0,0 +1,107 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Per-process caches of frequent database lookups.
+
+As a message moves through the queues, every runner and many handlers, rules
+and chains look up its mailing list by list-id, and its sender in the list's
+rosters.  These caches remember the primary keys that those lookups found, so
+that the rows can be fetched from the session's identity map, or else by
+primary key, instead of being searched for again.
+
+Only primary keys are cached, never the objects themselves, since sessions
+are per-thread and objects are expired at the end of each transaction.  The
+cached objects are checked before they are returned, so a key that is stale
+is just a cache miss.
+
+Knowing that an address is *not* a member can't be checked that way, so
+roster lookups are cached for a version of the list's roster.  Whenever any
+process changes the list's members, or the addresses they're subscribed
+with, the list gets a new roster version, and the lookups cached for the old
+one are no longer used.  Reading a list's roster version is a much cheaper
+query than looking up a member.
+
+Domains are looked up by their mail host for every message too, and are
+cached like mailing lists.
+
+Mailing lists' bans are cached the same way, for a version of the list's
+bans.  See mailman.model.bans.
+"""
+
+from lazr.config import as_timedelta
+from mailman.interfaces.configuration import ConfigurationUpdatedEvent
+from mailman.interfaces.domain import DomainDeletedEvent
+from mailman.interfaces.listmanager import ListDeletedEvent
+from mailman.interfaces.member import MembershipChangeEvent
+from mailman.utilities.lrucache import LRUCache
+from public import public
+
+
+# list-id -> MailingList.id
+mailing_lists = LRUCache()
+# mail host -> Domain.id
+domains = LRUCache()
+# (list-id, roster version, role, email) -> Member.id, or None for no
+# member.
+members = LRUCache()
+# list-id -> (bans version, BanSet), and None -> (global bans version,
+# BanSet) for the global bans.
+bans = LRUCache()
+
+
+@public
+def clear():
+    """Forget all the cached lookups."""
+    mailing_lists.clear()
+    domains.clear()
+    members.clear()
+    bans.clear()
+
+
+@public
+def handle_ConfigurationUpdatedEvent(event):
+    if isinstance(event, ConfigurationUpdatedEvent):
+        size = int(event.config.database.lookup_cache_size)
+        life = as_timedelta(
+            event.config.database.lookup_cache_life).total_seconds()
+        mailing_lists.resize(size, life)
+        domains.resize(size, life)
+        members.resize(size, life)
+        bans.resize(size, life)
+
+
+@public
+def handle_MembershipChangeEvent(event):
+    if isinstance(event, MembershipChangeEvent):
+        list_id = event.mlist.list_id
+        members.discard_if(lambda key: key[0] == list_id)
+
+
+@public
+def handle_ListDeletedEvent(event):
+    if isinstance(event, ListDeletedEvent):
+        listname, at, hostname = event.fqdn_listname.partition('@')
+        list_id = '{}.{}'.format(listname, hostname)
+        mailing_lists.discard(list_id)
+        members.discard_if(lambda key: key[0] == list_id)
+        bans.discard(list_id)
+
+
+@public
+def handle_DomainDeletedEvent(event):
+    if isinstance(event, DomainDeletedEvent):
+        domains.discard(event.mail_host)
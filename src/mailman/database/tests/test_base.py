@@ -0,0 +1,154 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Test keeping read-mostly objects loaded across transactions."""
+
+import time
+import unittest
+
+from mailman.app.lifecycle import create_list
+from mailman.config import config
+from mailman.interfaces.domain import IDomainManager
+from mailman.interfaces.listmanager import IListManager
+from mailman.model.mailinglist import MailingList
+from mailman.testing.helpers import subscribe
+from mailman.testing.layers import ConfigLayer
+from sqlalchemy import event, update
+from unittest.mock import patch
+from zope.component import getUtility
+
+
+class TestKeepLoaded(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('ant@example.com')
+        self._anne = subscribe(self._mlist, 'Anne')
+        config.db.commit()
+        self._list_manager = getUtility(IListManager)
+        self._statements = []
+        engine = config.db.engine
+        event.listen(engine, 'before_cursor_execute', self._count)
+        self.addCleanup(
+            event.remove, engine, 'before_cursor_execute', self._count)
+
+    def _count(self, connection, cursor, statement, *args):
+        self._statements.append(statement)
+
+    def _use_list(self):
+        # What a runner does with the mailing list of each message.
+        mlist = self._list_manager.get_by_list_id('ant.example.com')
+        return mlist.display_name, mlist.domain.mail_host
+
+    def test_expired_on_commit(self):
+        self._use_list()
+        config.db.commit()
+        del self._statements[:]
+        self.assertEqual(self._use_list(), ('Ant', 'example.com'))
+        self.assertNotEqual(self._statements, [])
+
+    def test_kept(self):
+        config.db.keep_loaded(60)
+        self._use_list()
+        config.db.commit()
+        del self._statements[:]
+        self.assertEqual(self._use_list(), ('Ant', 'example.com'))
+        self.assertEqual(self._statements, [])
+
+    def test_others_expired(self):
+        config.db.keep_loaded(60)
+        self._anne.address.email
+        config.db.commit()
+        del self._statements[:]
+        self._anne.address.email
+        self.assertNotEqual(self._statements, [])
+
+    def test_relationships_expired(self):
+        config.db.keep_loaded(60)
+        domain = self._mlist.domain
+        self.assertEqual(list(domain.owners), [])
+        config.db.commit()
+        del self._statements[:]
+        self.assertEqual(domain.mail_host, 'example.com')
+        self.assertEqual(self._statements, [])
+        self.assertEqual(list(domain.owners), [])
+        self.assertNotEqual(self._statements, [])
+
+    def test_kept_changes_not_seen(self):
+        # Changes made by other processes aren't seen until the kept objects
+        # are expired.
+        config.db.keep_loaded(60)
+        self._use_list()
+        config.db.commit()
+        with config.db.engine.begin() as connection:
+            connection.execute(update(MailingList).values(display_name='Bee'))
+        self.assertEqual(self._use_list(), ('Ant', 'example.com'))
+        config.db.expire_kept()
+        self.assertEqual(self._use_list(), ('Bee', 'example.com'))
+
+    def test_expired_after_life(self):
+        config.db.keep_loaded(60)
+        self._use_list()
+        config.db.commit()
+        later = time.monotonic() + 61
+        with patch('mailman.database.base.time.monotonic',
+                   return_value=later):
+            config.db.commit()
+        del self._statements[:]
+        self._use_list()
+        self.assertNotEqual(self._statements, [])
+
+    def test_expired_on_abort(self):
+        config.db.keep_loaded(60)
+        self._use_list()
+        config.db.commit()
+        self._mlist.display_name = 'Bee'
+        config.db.abort()
+        self.assertEqual(self._use_list(), ('Ant', 'example.com'))
+
+    def test_own_changes_kept(self):
+        config.db.keep_loaded(60)
+        self._use_list()
+        self._mlist.display_name = 'Bee'
+        config.db.commit()
+        del self._statements[:]
+        self.assertEqual(self._use_list(), ('Bee', 'example.com'))
+        self.assertEqual(self._statements, [])
+
+    def test_deleted_list_not_kept(self):
+        config.db.keep_loaded(60)
+        self._use_list()
+        self._list_manager.delete(self._mlist)
+        config.db.commit()
+        kept = [obj for obj, since in config.db.store.info['kept'].values()]
+        self.assertEqual(kept, [getUtility(IDomainManager)['example.com']])
+        self.assertIsNone(
+            self._list_manager.get_by_list_id('ant.example.com'))
+
+    def test_stop_keeping(self):
+        config.db.keep_loaded(60)
+        self._use_list()
+        config.db.commit()
+        config.db.keep_loaded(0)
+        self.assertNotIn('kept', config.db.store.info)
+        del self._statements[:]
+        self._use_list()
+        self.assertNotEqual(self._statements, [])
+        config.db.commit()
+        del self._statements[:]
+        self._use_list()
+        self.assertNotEqual(self._statements, [])
@@ -0,0 +1,207 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Test the cached database lookups."""
+
+import unittest
+
+from mailman.app.lifecycle import create_list
+from mailman.config import config
+from mailman.database import lookups
+from mailman.interfaces.domain import IDomainManager
+from mailman.interfaces.listmanager import IListManager
+from mailman.interfaces.member import MemberRole
+from mailman.interfaces.usermanager import IUserManager
+from mailman.model.address import Address
+from mailman.model.mailinglist import MailingList
+from mailman.model.member import Member
+from mailman.testing.helpers import configuration, subscribe
+from mailman.testing.layers import ConfigLayer
+from mailman.utilities.datetime import now
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from zope.component import getUtility
+
+
+class TestLookups(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('ant@example.com')
+        self._list_manager = getUtility(IListManager)
+        self._anne = subscribe(self._mlist, 'Anne')
+        self._statements = []
+        engine = config.db.engine
+        event.listen(engine, 'before_cursor_execute', self._count)
+        self.addCleanup(
+            event.remove, engine, 'before_cursor_execute', self._count)
+
+    def _count(self, connection, cursor, statement, *args):
+        self._statements.append(statement)
+
+    def test_list_cached(self):
+        self.assertEqual(
+            self._list_manager.get_by_list_id('ant.example.com'), self._mlist)
+        del self._statements[:]
+        self.assertEqual(
+            self._list_manager.get_by_list_id('ant.example.com'), self._mlist)
+        self.assertEqual(self._statements, [])
+
+    def test_missing_list_not_cached(self):
+        self.assertIsNone(self._list_manager.get_by_list_id('bee.example.com'))
+        bee = create_list('bee@example.com')
+        self.assertEqual(self._list_manager.get_by_list_id('bee.example.com'),
+                         bee)
+
+    def test_deleted_list(self):
+        self._list_manager.get_by_list_id('ant.example.com')
+        self._list_manager.delete(self._mlist)
+        self.assertNotIn('ant.example.com', lookups.mailing_lists)
+        self.assertIsNone(self._list_manager.get_by_list_id('ant.example.com'))
+
+    def test_stale_list(self):
+        # A list that was deleted by another process is a cache miss.
+        self._list_manager.get_by_list_id('ant.example.com')
+        lookups.mailing_lists['bee.example.com'] = self._mlist.id
+        self.assertIsNone(self._list_manager.get_by_list_id('bee.example.com'))
+        self.assertNotIn('bee.example.com', lookups.mailing_lists)
+
+    def test_domain_cached(self):
+        domain_manager = getUtility(IDomainManager)
+        domain = domain_manager.get('example.com')
+        del self._statements[:]
+        self.assertEqual(domain_manager.get('example.com'), domain)
+        self.assertEqual(self._statements, [])
+
+    def test_deleted_domain(self):
+        domain_manager = getUtility(IDomainManager)
+        domain_manager.get('example.com')
+        self._list_manager.delete(self._mlist)
+        domain_manager.remove('example.com')
+        self.assertNotIn('example.com', lookups.domains)
+        self.assertIsNone(domain_manager.get('example.com'))
+
+    def test_member_cached(self):
+        members = self._mlist.members
+        self.assertEqual(members.get_member('aperson@example.com'),
+                         self._anne)
+        del self._statements[:]
+        self.assertEqual(members.get_member('aperson@example.com'),
+                         self._anne)
+        # Only the roster version is read.
+        self.assertEqual(len(self._statements), 1)
+        self.assertIn('roster_version', self._statements[0])
+        # The roles are cached separately.
+        self.assertIsNone(
+            self._mlist.owners.get_member('aperson@example.com'))
+
+    def test_member_cached_any_case(self):
+        members = self._mlist.members
+        self.assertEqual(members.get_member('aperson@example.com'),
+                         self._anne)
+        del self._statements[:]
+        self.assertEqual(members.get_member('APerson@Example.com'),
+                         self._anne)
+        self.assertEqual(len(self._statements), 1)
+        self.assertIn('roster_version', self._statements[0])
+
+    def test_nonmember_cached(self):
+        members = self._mlist.members
+        self.assertIsNone(members.get_member('bperson@example.com'))
+        del self._statements[:]
+        self.assertIsNone(members.get_member('bperson@example.com'))
+        self.assertEqual(len(self._statements), 1)
+        self.assertIn('roster_version', self._statements[0])
+
+    def test_subscribe(self):
+        # Subscribing drops the cached nonmembers.
+        self.assertIsNone(
+            self._mlist.members.get_member('bperson@example.com'))
+        bart = subscribe(self._mlist, 'Bart')
+        self.assertEqual(
+            self._mlist.members.get_member('bperson@example.com'), bart)
+
+    def test_unsubscribe(self):
+        self._mlist.members.get_member('aperson@example.com')
+        self._anne.unsubscribe()
+        self.assertIsNone(
+            self._mlist.members.get_member('aperson@example.com'))
+
+    def test_preferred_address(self):
+        # Cached members are found by their current address.
+        bart = subscribe(self._mlist, 'Bart', as_user=True)
+        self.assertEqual(
+            self._mlist.members.get_member('bperson@example.com'), bart)
+        address = getUtility(IUserManager).create_address(
+            'bart@example.org')
+        address.verified_on = now()
+        bart.user.link(address)
+        bart.user.preferred_address = address
+        self.assertIsNone(
+            self._mlist.members.get_member('bperson@example.com'))
+        self.assertEqual(
+            self._mlist.members.get_member('bart@example.org'), bart)
+
+    def test_subscribers_not_cached(self):
+        self._mlist.subscribe(self._anne.address, MemberRole.owner)
+        self._mlist.subscribers.get_member('aperson@example.com')
+        self.assertEqual(len(lookups.members), 0)
+
+    @configuration('database', lookup_cache_size=0)
+    def test_disabled(self):
+        self._list_manager.get_by_list_id('ant.example.com')
+        self._mlist.members.get_member('aperson@example.com')
+        self.assertEqual(len(lookups.mailing_lists), 0)
+        self.assertEqual(len(lookups.members), 0)
+
+    def _roster_version(self):
+        config.db.store.flush()
+        return config.db.store.query(MailingList._roster_version).filter(
+            MailingList._list_id == 'ant.example.com').scalar()
+
+    def test_roster_version(self):
+        # The roster version changes whenever the list's members change.
+        versions = [self._roster_version()]
+        bart = subscribe(self._mlist, 'Bart', as_user=True)
+        versions.append(self._roster_version())
+        address = getUtility(IUserManager).create_address(
+            'bart@example.org')
+        address.verified_on = now()
+        bart.user.link(address)
+        bart.user.preferred_address = address
+        versions.append(self._roster_version())
+        self._anne.unsubscribe()
+        versions.append(self._roster_version())
+        self.assertEqual(len(set(versions)), 4)
+        # Other lists aren't affected.
+        bee = create_list('bee@example.com')
+        subscribe(bee, 'Cris')
+        self.assertEqual(self._roster_version(), versions[-1])
+
+    def test_changed_elsewhere(self):
+        self.assertIsNone(
+            self._mlist.members.get_member('bperson@example.com'))
+        config.db.commit()
+        # Another process subscribes Bart, so there's no event for it in this
+        # process.
+        session = Session(bind=config.db.engine)
+        address = Address('bperson@example.com', 'Bart Person')
+        session.add(Member(MemberRole.member, 'ant.example.com', address))
+        session.commit()
+        session.close()
+        member = self._mlist.members.get_member('bperson@example.com')
+        self.assertEqual(member.address.email, 'bperson@example.com')
@@ -31,10 +31,11 @@ from mailman.database.transaction import transaction
 from mailman.database.types import Enum, SAUnicode
 from mailman.interfaces.action import Action
 from mailman.interfaces.cache import ICacheManager
-from mailman.interfaces.member import MemberRole
+from mailman.interfaces.member import DeliveryMode, DeliveryStatus, MemberRole
 from mailman.interfaces.template import ITemplateManager
 from mailman.interfaces.usermanager import IUserManager
 from mailman.testing.layers import ConfigLayer
+from mailman.utilities.datetime import now
 from sqlalchemy import text
 from warnings import catch_warnings, simplefilter
 from zope.component import getUtility
@@ -512,3 +513,50 @@ class TestMigrations(unittest.TestCase):
         # Test that if the database already has member_roster_visibility filed,
         # then make sure that we can ugprade.
         alembic.command.upgrade(alembic_cfg, '15401063d4e3')
+
+    def test_3a2f2c5e9b1d_effective_preferences(self):
+        effective_table = sa.sql.table(
+            'effective_preferences',
+            sa.sql.column('member_id', sa.Integer),
+            sa.sql.column('email', SAUnicode),
+            sa.sql.column('preferred_language', SAUnicode),
+            sa.sql.column('delivery_mode', Enum(DeliveryMode)),
+            sa.sql.column('delivery_status', Enum(DeliveryStatus)),
+            )
+        user_manager = getUtility(IUserManager)
+        with transaction():
+            ant = create_list('ant@example.com')
+            # Anne is subscribed with her address, and prefers digests.
+            anne = user_manager.create_address('anne@example.com')
+            anne.preferences.delivery_mode = DeliveryMode.plaintext_digests
+            anne_member = ant.subscribe(anne)
+            # Bart is subscribed as a user, who disabled his own delivery.
+            bart = user_manager.create_user('bart@example.com')
+            bart.addresses[0].verified_on = now()
+            bart.preferred_address = bart.addresses[0]
+            bart.preferences.preferred_language = 'fr'
+            bart_member = ant.subscribe(bart)
+            bart_member.preferences.delivery_status = (
+                DeliveryStatus.by_user)
+            # Cris is subscribed as a user without a preferred address.
+            cris = user_manager.create_user('cris@example.com')
+            cris.addresses[0].verified_on = now()
+            cris.preferred_address = cris.addresses[0]
+            cris_member = ant.subscribe(cris)
+            del cris.preferred_address
+        # Start at the previous revision, then upgrade again.
+        alembic.command.downgrade(alembic_cfg, '98224512c9c2')
+        self.assertFalse(
+            exists_in_db(config.db.engine, 'effective_preferences'))
+        alembic.command.upgrade(alembic_cfg, '3a2f2c5e9b1d')
+        rows = config.db.store.execute(
+            effective_table.select().order_by(
+                effective_table.c.member_id)).fetchall()
+        self.assertEqual(rows, [
+            (anne_member.id, 'anne@example.com', None,
+             DeliveryMode.plaintext_digests, DeliveryStatus.enabled),
+            (bart_member.id, 'bart@example.com', 'fr',
+             DeliveryMode.regular, DeliveryStatus.by_user),
+            (cris_member.id, None, None,
+             DeliveryMode.regular, DeliveryStatus.enabled),
+            ])
@@ -67,6 +67,42 @@ class Message(email.message.Message):
             value = email.message.Message.as_string(self).encode('utf-8')
         return value
 
+    def __getstate__(self):
+        # Don't pickle the cached senders.
+        values = self.__dict__.copy()
+        values.pop('_senders', None)
+        return values
+
+    def _senders_changed(self, name):
+        # Forget the cached senders when one of their headers changes.
+        if ('_senders' in self.__dict__ and
+                name.lower() in config.mailman.sender_headers.lower().split()):
+            del self.__dict__['_senders']
+
+    def __setitem__(self, name, val):
+        self._senders_changed(name)
+        super().__setitem__(name, val)
+
+    def __delitem__(self, name):
+        self._senders_changed(name)
+        super().__delitem__(name)
+
+    def add_header(self, _name, _value, **_params):
+        self._senders_changed(_name)
+        super().add_header(_name, _value, **_params)
+
+    def replace_header(self, _name, _value):
+        self._senders_changed(_name)
+        super().replace_header(_name, _value)
+
+    def set_raw(self, name, value):
+        self._senders_changed(name)
+        super().set_raw(name, value)
+
+    def set_unixfrom(self, unixfrom):
+        self.__dict__.pop('_senders', None)
+        super().set_unixfrom(unixfrom)
+
     @property
     def sender(self):
         """The address considered to be the author of the email.
@@ -77,11 +113,7 @@ class Message(email.message.Message):
             string if no sender address was found.
         :rtype: email address
         """
-        for address in self.senders:
-            # This could be None or the empty string.
-            if address:
-                return address
-        return ''
+        return self._get_senders()[1]
 
     @property
     def senders(self):
@@ -101,13 +133,33 @@ class Message(email.message.Message):
         originator headers above can appear multiple times in the message, or
         contain multiple values.
 
+        The senders are only found the first time they're asked for, and
+        again whenever their headers are changed through this interface.
+
         :return: The list of email addresses that can be considered the sender
             of the message.
         :rtype: A list of email addresses or Nones
         """
+        return list(self._get_senders()[2])
+
+    def _get_senders(self):
+        # Return the sender headers the senders were found for, the sender
+        # and the senders.  The cache is in the instance dictionary, so that
+        # looking for it doesn't parse a LazyMessage.
+        sender_headers = config.mailman.sender_headers
+        cached = self.__dict__.get('_senders')
+        if cached is None or cached[0] != sender_headers:
+            senders = tuple(self._find_senders(sender_headers))
+            # The senders are never None or the empty string.
+            sender = senders[0] if len(senders) > 0 else ''
+            cached = self.__dict__['_senders'] = (
+                sender_headers, sender, senders)
+        return cached
+
+    def _find_senders(self, sender_headers):
         envelope_sender = self.get_unixfrom()
         senders = []
-        for header in config.mailman.sender_headers.split():
+        for header in sender_headers.split():
             header = header.lower()
             if header == 'from_':
                 senders.append(envelope_sender.lower()
@@ -139,6 +191,36 @@ class Message(email.message.Message):
         return clean_senders
 
 
+@public
+class LazyMessage(Message):
+    """A message which is only parsed when it is first used.
+
+    Until then, the message is just its raw bytes.  Any other attributes, such
+    as `original_size`, can be set and read without parsing the message.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        # This is only called for attributes which the instance doesn't have.
+        # Until the message is parsed, that includes all the state set up by
+        # email.message.Message.__init__(), so the first use of anything but
+        # our own attributes parses the message.  Special names are looked up
+        # by pickle and copy, which mustn't parse the message.
+        if name.startswith('__') or '_raw' not in self.__dict__:
+            raise AttributeError(name)
+        parsed = email.message_from_bytes(self.__dict__.pop('_raw'), Message)
+        for key, value in vars(parsed).items():
+            self.__dict__.setdefault(key, value)
+        return getattr(self, name)
+
+    @property
+    def unparsed(self):
+        """The raw bytes of the message, or None once it has been parsed."""
+        return self.__dict__.get('_raw')
+
+
 @public
 class MultipartDigestMessage(MIMEMultipart, Message):
     """Mix-in class for MIME digest messages."""
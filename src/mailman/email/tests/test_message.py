@@ -18,6 +18,7 @@
 """Test the message API."""
 
 import sys
+import pickle
 import unittest
 
 from email import message_from_binary_file
@@ -26,12 +27,14 @@ from email.parser import FeedParser
 from email.utils import _has_surrogates
 from importlib_resources import path
 from mailman.app.lifecycle import create_list
-from mailman.email.message import Message, UserNotification
+from mailman.email.message import LazyMessage, Message, UserNotification
 from mailman.testing.helpers import (
+    configuration,
     get_queue_messages,
     specialized_message_from_string as mfs,
 )
 from mailman.testing.layers import ConfigLayer
+from unittest.mock import patch
 
 
 class TestMessage(unittest.TestCase):
@@ -184,3 +187,113 @@ Message with \u201cNon-ascii\u201d.
                 fp.seek(0)
                 text = fp.read().decode('ascii', 'replace')
         self.assertEqual(msg.as_string(), text)
+
+
+class TestSenders(unittest.TestCase):
+    """Test that the senders are cached until their headers change."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._msg = mfs("""\
+From: Anne <anne@example.com>
+Reply-To: Bart <bart@example.com>
+To: test@example.com
+Subject: senders
+
+""")
+        self._finds = 0
+        find_senders = Message._find_senders
+
+        def counting(msg, sender_headers):
+            self._finds += 1
+            return find_senders(msg, sender_headers)
+
+        patcher = patch.object(Message, '_find_senders', counting)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cached(self):
+        self.assertEqual(self._msg.senders,
+                         ['anne@example.com', 'bart@example.com'])
+        self.assertEqual(self._msg.sender, 'anne@example.com')
+        self.assertEqual(self._msg.senders,
+                         ['anne@example.com', 'bart@example.com'])
+        self.assertEqual(self._finds, 1)
+
+    def test_returned_list(self):
+        # Changing the list of senders doesn't change the cached senders.
+        self._msg.senders.append('cris@example.com')
+        self.assertEqual(self._msg.senders,
+                         ['anne@example.com', 'bart@example.com'])
+
+    def test_other_headers(self):
+        self._msg.senders
+        self._msg['X-Mailman-Rule-Hits'] = 'banned-address'
+        del self._msg['subject']
+        self._msg.add_header('X-Foo', 'bar')
+        self.assertEqual(self._msg.sender, 'anne@example.com')
+        self.assertEqual(self._finds, 1)
+
+    def test_set_header(self):
+        self._msg.senders
+        self._msg['Sender'] = 'cris@example.com'
+        self.assertEqual(
+            self._msg.senders,
+            ['anne@example.com', 'bart@example.com', 'cris@example.com'])
+
+    def test_delete_header(self):
+        self._msg.senders
+        del self._msg['from']
+        self.assertEqual(self._msg.sender, 'bart@example.com')
+
+    def test_replace_header(self):
+        self._msg.senders
+        self._msg.replace_header('FROM', 'cris@example.com')
+        self.assertEqual(self._msg.sender, 'cris@example.com')
+
+    def test_add_header(self):
+        self._msg.senders
+        self._msg.add_header('Sender', 'cris@example.com')
+        self.assertEqual(self._msg.senders[-1], 'cris@example.com')
+
+    def test_set_raw(self):
+        self._msg.senders
+        self._msg.set_raw('Sender', 'cris@example.com')
+        self.assertEqual(self._msg.senders[-1], 'cris@example.com')
+
+    def test_set_unixfrom(self):
+        del self._msg['from']
+        self.assertEqual(self._msg.sender, 'bart@example.com')
+        self._msg.set_unixfrom('cris@example.com')
+        self.assertEqual(self._msg.sender, 'cris@example.com')
+
+    def test_sender_headers_changed(self):
+        self.assertEqual(self._msg.sender, 'anne@example.com')
+        with configuration('mailman', sender_headers='reply-to from'):
+            self.assertEqual(self._msg.sender, 'bart@example.com')
+        self.assertEqual(self._msg.sender, 'anne@example.com')
+
+    def test_no_senders(self):
+        del self._msg['from']
+        del self._msg['reply-to']
+        self.assertEqual(self._msg.senders, [])
+        self.assertEqual(self._msg.sender, '')
+        self.assertEqual(self._finds, 1)
+
+    def test_not_pickled(self):
+        self._msg.senders
+        msg = pickle.loads(pickle.dumps(self._msg))
+        self.assertNotIn('_senders', vars(msg))
+        self.assertEqual(msg.sender, 'anne@example.com')
+
+    def test_lazy_message(self):
+        # The message isn't parsed just to look for its cached senders, but
+        # they're cached once it is.
+        msg = LazyMessage(self._msg.as_bytes())
+        self.assertIsNone(msg.__dict__.get('_senders'))
+        self.assertIsNotNone(msg.unparsed)
+        self.assertEqual(msg.sender, 'anne@example.com')
+        self.assertIsNone(msg.unparsed)
+        self.assertEqual(msg.sender, 'anne@example.com')
+        self.assertEqual(self._finds, 1)
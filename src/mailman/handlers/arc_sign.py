@@ -15,16 +15,35 @@
 # You should have received a copy of the GNU General Public License along with
 # GNU Mailman.  If not, see <http://www.gnu.org/licenses/>.
 
-"""Perform authentication checks and adds headers to outgoing message"""
+"""Perform authentication checks and adds headers to outgoing message
 
+Signing is expensive: the message is flattened, canonicalized, hashed and
+signed with RSA twice, for the ARC-Message-Signature and the ARC-Seal.  When
+a message is delivered individually, most recipients often get the same
+signed content, e.g. when only the envelope sender differs for VERP.  The
+signatures are therefore cached by the signing parameters, the canonicalized
+headers which are signed and sealed, and a hash of the canonicalized body, so
+that identical content is signed only once.
+
+Signing can also be offloaded to a pool of processes, so that individual
+delivery can go on crafting and sending messages while the signatures are
+calculated.  See `mailman.mta.arc_signing`.
+"""
+
+import hashlib
 import logging
 
 from authheaders import sign_message
-from dkim import DKIMException
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from dkim import DKIMException, rfc822_parse
+from dkim.canonicalization import CanonicalizationPolicy
+from lazr.config import as_timedelta
 from mailman.config import config
 from mailman.core.i18n import _
 from mailman.handlers.validate_authenticity import prepend_headers
+from mailman.interfaces.configuration import ConfigurationUpdatedEvent
 from mailman.interfaces.handler import IHandler
+from mailman.utilities.lrucache import LRUCache
 from public import public
 from zope.interface import implementer
 
@@ -34,27 +53,170 @@ timestamp = None
 
 log = logging.getLogger('mailman.error')
 
+# Besides the configured headers, these are signed or sealed.
+ARC_HEADERS = frozenset({
+    b'arc-authentication-results',
+    b'arc-message-signature',
+    b'arc-seal',
+    b'authentication-results',
+    })
+RELAXED = CanonicalizationPolicy.from_c_value(b'relaxed/relaxed')
+
+# signing key -> the signature headers
+signatures = LRUCache()
+# The pool of signing processes, if signing is offloaded.
+_pool = None
+
+
+@public
+def handle_ConfigurationUpdatedEvent(event):
+    global _pool
+    if isinstance(event, ConfigurationUpdatedEvent):
+        signatures.resize(
+            int(event.config.ARC.sign_cache_size),
+            as_timedelta(event.config.ARC.sign_cache_life).total_seconds())
+        # The pool is started again with the new settings when it's needed.
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+@public
+def get_pool():
+    """Return the pool of signing processes.
+
+    :return: The pool, or None when messages are signed in this process.
+    :rtype: `concurrent.futures.ProcessPoolExecutor`
+    """
+    global _pool
+    processes = int(config.ARC.sign_processes)
+    if processes <= 0:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=processes)
+    return _pool
+
+
+def _discard_pool(pool):
+    # A pool breaks when one of its processes dies, after which it can't be
+    # used again.  Shut it down, so that get_pool() starts a new one.
+    global _pool
+    pool.shutdown(wait=False)
+    if _pool is pool:
+        _pool = None
+
+
+def _sign(raw, selector, domain, privkey, sig_headers, srv_id,
+          timestamp, standardize):
+    # Return the signature headers of a flattened message.  This can run in
+    # another process, so everything it needs is passed to it.
+    sig = sign_message(raw, selector, domain, privkey, sig_headers, 'ARC',
+                       srv_id, timestamp=timestamp, standardize=standardize)
+    return [tuple(x.decode('utf-8').split(': ', 1)) for x in sig]
+
+
+def _signing_key(raw, args):
+    # The signatures only depend on the signing parameters, the headers
+    # which are signed or sealed, and the body.  Canonicalizing them the way
+    # the signer does means that differences which don't change the
+    # signatures, e.g. in folding, don't change the key either.
+    headers, body = rfc822_parse(raw)
+    sig_headers = set(config.arc.headers)
+    signed = [(name, value) for name, value in headers
+              if name.lower() in sig_headers or name.lower() in ARC_HEADERS]
+    key = hashlib.sha256(repr(args).encode('utf-8'))
+    for name, value in RELAXED.canonicalize_headers(signed):
+        key.update(name + b':' + value)
+    key.update(hashlib.sha256(RELAXED.canonicalize_body(body)).digest())
+    return key.hexdigest()
+
+
+@public
+class Signature:
+    """The ARC signature of a message, which may still be calculated."""
+
+    def __init__(self, msg, msgdata, pool=None):
+        """Start signing a message.
+
+        The signature is taken from the cache, or else calculated in this
+        process, or in the pool if one is given.
+
+        :param msg: The message to sign.
+        :type msg: `Message`
+        :param msgdata: The message metadata.
+        :type msgdata: dictionary
+        :param pool: The pool of signing processes, or None.
+        :type pool: `concurrent.futures.Executor`
+        """
+        self._message_id = msg['Message-ID']
+        self._future = None
+        self._pool = None
+        self._args = None
+        self.headers = None
+        # Since the underlying `sign_message` expects bytes for all the
+        # fields, we will encode all the parameters.
+        raw = msg.as_bytes()
+        args = (config.arc.selector, config.arc.domain, config.arc.private_key,
+                config.arc.headers, config.arc.authserv_id.encode(),
+                timestamp, 'ARC-Standardize' in msgdata)
+        self._key = _signing_key(raw, args)
+        self.headers = signatures.get(self._key)
+        if self.headers is not None:
+            return
+        if pool is not None:
+            try:
+                self._future = pool.submit(_sign, raw, *args)
+            except Exception as error:
+                self._pool_failed(pool, error)
+            else:
+                # Keep what's needed to sign the message in this process,
+                # in case the pool fails to.
+                self._pool = pool
+                self._args = (raw,) + args
+                return
+        self._signed(_sign, raw, *args)
+
+    def _pool_failed(self, pool, error):
+        log.exception('Failed to sign message in the pool, '
+                      'signing it in this process: %s', self._message_id)
+        if isinstance(error, BrokenExecutor):
+            _discard_pool(pool)
+
+    def _signed(self, function, *args):
+        try:
+            self.headers = function(*args)
+        except DKIMException:
+            log.exception('Failed to sign message: %s', self._message_id)
+            self.headers = []
+            return
+        signatures[self._key] = self.headers
+
+    def apply(self, msg):
+        """Prepend the signature headers to the message.
+
+        This waits for the signature, if it's being calculated in the pool.
+
+        :param msg: The message that was signed.
+        :type msg: `Message`
+        """
+        if self._future is not None:
+            future = self._future
+            self._future = None
+            try:
+                # A failure to sign is handled here, so anything else that's
+                # raised is a failure of the pool.
+                self._signed(future.result)
+            except Exception as error:
+                self._pool_failed(self._pool, error)
+                self._signed(_sign, *self._args)
+            self._pool = self._args = None
+        if len(self.headers) > 0:
+            prepend_headers(msg, self.headers)
+
 
 def sign(msg, msgdata):
     """ARC sign a message, and prepend the signature headers to the message."""
-    try:
-        # Since the underlying `sign_message` expects bytes for all the fields,
-        # we will encode all the parameters.
-        sig = sign_message(msg.as_bytes(),
-                           config.arc.selector,
-                           config.arc.domain,
-                           config.arc.private_key,
-                           config.arc.headers,
-                           'ARC',
-                           config.arc.authserv_id.encode(),
-                           timestamp=timestamp,
-                           standardize=('ARC-Standardize' in msgdata))
-    except DKIMException:
-        log.exception('Failed to sign message: %s', msg['Message-ID'])
-        return
-
-    headers = [x.decode('utf-8').split(': ', 1) for x in sig]
-    prepend_headers(msg, headers)
+    Signature(msg, msgdata).apply(msg)
 
 
 @public
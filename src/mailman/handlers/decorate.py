@@ -17,7 +17,6 @@
 
 """Decorate a message by sticking the header and footer around it."""
 
-import re
 import copy
 import logging
 
@@ -28,7 +27,7 @@ from mailman.core.i18n import _
 from mailman.interfaces.handler import IHandler
 from mailman.interfaces.mailinglist import IListArchiverSet
 from mailman.interfaces.template import ITemplateLoader
-from mailman.utilities.string import expand
+from mailman.utilities.string import compile_template, expand
 from public import public
 from zope.component import getUtility
 from zope.interface import implementer
@@ -37,6 +36,29 @@ from zope.interface import implementer
 log = logging.getLogger('mailman.error')
 alog = logging.getLogger('mailman.archiver')
 
+# The mailing list attributes that headers and footers can use, besides the
+# standard list-specific substitutions.
+DECORATION_ATTRIBUTES = (
+    'fqdn_listname',
+    'list_name',
+    'mail_host',
+    'display_name',
+    'request_address',
+    'description',
+    'info',
+    )
+
+# The names of the substitutions calculated by member_substitutions().
+MEMBER_SUBSTITUTIONS = (
+    'member',
+    'user_email',
+    'user_delivered_to',
+    'user_language',
+    'user_name',
+    'user_name_or_address',
+    'user_address',
+    )
+
 
 def process(mlist, msg, msgdata):
     """Decorate the message with headers and footers."""
@@ -50,24 +72,7 @@ def process(mlist, msg, msgdata):
     d = {}
     member = msgdata.get('member')
     if member is not None:
-        # Calculate the extra personalization dictionary.
-        # member.subscriber can be a User instance or an Address instance, and
-        # member.address can be None and so can member._user.preferred_address.
-        if member._address is not None:
-            _address = member._address
-        else:
-            _address = (member._user.preferred_address or
-                        list(member._user.addresses)[0])
-        recipient = msgdata.get('recipient', _address.original_email)
-        d['member'] = formataddr(
-            (_address.display_name, _address.email))
-        d['user_email'] = recipient
-        d['user_delivered_to'] = _address.original_email
-        d['user_language'] = member.preferred_language.description
-        d['user_name'] = member.display_name
-        d['user_name_or_address'] = member.display_name or recipient
-        # For backward compatibility.
-        d['user_address'] = recipient
+        d.update(member_substitutions(member, msgdata.get('recipient')))
     # Calculate the archiver permalink substitution variables.  This provides
     # the $<archive-name>_url placeholder for every enabled archiver.
     for archiver in IListArchiverSet(mlist).archivers:
@@ -203,6 +208,41 @@ def process(mlist, msg, msgdata):
     msg['Content-Type'] = 'multipart/mixed'
 
 
+@public
+def member_substitutions(member, recipient=None):
+    """Calculate the extra personalization dictionary for a member.
+
+    :param member: The member the message is being delivered to.
+    :type member: `IMember`
+    :param recipient: The address the message is being delivered to.  It
+        defaults to the member's subscribed address.
+    :type recipient: string
+    :return: The substitutions, keyed by the names in
+        `MEMBER_SUBSTITUTIONS`.
+    :rtype: dict
+    """
+    # member.subscriber can be a User instance or an Address instance, and
+    # member.address can be None and so can member._user.preferred_address.
+    if member._address is not None:
+        _address = member._address
+    else:
+        _address = (member._user.preferred_address or
+                    list(member._user.addresses)[0])
+    if recipient is None:
+        recipient = _address.original_email
+    d = {}
+    d['member'] = formataddr(
+        (_address.display_name, _address.email))
+    d['user_email'] = recipient
+    d['user_delivered_to'] = _address.original_email
+    d['user_language'] = member.preferred_language.description
+    d['user_name'] = member.display_name
+    d['user_name_or_address'] = member.display_name or recipient
+    # For backward compatibility.
+    d['user_address'] = recipient
+    return d
+
+
 @public
 def decorate(name, mlist, extradict=None):
     """Expand the named decoration template uri."""
@@ -217,24 +257,21 @@ def decorate(name, mlist, extradict=None):
 def decorate_template(mlist, template, extradict=None):
     """Expand the decoration template."""
     # Create a dictionary which includes the default set of interpolation
-    # variables allowed in headers and footers.  These will be augmented by
-    # any key/value pairs in the extradict.
+    # variables allowed in headers and footers, but only those the template
+    # uses, since it's decorated for every recipient of personalized
+    # messages.  These will be augmented by any key/value pairs in the
+    # extradict.
+    names = compile_template(template).names
     substitutions = {
         key: getattr(mlist, key)
-        for key in ('fqdn_listname',
-                    'list_name',
-                    'mail_host',
-                    'display_name',
-                    'request_address',
-                    'description',
-                    'info',
-                    )
+        for key in DECORATION_ATTRIBUTES
+        if key in names
         }
     if extradict is not None:
         substitutions.update(extradict)
     text = expand(template, mlist, substitutions)
     # Turn any \r\n line endings into just \n
-    return re.sub(r'\r\n', r'\n', text)
+    return text.replace('\r\n', '\n')
 
 
 @public
@@ -26,7 +26,6 @@ SendmailDeliver and BulkDeliver modules.
 from mailman.config import config
 from mailman.core.i18n import _
 from mailman.interfaces.handler import IHandler
-from mailman.interfaces.member import DeliveryStatus
 from mailman.interfaces.pipeline import RejectMessage
 from mailman.utilities.string import wrap
 from public import public
@@ -81,9 +80,7 @@ attached.
 """)
                 raise RejectMessage(wrap(text))
         # Calculate the regular recipients of the message
-        recipients = set(member.address.email
-                         for member in mlist.regular_members.members
-                         if member.delivery_status == DeliveryStatus.enabled)
+        recipients = mlist.regular_members.get_recipients()
         # Remove the sender if they don't want to receive their own posts
         if not include_sender and member.address.email in recipients:
             recipients.remove(member.address.email)
@@ -24,6 +24,8 @@ from mailman.app.lifecycle import create_list
 from mailman.handlers.to_digest import ToDigest
 from mailman.testing.helpers import specialized_message_from_string as mfs
 from mailman.testing.layers import ConfigLayer
+from mailman.utilities.mailbox import Mailbox
+from unittest.mock import patch
 
 
 class TestToDigest(unittest.TestCase):
@@ -61,3 +63,14 @@ Message-ID: <ant>
         self._handler.process(self._mlist, self._msg, {})
         # Assert digest.mmdf parent directory is present
         self.assertTrue(os.path.exists(self._mlist.data_path))
+
+    def test_append_without_reading_mailbox(self):
+        # The messages already in the digest aren't read to add another one.
+        self._handler.process(self._mlist, self._msg, {})
+        with patch.object(Mailbox, '_generate_toc',
+                          side_effect=AssertionError('mailbox read')):
+            self._handler.process(self._mlist, self._msg, {})
+        mailbox_path = os.path.join(self._mlist.data_path, 'digest.mmdf')
+        with Mailbox(mailbox_path) as mailbox:
+            subjects = [message['subject'] for message in mailbox]
+        self.assertEqual(subjects, ['A disposable message'] * 2)
@@ -48,5 +48,5 @@ class ToDigest:
             os.mkdir(mlist.data_path)
         # Lock the mailbox and append the message.
         with Mailbox(mailbox_path, create=True) as mbox:
-            mbox.add(msg)
+            mbox.append(msg)
         maybe_send_digest_now(mlist)
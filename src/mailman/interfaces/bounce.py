@@ -105,6 +105,21 @@ class IBounceProcessor(Interface):
         :type event: IBounceEvent
         """
 
+    def process_events(batch_size=None):
+        """Process all the unprocessed bounce events.
+
+        The events are processed in batches, oldest first, with each batch
+        in its own transaction.  The mailing list and the member of all the
+        events for the same address on the same list are looked up once.
+
+        :param batch_size: The number of events in each batch, or None for
+            the configured number.  0 or less processes all the events in one
+            batch.
+        :type batch_size: int
+        :return: The number of events processed.
+        :rtype: int
+        """
+
     def send_warnings_and_remove():
         """Send warnings to disabled users and remove them if needed.
 
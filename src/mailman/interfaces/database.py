@@ -49,6 +49,34 @@ class IDatabase(Interface):
     def abort():
         """Abort the current transaction."""
 
+    def keep_loaded(life):
+        """Keep read-mostly objects loaded across transactions.
+
+        Normally every object is expired when the transaction is committed,
+        and loaded again from the database when it is next used.  This turns
+        that off for the current thread's session for the mailing lists,
+        their header matches, domains and languages it loads, so that e.g. a
+        runner doesn't reload the same mailing lists for every message it
+        processes.  Everything else is still expired on commit, and all
+        objects are still expired when a transaction is aborted.
+
+        Changes made to the kept objects by other processes are not seen
+        until they are expired, either by `expire_kept()` or once they have
+        been kept for `life` seconds.
+
+        :param life: The number of seconds for which objects are kept, or 0
+            to expire every object on commit again.
+        :type life: float
+        """
+
+    def expire_kept():
+        """Expire the objects that are being kept loaded.
+
+        They are loaded from the database again when they are next used.
+        This does nothing unless the current thread's session keeps objects
+        loaded.
+        """
+
     # maxking: This is commented out because it is not an attribute anymore
     # but implemented as a property and I haven't figured out a way to fix
     # this with zope.interface implementations.
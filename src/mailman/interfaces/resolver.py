@@ -0,0 +1,63 @@
+# Copyright (C) 2016-2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""The caching DNS resolver."""
+
+from public import public
+from zope.interface import Attribute, Interface
+
+
+@public
+class IResolver(Interface):
+    """A DNS resolver which caches the answers it gets.
+
+    Mailman's own DNS lookups, such as the DMARC rule's, go through this
+    resolver, so that their answers are shared.  Answers, and the negative
+    answers for names or records that don't exist, are cached for as long as
+    DNS says they can be.
+    """
+
+    hits = Attribute(
+        """The number of lookups which were answered from the cache.""")
+
+    misses = Attribute(
+        """The number of lookups which had to query the name servers.""")
+
+    def resolve(name, rdtype='TXT', *, timeout=None, lifetime=None):
+        """Look up the records of a DNS name.
+
+        :param name: The DNS name to look up.
+        :type name: str
+        :param rdtype: The type of the records to look up.
+        :type rdtype: str
+        :param timeout: The number of seconds to wait for a response from a
+            name server, or None for the system default.
+        :type timeout: float
+        :param lifetime: The total number of seconds to spend trying to get
+            an answer, or None for the system default.
+        :type lifetime: float
+        :return: The answer.
+        :rtype: `dns.resolver.Answer`
+        :raises dns.resolver.NXDOMAIN: When the name doesn't exist.
+        :raises dns.resolver.NoAnswer: When the name has no records of the
+            given type.
+        :raises dns.exception.DNSException: For any other error.  These
+            aren't cached.
+        """
+
+    def clear():
+        """Forget all the cached answers."""
@@ -67,6 +67,19 @@ class IRoster(Interface):
         :rtype: `IMember` or None
         """
 
+    def get_members(emails):
+        """Get the members for many addresses at once.
+
+        This is equivalent to calling ``get_member()`` for every address,
+        but uses far fewer database queries.
+
+        :param emails: The email addresses to search for.
+        :type emails: iterable of strings
+        :return: A mapping from email addresses to their members.  Addresses
+            which aren't members are left out.
+        :rtype: dict
+        """
+
     def get_memberships(email):
         """Get the memberships for the given address.
 
@@ -125,9 +125,10 @@ class IRunner(Interface):
     def _do_periodic():
         """Do some arbitrary periodic processing.
 
-        Called every once in a while both from the runner's main loop, and
-        from the runner's hash slice processing loop.  You can do whatever
-        special periodic processing you want here.
+        Called every once in a while both from the runner's main loop, after
+        every pass over the queue, and from the runner's hash slice
+        processing loop, at most once every `periodic_interval`.  You can do
+        whatever special periodic processing you want here.
         """
 
     def _snooze(filecnt):
@@ -136,7 +137,8 @@ class IRunner(Interface):
         :param filecnt: The number of messages in the queue the last time
             through.  Runners can decide to continue to do work, or sleep for
             a while based on this value.  By default, the base runner only
-            snoozes when there was nothing to do last time around.
+            snoozes when there was nothing to do last time around, and wakes
+            up early when something is added to its queue directory.
         :type filecnt: int
         """
 
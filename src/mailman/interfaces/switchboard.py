@@ -69,12 +69,24 @@ class ISwitchboard(Interface):
         The base names of the matching files are returned.
         """)
 
-    def get_files(extension='.pck'):
+    def get_files(extension='.pck', count=None):
         """Like the 'files' attribute, but accepts an alternative extension.
 
         Only the files in the queue directory that have a matching extension
         are returned.  Like 'files', the base names of the matching files are
         returned.
+
+        :param extension: The file extension to match.
+        :type extension: str
+        :param count: If given, return at most this many of the oldest files.
+        :type count: int
+        """
+
+    def sync():
+        """Flush all enqueued entries to stable storage.
+
+        Switchboards which do not flush every entry as it is enqueued must
+        do so when this is called.
         """
 
     def recover_backup_files():
@@ -15,20 +15,99 @@
 # You should have received a copy of the GNU General Public License along with
 # GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
 
-"""Ban manager."""
+"""Ban manager.
+
+Checking whether an address is banned happens for every subscription and
+every post, so each process caches mailing lists' bans, and the global bans,
+in sets of literal addresses and compiled patterns.  A list's bans are cached
+for a version of them.  Whenever any process changes the list's bans, or the
+global bans, the list gets a new ban version, and the bans cached for the old
+one are no longer used.  The global bans are likewise cached for the global
+ban version, which changes along with every list's whenever they change, so
+they're never older than any list's that's still in use.
+"""
 
 import re
 
+from itertools import chain
+from mailman.database import lookups
 from mailman.database.model import Model
 from mailman.database.transaction import dbconnection
 from mailman.database.types import SAUnicode
 from mailman.interfaces.bans import IBan, IBanManager
 from mailman.utilities.queries import QuerySequence
 from public import public
-from sqlalchemy import Column, Integer, select
+from sqlalchemy import Column, event, Integer, select
+from sqlalchemy.orm import Session
 from zope.interface import implementer
 
 
+# Patterns that can't be combined with others into one regular expression,
+# because they refer to their groups by number or name, or set flags.
+_UNCOMBINABLE = re.compile(r'\\\d|\(\?(?:P|\(|[aiLmsux-])')
+
+
+def _compile(patterns):
+    # Compile every pattern on its own first, so that an invalid one raises
+    # re.error as it always has, and so that a pattern can't be mistaken for
+    # part of another one when they're combined.
+    matchers = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    combinable = [matcher.pattern for matcher in matchers
+                  if _UNCOMBINABLE.search(matcher.pattern) is None]
+    if len(combinable) < 2:
+        return matchers
+    combined = re.compile(
+        '|'.join('(?:{})'.format(pattern) for pattern in combinable),
+        re.IGNORECASE)
+    return [combined] + [matcher for matcher in matchers
+                         if matcher.pattern not in combinable]
+
+
+@public
+class BanSet:
+    """A set of banned email addresses and patterns."""
+
+    def __init__(self, emails, previous=None):
+        """Create a set of bans.
+
+        :param emails: The banned email addresses and patterns.
+        :type emails: iterable of str
+        :param previous: Another set of bans whose compiled patterns are
+            reused if the patterns haven't changed.
+        :type previous: `BanSet`
+        """
+        self.emails = frozenset(emails)
+        self.patterns = tuple(sorted(
+            email for email in self.emails if email.startswith('^')))
+        if previous is not None and previous.patterns == self.patterns:
+            self._matchers = previous._matchers
+        else:
+            self._matchers = _compile(self.patterns)
+
+    def __contains__(self, email):
+        if email in self.emails:
+            return True
+        return any(matcher.match(email) is not None
+                   for matcher in self._matchers)
+
+
+def _load(store, list_id):
+    emails = store.execute(
+        select(Ban.email).where(Ban.list_id == list_id)).scalars()
+    cached = lookups.bans.get(list_id)
+    return BanSet(emails, None if cached is None else cached[1])
+
+
+def _global_bans(store):
+    version = store.query(GlobalBansVersion.version).scalar()
+    cached = lookups.bans.get(None)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    bans = _load(store, None)
+    lookups.bans[None] = (version, bans)
+    return bans
+
+
 @public
 @implementer(IBan)
 class Ban(Model):
@@ -46,6 +125,20 @@ class Ban(Model):
         self.list_id = list_id
 
 
+@public
+class GlobalBansVersion(Model):
+    """The version of the global bans.
+
+    There is at most one row, which is added the first time the global bans
+    change.
+    """
+
+    __tablename__ = 'global_bans_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer)
+
+
 @public
 @implementer(IBanManager)
 class BanManager:
@@ -74,41 +167,26 @@ class BanManager:
     @dbconnection
     def is_banned(self, store, email):
         """See `IBanManager`."""
+        # Avoid circular imports.
+        from mailman.model.mailinglist import MailingList
         list_id = self._list_id
         if list_id is None:
-            # The client is asking for global bans.  Look up bans on the
-            # specific email address first.
-            bans = store.query(Ban).filter_by(email=email, list_id=None)
-            if bans.count() > 0:
-                return True
-            # And now look for global pattern bans.
-            bans = store.query(Ban).filter_by(list_id=None)
-            for ban in bans:
-                if (ban.email.startswith('^') and
-                        re.match(ban.email, email, re.IGNORECASE) is not None):
-                    return True
+            # The client is asking for global bans.
+            return email in _global_bans(store)
+        version = store.query(MailingList._bans_version).filter(
+            MailingList._list_id == list_id).scalar()
+        cached = lookups.bans.get(list_id)
+        global_cached = lookups.bans.get(None)
+        if cached is None or cached[0] != version or global_cached is None:
+            # The list's version changes whenever the global bans do, so
+            # they only need checking when the list's bans are reloaded.
+            list_bans = _load(store, list_id)
+            global_bans = _global_bans(store)
+            lookups.bans[list_id] = (version, list_bans)
         else:
-            # This is a list-specific ban.
-            bans = store.query(Ban).filter_by(email=email, list_id=list_id)
-            if bans.count() > 0:
-                return True
-            # Try global bans next.
-            bans = store.query(Ban).filter_by(email=email, list_id=None)
-            if bans.count() > 0:
-                return True
-            # Now try specific mailing list bans, but with a pattern.
-            bans = store.query(Ban).filter_by(list_id=list_id)
-            for ban in bans:
-                if (ban.email.startswith('^') and
-                        re.match(ban.email, email, re.IGNORECASE) is not None):
-                    return True
-            # And now try global pattern bans.
-            bans = store.query(Ban).filter_by(list_id=None)
-            for ban in bans:
-                if (ban.email.startswith('^') and
-                        re.match(ban.email, email, re.IGNORECASE) is not None):
-                    return True
-        return False
+            list_bans = cached[1]
+            global_bans = global_cached[1]
+        return email in list_bans or email in global_bans
 
     @property
     @dbconnection
@@ -122,3 +200,44 @@ class BanManager:
     def __iter__(self, store):
         """See `IBanManager`."""
         yield from self.bans
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    # Give the mailing lists whose bans changed new ban versions.  Changing
+    # the global bans changes every list's, and the global ban version.
+    # Avoid circular imports.
+    from mailman.model.mailinglist import MailingList, new_roster_version
+    list_ids = set(
+        instance.list_id
+        for instance in chain(session.new, session.dirty, session.deleted)
+        if isinstance(instance, Ban))
+    if len(list_ids) == 0:
+        return
+    session.info['bans_changed'] = True
+    version = new_roster_version()
+    table = MailingList.__table__
+    statement = table.update().values(bans_version=version)
+    if None in list_ids:
+        global_table = GlobalBansVersion.__table__
+        result = session.execute(
+            global_table.update().values(version=version))
+        if result.rowcount == 0:
+            session.execute(
+                global_table.insert().values(id=1, version=version))
+    else:
+        statement = statement.where(table.c.list_id.in_(sorted(list_ids)))
+    session.execute(statement)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    session.info.pop('bans_changed', None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    # Bans cached while the changes were visible may include ones that were
+    # never committed, and the versions they were cached for are restored.
+    if session.info.pop('bans_changed', False):
+        lookups.bans.clear()
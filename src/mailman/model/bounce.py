@@ -167,7 +167,60 @@ class BounceProcessor:
             raise InvalidBounceEvent(
                 'Email {} is not a subcriber of {}'.format(
                     event.email, mlist.list_id))
+        self._process(mlist, member, event)
 
+    @dbconnection
+    def process_events(self, store, batch_size=None):
+        """See `IBounceProcessor`."""
+        if batch_size is None:
+            batch_size = int(config.bounces.process_events_batch_size)
+        list_manager = getUtility(IListManager)
+        count = 0
+        while True:
+            with transaction():
+                events = store.query(BounceEvent).filter_by(
+                    processed=False).order_by(BounceEvent.id)
+                if batch_size > 0:
+                    events = events.limit(batch_size)
+                # Each mailing list and member is looked up once, for all
+                # their events.
+                by_member = {}
+                for event in events:
+                    by_member.setdefault(
+                        (event.list_id, event.email), []).append(event)
+                # Nothing is written until all the events have been
+                # processed, so that the members' bounce scores, and the
+                # events, are updated together.
+                with store.no_autoflush:
+                    self._process_batch(list_manager, by_member)
+            processed = sum(len(events) for events in by_member.values())
+            count += processed
+            if batch_size <= 0 or processed < batch_size:
+                return count
+
+    def _process_batch(self, list_manager, by_member):
+        mlists = {}
+        for (list_id, email), events in by_member.items():
+            for event in events:
+                event.processed = True
+            if list_id not in mlists:
+                mlists[list_id] = list_manager.get(list_id)
+            mlist = mlists[list_id]
+            if mlist is None:
+                # List was removed before the bounce is processed.
+                log.info('Bounce for non-existent list %s', list_id)
+                continue
+            member = mlist.members.get_member(email)
+            if member is None:
+                # This member is either unsubscribed or this is a very stale
+                # event.
+                log.info('Bounce for %s, who is not a subscriber of %s',
+                         email, list_id)
+                continue
+            for event in events:
+                self._process(mlist, member, event)
+
+    def _process(self, mlist, member, event):
         # If this is a probe bounce, that we are sent before to check for this
         # Mailbox, we just disable the delivery for this member.
         if event.context == BounceContext.probe:
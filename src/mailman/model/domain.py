@@ -17,6 +17,7 @@
 
 """Domains."""
 
+from mailman.database import lookups
 from mailman.database.model import Model
 from mailman.database.transaction import dbconnection
 from mailman.database.types import SAUnicode, SAUnicode4Byte
@@ -47,6 +48,10 @@ class Domain(Model):
 
     __tablename__ = 'domain'
 
+    # Read-mostly, so runners keep these loaded across transactions.  See
+    # `IDatabase.keep_loaded()`.
+    keep_loaded = True
+
     id = Column(Integer, primary_key=True)
 
     mail_host = Column(SAUnicode, unique=True)
@@ -158,12 +163,21 @@ class DomainManager:
     @dbconnection
     def get(self, store, mail_host, default=None):
         """See `IDomainManager`."""
-        domains = store.query(Domain).filter_by(mail_host=mail_host)
-        if domains.count() < 1:
+        domain_id = lookups.domains.get(mail_host)
+        if domain_id is not None:
+            # Flush pending changes, just as the query would.
+            if store.autoflush:
+                store.flush()
+            domain = store.get(Domain, domain_id)
+            if domain is not None and domain.mail_host == mail_host:
+                return domain
+            lookups.domains.discard(mail_host)
+        # mail_host is unique.
+        domain = store.query(Domain).filter_by(mail_host=mail_host).first()
+        if domain is None:
             return default
-        assert domains.count() == 1, (
-            'Too many matching domains: %s' % mail_host)
-        return domains.one()
+        lookups.domains[mail_host] = domain.id
+        return domain
 
     def __getitem__(self, mail_host):
         """See `IDomainManager`."""
@@ -32,5 +32,9 @@ class Language(Model):
 
     __tablename__ = 'language'
 
+    # Read-mostly, so runners keep these loaded across transactions.  See
+    # `IDatabase.keep_loaded()`.
+    keep_loaded = True
+
     id = Column(Integer, primary_key=True)
     code = Column(SAUnicode)
@@ -17,6 +17,7 @@
 
 """A mailing list manager."""
 
+from mailman.database import lookups
 from mailman.database.transaction import dbconnection
 from mailman.interfaces.address import InvalidEmailAddressError
 from mailman.interfaces.listmanager import (
@@ -37,7 +38,7 @@ from mailman.model.mailinglist import (
 )
 from mailman.model.mime import ContentFilter
 from mailman.utilities.datetime import now
-from mailman.utilities.queries import QuerySequence
+from mailman.utilities.queries import KeyedQuerySequence
 from public import public
 from sqlalchemy import select
 from zope.event import notify
@@ -77,7 +78,19 @@ class ListManager:
     @dbconnection
     def get_by_list_id(self, store, list_id):
         """See `IListManager`."""
-        return store.query(MailingList).filter_by(_list_id=list_id).first()
+        mlist_id = lookups.mailing_lists.get(list_id)
+        if mlist_id is not None:
+            # Flush pending changes, just as the query would.
+            if store.autoflush:
+                store.flush()
+            mlist = store.get(MailingList, mlist_id)
+            if mlist is not None and mlist.list_id == list_id:
+                return mlist
+            lookups.mailing_lists.discard(list_id)
+        mlist = store.query(MailingList).filter_by(_list_id=list_id).first()
+        if mlist is not None:
+            lookups.mailing_lists[list_id] = mlist.id
+        return mlist
 
     @dbconnection
     def get_by_fqdn(self, store, fqdn_listname):
@@ -148,5 +161,4 @@ class ListManager:
             query = query.filter_by(advertised=advertised)
         if mail_host is not None:
             query = query.filter_by(mail_host=mail_host)
-        query = query.order_by(MailingList._list_id)
-        return QuerySequence(store, query)
+        return KeyedQuerySequence(store, query, (MailingList._list_id,))
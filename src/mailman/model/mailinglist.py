@@ -18,6 +18,7 @@
 """Model for mailing lists."""
 
 import os
+import random
 
 from mailman.config import config
 from mailman.database.model import Model
@@ -96,6 +97,12 @@ SPACE = ' '
 UNDERSCORE = '_'
 
 
+@public
+def new_roster_version():
+    """Return a new roster version for a mailing list."""
+    return random.getrandbits(31)
+
+
 @public
 @implementer(IMailingList)
 class MailingList(Model):
@@ -103,6 +110,10 @@ class MailingList(Model):
 
     __tablename__ = 'mailinglist'
 
+    # Read-mostly, so runners keep these loaded across transactions.  See
+    # `IDatabase.keep_loaded()`.
+    keep_loaded = True
+
     id = Column(Integer, primary_key=True)
 
     # XXX denotes attributes that should be part of the public interface but
@@ -126,6 +137,15 @@ class MailingList(Model):
     digest_last_sent_at = Column(DateTime)
     volume = Column(Integer)
     last_post_at = Column(DateTime)
+    # An arbitrary value that changes whenever the list's members, or the
+    # addresses they're subscribed with, change.  See
+    # mailman.database.lookups.
+    _roster_version = Column(
+        'roster_version', Integer, default=new_roster_version)
+    # Likewise for the list's bans, and the global bans.  See
+    # mailman.model.bans.
+    _bans_version = Column(
+        'bans_version', Integer, default=new_roster_version)
     # Attributes which are directly modifiable via the web u/i.  The more
     # complicated attributes are currently stored as pickles, though that
     # will change as the schema and implementation is developed.
@@ -676,6 +696,9 @@ class HeaderMatch(Model):
 
     __tablename__ = 'headermatch'
 
+    # Part of the mailing list's configuration, so kept loaded along with it.
+    keep_loaded = True
+
     id = Column(Integer, primary_key=True)
 
     mailing_list_id = Column(
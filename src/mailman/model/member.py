@@ -239,7 +239,7 @@ class MembershipManager:
     def memberships_pending_warning(self, store):
         """See `IMembershipManager`."""
         from mailman.model.mailinglist import MailingList
-        from mailman.model.preferences import Preferences
+        from mailman.model.preferences import EffectivePreferences
 
         # maxking: We don't care so much about the bounce score here since it
         # could have been reset due to bounce info getting stale. We will send
@@ -249,11 +249,13 @@ class MembershipManager:
             Member,
             MailingList.bounce_you_are_disabled_warnings_interval).join(
             MailingList, Member.list_id == MailingList._list_id).join(
-            Member.preferences).filter(and_(
+            EffectivePreferences,
+            EffectivePreferences.member_id == Member.id).filter(and_(
                 Member.role == MemberRole.member,
                 MailingList.process_bounces == True,       # noqa: E712
                 Member.total_warnings_sent < MailingList.bounce_you_are_disabled_warnings,  # noqa: E501
-                Preferences.delivery_status == DeliveryStatus.by_bounces))
+                EffectivePreferences.delivery_status ==
+                DeliveryStatus.by_bounces))
 
         # XXX(maxking): This is IMO a query that *should* work, but I haven't
         # been able to get it to work in my tests. It could be due to lack of
@@ -275,18 +277,20 @@ class MembershipManager:
     def memberships_pending_removal(self, store):
         """See `IMembershipManager`."""
         from mailman.model.mailinglist import MailingList
-        from mailman.model.preferences import Preferences
+        from mailman.model.preferences import EffectivePreferences
 
         query = store.query(
             Member,
             MailingList.bounce_you_are_disabled_warnings_interval,
             MailingList.bounce_you_are_disabled_warnings).join(
             MailingList, Member.list_id == MailingList._list_id).join(
-            Member.preferences).filter(and_(
+            EffectivePreferences,
+            EffectivePreferences.member_id == Member.id).filter(and_(
                 Member.role == MemberRole.member,
                 MailingList.process_bounces == True,    # noqa: E712
                 Member.total_warnings_sent >= MailingList.bounce_you_are_disabled_warnings,     # noqa: E501
-                Preferences.delivery_status == DeliveryStatus.by_bounces))
+                EffectivePreferences.delivery_status ==
+                DeliveryStatus.by_bounces))
 
         for member, interval, warnings in query.all():
             if (member.last_warning_sent + interval) <= now() or warnings == 0:
@@ -17,18 +17,46 @@
 
 """Model for preferences."""
 
+from mailman.core.constants import system_preferences
 from mailman.database.model import Model
 from mailman.database.transaction import dbconnection
 from mailman.database.types import Enum, SAUnicode
 from mailman.interfaces.languages import ILanguageManager
-from mailman.interfaces.member import DeliveryMode, DeliveryStatus
+from mailman.interfaces.member import DeliveryMode, DeliveryStatus, MemberRole
 from mailman.interfaces.preferences import IPreferences
 from public import public
-from sqlalchemy import Boolean, Column, Integer
+from sqlalchemy import (
+    Boolean,
+    Column,
+    delete,
+    event,
+    ForeignKey,
+    func,
+    Index,
+    insert,
+    Integer,
+    literal,
+    or_,
+    select,
+)
+from sqlalchemy.orm import aliased, Session
 from zope.component import getUtility
 from zope.interface import implementer
 
 
+# The preferences that members look up through their address and user.
+MEMBER_PREFERENCES = (
+    'acknowledge_posts',
+    'preferred_language',
+    'receive_list_copy',
+    'receive_own_postings',
+    'delivery_mode',
+    'delivery_status',
+    )
+# The number of members to refresh in each statement.
+REFRESH_CHUNK_SIZE = 500
+
+
 @public
 @implementer(IPreferences)
 class Preferences(Model):
@@ -77,3 +105,228 @@ class Preferences(Model):
             if (getattr(self, column_name) is None and
                     getattr(preferences, column_name) is not None):
                 setattr(self, column_name, getattr(preferences, column_name))
+
+
+@public
+class EffectivePreferences(Model):
+    """A member's preferences, as `Member` looks them up.
+
+    A member's preferences are looked up in their membership, then in their
+    subscribed address, then in the user controlling that address, and
+    finally in the system defaults.  This table holds the result of that
+    lookup for every member, along with the email address they receive
+    messages at, so that members can be selected by their preferences in the
+    database.  It is kept up to date whenever members, their addresses,
+    users or preferences change.
+    """
+
+    __tablename__ = 'effective_preferences'
+    __table_args__ = (
+        Index('ix_effective_preferences_delivery',
+              'list_id', 'role', 'delivery_mode', 'delivery_status'),
+        )
+
+    member_id = Column(
+        Integer, ForeignKey('member.id', ondelete='CASCADE'),
+        primary_key=True)
+    list_id = Column(SAUnicode)
+    role = Column(Enum(MemberRole))
+    # None when a user is subscribed without a preferred address.
+    email = Column(SAUnicode, index=True)
+    acknowledge_posts = Column(Boolean)
+    # None means the mailing list's preferred language.
+    preferred_language = Column(SAUnicode)
+    receive_list_copy = Column(Boolean)
+    receive_own_postings = Column(Boolean)
+    delivery_mode = Column(Enum(DeliveryMode))
+    delivery_status = Column(Enum(DeliveryStatus), index=True)
+
+
+def _models():
+    # Avoid circular imports.
+    from mailman.model.address import Address
+    from mailman.model.member import Member
+    from mailman.model.user import User
+    return Address, Member, User
+
+
+def _lookup(columns):
+    """Select from members joined to the records of their preferences.
+
+    :param columns: A function that is called with the `Member` class and a
+        dictionary of the aliases of the joined tables, and returns the
+        columns to select.
+    :return: The select statement, the `Member` class and the aliases.
+    """
+    Address, Member, User = _models()
+    subscriber = aliased(User)
+    address = aliased(Address)
+    owner = aliased(User)
+    member_preferences = aliased(Preferences)
+    address_preferences = aliased(Preferences)
+    owner_preferences = aliased(Preferences)
+    aliases = dict(
+        subscriber=subscriber,
+        address=address,
+        owner=owner,
+        preferences=(member_preferences,
+                     address_preferences,
+                     owner_preferences),
+        )
+    statement = select(*columns(Member, aliases)).select_from(
+        Member).outerjoin(
+        subscriber, Member.user_id == subscriber.id,
+        ).outerjoin(
+        # The explicit address, or else the user's preferred address.
+        address, address.id == func.coalesce(
+            Member.address_id, subscriber._preferred_address_id),
+        ).outerjoin(
+        member_preferences,
+        Member.preferences_id == member_preferences.id,
+        ).outerjoin(
+        address_preferences,
+        address.preferences_id == address_preferences.id,
+        ).outerjoin(
+        owner, address.user_id == owner.id,
+        ).outerjoin(
+        owner_preferences, owner.preferences_id == owner_preferences.id)
+    return statement, Member, aliases
+
+
+def _effective(aliases, name):
+    column = '_preferred_language' if name == 'preferred_language' else name
+    values = [getattr(preferences, column)
+              for preferences in aliases['preferences']]
+    # Members fall back to the mailing list's language, not the system's.
+    if name != 'preferred_language':
+        values.append(literal(
+            getattr(system_preferences, name),
+            EffectivePreferences.__table__.c[name].type))
+    return func.coalesce(*values)
+
+
+def _effective_columns(Member, aliases):
+    return (
+        Member.id,
+        Member.list_id,
+        Member.role,
+        aliases['address'].email,
+        *(_effective(aliases, name) for name in MEMBER_PREFERENCES),
+        )
+
+
+@public
+def refresh_effective_preferences(session, member_ids):
+    """Recalculate the effective preferences of some members.
+
+    :param session: The database session.
+    :param member_ids: The ids of the members whose preferences changed.
+        Members that no longer exist lose their effective preferences.
+    :type member_ids: iterable of integers
+    """
+    member_ids = list(member_ids)
+    names = ('member_id', 'list_id', 'role', 'email') + MEMBER_PREFERENCES
+    for start in range(0, len(member_ids), REFRESH_CHUNK_SIZE):
+        chunk = member_ids[start:start + REFRESH_CHUNK_SIZE]
+        session.execute(delete(EffectivePreferences).where(
+            EffectivePreferences.member_id.in_(chunk)))
+        statement, Member, aliases = _lookup(_effective_columns)
+        session.execute(insert(EffectivePreferences).from_select(
+            names, statement.where(Member.id.in_(chunk))))
+
+
+def _affected_members(session, changed):
+    # Find the members whose preferences are looked up through any of the
+    # changed records.
+    Address, Member, User = _models()
+    ids = {}
+    for instance in changed:
+        ids.setdefault(type(instance), set()).add(instance.id)
+    statement, Member, aliases = _lookup(
+        lambda Member, aliases: (Member.id,))
+    conditions = []
+    if Member in ids:
+        conditions.append(Member.id.in_(ids[Member]))
+    if Preferences in ids:
+        conditions.append(Member.preferences_id.in_(ids[Preferences]))
+        conditions.append(
+            aliases['address'].preferences_id.in_(ids[Preferences]))
+        conditions.append(
+            aliases['owner'].preferences_id.in_(ids[Preferences]))
+    if Address in ids:
+        conditions.append(Member.address_id.in_(ids[Address]))
+        conditions.append(
+            aliases['subscriber']._preferred_address_id.in_(ids[Address]))
+    if User in ids:
+        conditions.append(Member.user_id.in_(ids[User]))
+        conditions.append(aliases['address'].user_id.in_(ids[User]))
+    affected = set(session.execute(
+        statement.where(or_(*conditions))).scalars())
+    # Deleted members can no longer be found through their records.
+    return affected | ids.get(Member, set())
+
+
+def _watched():
+    # The attributes that the effective preferences depend on.
+    Address, Member, User = _models()
+    return {
+        Member: ('_address', 'address_id', '_user', 'user_id',
+                 'preferences', 'preferences_id', 'list_id', 'role'),
+        Preferences: ('acknowledge_posts', '_preferred_language',
+                      'receive_list_copy', 'receive_own_postings',
+                      'delivery_mode', 'delivery_status'),
+        Address: ('user', 'user_id', 'preferences', 'preferences_id'),
+        User: ('_preferred_address', '_preferred_address_id',
+               'preferences', 'preferences_id'),
+        }
+
+
+@event.listens_for(Session, 'before_flush')
+def _before_flush(session, flush_context, instances):
+    # Remember the changes that affect members' effective preferences.  Not
+    # all of their ids are known until they've been flushed.
+    watched = _watched()
+    changed = session.info['effective_preferences'] = []
+    Address, Member, User = _models()
+    for instance in session.new:
+        if isinstance(instance, Member):
+            changed.append(instance)
+    for instance in session.dirty:
+        state = instance._sa_instance_state
+        if any(state.attrs[name].history.has_changes()
+               for name in watched.get(type(instance), ())):
+            changed.append(instance)
+    for instance in session.deleted:
+        if type(instance) in watched:
+            changed.append(instance)
+
+
+def _new_roster_versions(session, member_ids, changed):
+    # The members' lookups by email address could have changed too, so give
+    # their mailing lists new roster versions.
+    from mailman.model.mailinglist import MailingList, new_roster_version
+    Address, Member, User = _models()
+    list_ids = set(instance.list_id for instance in changed
+                   if isinstance(instance, Member))
+    member_ids = list(member_ids)
+    for start in range(0, len(member_ids), REFRESH_CHUNK_SIZE):
+        chunk = member_ids[start:start + REFRESH_CHUNK_SIZE]
+        list_ids.update(session.execute(
+            select(EffectivePreferences.list_id).where(
+                EffectivePreferences.member_id.in_(chunk))).scalars())
+    list_ids = sorted(list_id for list_id in list_ids if list_id is not None)
+    table = MailingList.__table__
+    for start in range(0, len(list_ids), REFRESH_CHUNK_SIZE):
+        chunk = list_ids[start:start + REFRESH_CHUNK_SIZE]
+        session.execute(table.update().where(
+            table.c.list_id.in_(chunk)).values(
+            roster_version=new_roster_version()))
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    changed = session.info.pop('effective_preferences', [])
+    if len(changed) > 0:
+        member_ids = _affected_members(session, changed)
+        refresh_effective_preferences(session, member_ids)
+        _new_roster_versions(session, member_ids, changed)
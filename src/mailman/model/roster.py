@@ -23,16 +23,26 @@ moderator, and administrator roster filters.
 """
 
 from enum import Enum
+from mailman.database import lookups
 from mailman.database.transaction import dbconnection
-from mailman.interfaces.member import DeliveryMode, MemberRole
+from mailman.interfaces.member import DeliveryMode, DeliveryStatus, MemberRole
 from mailman.interfaces.roster import IRoster
 from mailman.model.address import Address
 from mailman.model.member import Member
+from mailman.model.preferences import EffectivePreferences
 from public import public
-from sqlalchemy import or_
+from sqlalchemy import func, or_
+from sqlalchemy.orm import selectinload
 from zope.interface import implementer
 
 
+# The number of addresses to look up in each query by get_members(), which
+# keeps the number of bound parameters well within the database's limits.
+QUERY_CHUNK_SIZE = 500
+
+MISSING = object()
+
+
 @public
 class RosterVisibility(Enum):
     # The member roster is entirely public.
@@ -116,8 +126,37 @@ class AbstractRoster:
             User._preferred_address_id == Address.id)
         return members_a.union(members_u).all()
 
-    def get_member(self, email):
+    @dbconnection
+    def get_member(self, store, email):
         """See ``IRoster``."""
+        # Avoid circular imports.
+        from mailman.model.mailinglist import MailingList
+        # Addresses are stored lower cased.
+        email = email.lower()
+        if self.role is None:
+            return self._find_member(email)
+        # Lookups are cached for the current version of the list's roster,
+        # which changes whenever any process changes its members.
+        list_id = self._mlist.list_id
+        version = store.query(MailingList._roster_version).filter(
+            MailingList._list_id == list_id).scalar()
+        key = (list_id, version, self.role, email)
+        member_id = lookups.members.get(key, MISSING)
+        if member_id is None:
+            return None
+        if member_id is not MISSING:
+            member = store.get(Member, member_id)
+            if (member is not None and
+                    member.list_id == list_id and
+                    member.role == self.role and
+                    member.address is not None and
+                    member.address.email == email):
+                return member
+        member = self._find_member(email)
+        lookups.members[key] = None if member is None else member.id
+        return member
+
+    def _find_member(self, email):
         memberships = self._get_all_memberships(email)
         count = len(memberships)
         if count == 0:
@@ -132,6 +171,46 @@ class AbstractRoster:
                 if memberships[0]._address is not None
                 else memberships[1])
 
+    @dbconnection
+    def get_members(self, store, emails):
+        """See ``IRoster``."""
+        # Avoid circular imports.
+        from mailman.model.user import User
+
+        emails = list(set(emails))
+        explicit = {}
+        indirect = {}
+        for start in range(0, len(emails), QUERY_CHUNK_SIZE):
+            query = store.query(Member, Address.email).filter(
+                Member.list_id == self._mlist.list_id,
+                Member.role == self.role,
+                Address.email.in_(emails[start:start + QUERY_CHUNK_SIZE]),
+                ).options(
+                # Load everything that's needed to decorate messages for
+                # these members up front, instead of one member at a time.
+                selectinload(Member.preferences),
+                selectinload(Member._address).selectinload(
+                    Address.preferences),
+                selectinload(Member._address).selectinload(
+                    Address.user).selectinload(User.preferences),
+                selectinload(Member._user).selectinload(User.preferences),
+                selectinload(Member._user).selectinload(
+                    User._preferred_address).selectinload(
+                        Address.preferences),
+                )
+            explicit.update(
+                (email, member) for member, email in query.filter(
+                    Member.address_id == Address.id))
+            indirect.update(
+                (email, member) for member, email in query.filter(
+                    Member.user_id == User.id,
+                    User._preferred_address_id == Address.id))
+        # As with get_member(), an explicit address membership wins.
+        indirect.update(explicit)
+        for member in indirect.values():
+            member._mailing_list = self._mlist
+        return indirect
+
     def get_memberships(self, email):
         """See ``IRoster``."""
         memberships = self._get_all_memberships(email)
@@ -203,36 +282,78 @@ class AdministratorRoster(AbstractRoster):
         assert len(members) == 1, 'mlist.administrators has too many members'
         return members[0]
 
+    def get_members(self, emails):
+        """See `IRoster`."""
+        members = {}
+        for email in set(emails):
+            member = self.get_member(email)
+            if member is not None:
+                members[email] = member
+        return members
+
 
 @public
 class DeliveryMemberRoster(AbstractRoster):
-    """Return all the members having a particular kind of delivery."""
+    """Return all the members having a particular kind of delivery.
+
+    Subclasses set `delivery_modes` to the modes they select.
+    """
 
     role = MemberRole.member
+    delivery_modes = ()
+
+    @property
+    def members(self):
+        """See `IRoster`."""
+        yield from self._delivery_query(Member)
 
     @property
     def member_count(self):
         """See `IRoster`."""
-        # XXX 2012-03-15 BAW: It would be nice to make this more efficient.
-        # The problem is that you'd have to change the loop in _get_members()
-        # checking the delivery mode to a query parameter.
-        return len(tuple(self.members))
+        return self._delivery_query(Member).count()
+
+    def get_recipients(self):
+        """The email addresses of the members with delivery enabled.
+
+        :return: The addresses to deliver to.
+        :rtype: set of strings
+        """
+        query = self._delivery_query(
+            EffectivePreferences.email).filter(
+            EffectivePreferences.delivery_status == DeliveryStatus.enabled)
+        return set(email for (email,) in query)
+
+    def get_recipient_modes(self):
+        """The members with delivery enabled and their delivery modes.
+
+        The members' addresses are returned as they were originally given,
+        with their case preserved.
+
+        :return: The addresses to deliver to, and how to deliver to them.
+        :rtype: list of (string, `DeliveryMode`) 2-tuples
+        """
+        query = self._delivery_query(
+            func.coalesce(Address._original, Address.email),
+            EffectivePreferences.delivery_mode).join(
+            Address, Address.email == EffectivePreferences.email).filter(
+            EffectivePreferences.delivery_status == DeliveryStatus.enabled)
+        return [(email, delivery_mode) for email, delivery_mode in query]
 
     @dbconnection
-    def _get_members(self, store, *delivery_modes):
-        """The set of members for a mailing list, filter by delivery mode.
+    def _delivery_query(self, store, *entities):
+        """Query the members by their effective delivery mode.
 
-        :param delivery_modes: The modes to filter on.
-        :type delivery_modes: sequence of `DeliveryMode`.
-        :return: A generator of members.
-        :rtype: generator
+        :param entities: What to query for.
+        :return: The query, with the members' `EffectivePreferences`
+            joined.
         """
-        results = store.query(Member).filter_by(
-            list_id=self._mlist.list_id,
-            role=MemberRole.member)
-        for member in results:
-            if member.delivery_mode in delivery_modes:
-                yield member
+        return store.query(*entities).select_from(Member).join(
+            EffectivePreferences,
+            EffectivePreferences.member_id == Member.id).filter(
+            EffectivePreferences.list_id == self._mlist.list_id,
+            EffectivePreferences.role == self.role,
+            EffectivePreferences.email.isnot(None),
+            EffectivePreferences.delivery_mode.in_(self.delivery_modes))
 
 
 @public
@@ -240,11 +361,7 @@ class RegularMemberRoster(DeliveryMemberRoster):
     """Return all the regular delivery members of a list."""
 
     name = 'regular_members'
-
-    @property
-    def members(self):
-        """See `IRoster`."""
-        yield from self._get_members(DeliveryMode.regular)
+    delivery_modes = (DeliveryMode.regular,)
 
 
 @public
@@ -252,14 +369,11 @@ class DigestMemberRoster(DeliveryMemberRoster):
     """Return all the regular delivery members of a list."""
 
     name = 'digest_members'
-
-    @property
-    def members(self):
-        """See `IRoster`."""
-        yield from self._get_members(
-            DeliveryMode.plaintext_digests,
-            DeliveryMode.mime_digests,
-            DeliveryMode.summary_digests)
+    delivery_modes = (
+        DeliveryMode.plaintext_digests,
+        DeliveryMode.mime_digests,
+        DeliveryMode.summary_digests,
+        )
 
 
 @public
@@ -318,6 +432,10 @@ class Memberships:
         """See `IRoster`."""
         raise NotImplementedError
 
+    def get_members(self, emails):
+        """See `IRoster`."""
+        raise NotImplementedError
+
     @dbconnection
     def get_memberships(self, store, address):
         """See `IRoster`."""
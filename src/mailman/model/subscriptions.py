@@ -25,14 +25,13 @@ from mailman.interfaces.subscriptions import (
     ISubscriptionService,
     TooManyMembersError,
 )
-from mailman.interfaces.usermanager import IUserManager
 from mailman.model.address import Address
 from mailman.model.member import Member
+from mailman.model.preferences import EffectivePreferences
 from mailman.model.user import User
-from mailman.utilities.queries import QuerySequence
-from operator import attrgetter
+from mailman.utilities.queries import KeyedQuerySequence
 from public import public
-from sqlalchemy import or_, select, union_all
+from sqlalchemy import case, func, Integer, or_, select, type_coerce, union_all
 from sqlalchemy.orm import aliased
 from zope.component import getUtility
 from zope.interface import implementer
@@ -48,27 +47,27 @@ class SubscriptionService:
 
     __name__ = 'members'
 
-    def get_members(self):
+    @dbconnection
+    def get_members(self, store):
         """See `ISubscriptionService`."""
-        # {list_id -> {role -> [members]}}
-        by_list = {}
-        user_manager = getUtility(IUserManager)
-        for member in user_manager.members:
-            by_role = by_list.setdefault(member.list_id, {})
-            members = by_role.setdefault(member.role.name, [])
-            members.append(member)
-        # Flatten into single list sorted as per the interface.
-        all_members = []
-        address_of_member = attrgetter('address.email')
-        for list_id in sorted(by_list):
-            by_role = by_list[list_id]
-            all_members.extend(
-                sorted(by_role.get('owner', []), key=address_of_member))
-            all_members.extend(
-                sorted(by_role.get('moderator', []), key=address_of_member))
-            all_members.extend(
-                sorted(by_role.get('member', []), key=address_of_member))
-        return all_members
+        # The members' effective preferences have their list-id, role and
+        # email address, so the members can be sorted by the database.
+        role_order = case(
+            (EffectivePreferences.role == MemberRole.owner, 0),
+            (EffectivePreferences.role == MemberRole.moderator, 1),
+            else_=2)
+        query = select(Member).join(
+            EffectivePreferences,
+            EffectivePreferences.member_id == Member.id).where(
+                EffectivePreferences.role.in_((
+                    MemberRole.owner, MemberRole.moderator,
+                    MemberRole.member)))
+        return KeyedQuerySequence(store, query, (
+            EffectivePreferences.list_id,
+            role_order,
+            func.coalesce(EffectivePreferences.email, ''),
+            Member.id,
+            ))
 
     @dbconnection
     def get_member(self, store, member_id):
@@ -93,7 +92,6 @@ class SubscriptionService:
                 moderation_action is EMPTY and
                 delivery_status is None):
             return []
-        order = (Member.list_id, Address.email, Member.role)
         # Querying for the subscriber is the most complicated part, because
         # the parameter can either be an email address or a user id.  Start by
         # building two queries, one joined on the member's address, and one
@@ -138,23 +136,31 @@ class SubscriptionService:
                 Member.moderation_action == moderation_action)
             q_user = q_user.filter(
                 Member.moderation_action == moderation_action)
+        # The delivery mode and status are preferences, which can be set on
+        # the member, its address, or its user, so filter them on the
+        # members' effective preferences.
+        if delivery_mode is not None or delivery_status is not None:
+            q_address = self._filter(q_address, delivery_mode, delivery_status)
+            q_user = self._filter(q_user, delivery_mode, delivery_status)
         # Do a UNION of the two queries, sort the result and generate Members.
-        union = union_all(q_address, q_user).order_by(*order)
-        stmt = select(aliased(Member, union.subquery()))
-        query = QuerySequence(store, stmt)
-        # These are python attributes and not actual table colukmsn and hence
-        # their filtering can only be done in Python.
-        if delivery_status or delivery_mode:
-            return self._filter(query, delivery_mode, delivery_status)
-        return query
+        union = union_all(q_address, q_user).subquery()
+        member = aliased(Member, union)
+        # Page by the roles' values, rather than by the enums.
+        role = type_coerce(union.c.role, Integer).label('role_value')
+        return KeyedQuerySequence(store, select(member), (
+            member.list_id, union.c.email, role, member.id))
 
     def _filter(self, query, delivery_mode, delivery_status):
+        query = query.join(
+            EffectivePreferences,
+            EffectivePreferences.member_id == Member.id)
         if delivery_mode is not None:
-            query = filter(lambda m: m.delivery_mode == delivery_mode, query)
+            query = query.filter(
+                EffectivePreferences.delivery_mode == delivery_mode)
         if delivery_status is not None:
-            query = filter(
-                lambda m: m.delivery_status == delivery_status, query)
-        return list(query)
+            query = query.filter(
+                EffectivePreferences.delivery_status == delivery_status)
+        return query
 
     def find_members(self, subscriber=None, list_id=None, role=None,
                      delivery_mode=None, moderation_action=EMPTY,
@@ -15,15 +15,36 @@
 # You should have received a copy of the GNU General Public License along with
 # GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
 
-"""Template management."""
+"""Template management.
 
+Finding a template takes a query for each context it could be set for, and
+then either fetching it through the cache manager, which is another query
+and a file read, or searching the file system for the default template.
+Each process caches what it finds, for a short while:
+
+* the URI of the template set for a name and context, or that none is set;
+* the contents fetched from each template URI, except for mailman: URIs,
+  which are read from the file system every time;
+* the contents of the default templates for a name, mailing list and
+  language, along with the file they were read from and its modification
+  time, so that a template file edited in place is read again; or that there
+  is no such template.
+
+Whenever a template set or deleted is committed, or the importer writes a
+mailing list's template files, a file in the cache directory is replaced, and
+every process forgets the templates it cached when it sees that file change.
+"""
+
+import os
 import logging
 
+from lazr.config import as_timedelta
 from mailman.config import config
 from mailman.database.model import Model
 from mailman.database.transaction import dbconnection
 from mailman.database.types import SAUnicode
 from mailman.interfaces.cache import ICacheManager
+from mailman.interfaces.configuration import ConfigurationUpdatedEvent
 from mailman.interfaces.domain import IDomain
 from mailman.interfaces.mailinglist import IMailingList
 from mailman.interfaces.template import (
@@ -34,10 +55,12 @@ from mailman.interfaces.template import (
 )
 from mailman.utilities import protocols
 from mailman.utilities.i18n import find, TemplateNotFoundError
+from mailman.utilities.lrucache import LRUCache
 from mailman.utilities.string import expand
 from public import public
 from requests import HTTPError
-from sqlalchemy import Column, Integer
+from sqlalchemy import Column, event, Integer
+from sqlalchemy.orm import Session
 from urllib.error import URLError
 from urllib.parse import urlparse
 from zope.component import getUtility
@@ -45,7 +68,108 @@ from zope.interface import implementer
 
 
 COMMASPACE = ', '
+CACHE_DIR_NAME = 'templates'
+CHANGED_FILE_NAME = 'changed'
+
 log = logging.getLogger('mailman.http')
+elog = logging.getLogger('mailman.error')
+
+
+# (name, context) -> (uri, username, password), or None when no template is
+# set.
+uris = LRUCache()
+# URI -> contents.
+contents = LRUCache()
+# (name, list-id, language) -> (path, modification time, contents), or the
+# exception raised when the template can't be found.
+defaults = LRUCache()
+# The inode and modification time of the changed file, when it was last
+# checked.
+_changed = None
+
+
+@public
+def clear():
+    """Forget all the cached templates."""
+    uris.clear()
+    contents.clear()
+    defaults.clear()
+
+
+def _changed_path():
+    return os.path.join(config.CACHE_DIR, CACHE_DIR_NAME, CHANGED_FILE_NAME)
+
+
+@public
+def notify_changed():
+    """Tell every process to forget the templates that they cached.
+
+    This is done by atomically replacing the changed file.
+    """
+    path = _changed_path()
+    new_path = '{}.{}.new'.format(path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(new_path, 'w'):
+            pass
+        os.rename(new_path, path)
+    except OSError as error:
+        elog.error('Unable to record a template change: %s', error)
+
+
+def _modified(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _changing(store):
+    # Forget the templates cached by this process, which sees the change
+    # straight away.  The other processes are told once it's committed, so
+    # that they can't cache the templates set before it again.
+    clear()
+    store.info['templates_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    if session.info.pop('templates_changed', False):
+        notify_changed()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    # The templates cached while the changes were visible were never
+    # committed.
+    if session.info.pop('templates_changed', False):
+        clear()
+
+
+def _check_changed():
+    # Forget the cached templates if any process changed the templates set
+    # since they were last checked.
+    global _changed
+    try:
+        stat = os.stat(_changed_path())
+    except FileNotFoundError:
+        changed = None
+    else:
+        changed = (stat.st_ino, stat.st_mtime_ns)
+    if changed != _changed:
+        clear()
+        _changed = changed
+
+
+@public
+def handle_ConfigurationUpdatedEvent(event):
+    if isinstance(event, ConfigurationUpdatedEvent):
+        size = int(event.config.mailman.template_cache_size)
+        life = as_timedelta(
+            event.config.mailman.template_cache_life).total_seconds()
+        uris.resize(size, life)
+        contents.resize(size, life)
+        defaults.resize(size, life)
 
 
 class Template(Model):
@@ -93,25 +217,41 @@ class TemplateManager:
             cache_mgr = getUtility(ICacheManager)
             actual_uri = expand(uri, None)
             cache_mgr.evict(actual_uri)
+        _changing(store)
 
     @dbconnection
     def get(self, store, name, context, **kws):
         """See `ITemplateManager`."""
-        template = store.query(Template).filter(
-            Template.name == name,
-            Template.context == context).one_or_none()
-        if template is None:
+        _check_changed()
+        missing = object()
+        setting = uris.get((name, context), missing)
+        if setting is missing:
+            template = store.query(Template).filter(
+                Template.name == name,
+                Template.context == context).one_or_none()
+            setting = (None if template is None
+                       else (template.uri, template.username,
+                             template.password))
+            uris[(name, context)] = setting
+        if setting is None:
             return None
-        actual_uri = expand(template.uri, None, kws)
+        uri, username, password = setting
+        actual_uri = expand(uri, None, kws)
+        text = contents.get(actual_uri)
+        if text is not None:
+            return text
+        # We don't need to cache mailman: contents since those are already on
+        # the file system.
+        on_file_system = (urlparse(actual_uri).scheme == 'mailman')
         cache_mgr = getUtility(ICacheManager)
-        contents = cache_mgr.get(actual_uri)
-        if contents is None:
+        text = None if on_file_system else cache_mgr.get(actual_uri)
+        if text is None:
             # It's likely that the cached contents have expired.
             auth = {}
-            if template.username is not None:
-                auth['auth'] = (template.username, template.password)
+            if username is not None:
+                auth['auth'] = (username, password)
             try:
-                contents = protocols.get(actual_uri, **auth)
+                text = protocols.get(actual_uri, **auth)
             except HTTPError as error:
                 # 404/NotFound errors are interpreted as missing templates,
                 # for which we'll return the default (i.e. the empty string).
@@ -120,12 +260,13 @@ class TemplateManager:
                     raise
                 log.exception('Cannot retrieve template at {} ({})'.format(
                     actual_uri, auth.get('auth', '<no authorization>')))
-                return ''
-            # We don't need to cache mailman: contents since those are already
-            # on the file system.
-            if urlparse(actual_uri).scheme != 'mailman':
-                cache_mgr.add(actual_uri, contents)
-        return contents
+                text = ''
+            else:
+                if not on_file_system:
+                    cache_mgr.add(actual_uri, text)
+        if not on_file_system:
+            contents[actual_uri] = text
+        return text
 
     @dbconnection
     def raw(self, store, name, context):
@@ -142,7 +283,8 @@ class TemplateManager:
             Template.context == context).one_or_none()
         if template is not None:
             store.delete(template)
-        # We don't clear the cache entry, we just let it expire.
+        # We don't clear the cache manager's entry, we just let it expire.
+        _changing(store)
 
 
 @public
@@ -196,15 +338,35 @@ class TemplateLoader:
             else:
                 if contents is not None:
                     return contents
-        # Fallback to searching within the source code.
+        # Fallback to searching within the source code.  The template
+        # manager has already forgotten the cached templates if they changed.
         code = substitutions.get('language', config.mailman.default_language)
-        # Find the template, mutating any missing template exception.
+        key = (name, None if mlist is None else mlist.list_id, code)
+        cached = defaults.get(key)
+        if isinstance(cached, Exception):
+            raise cached.with_traceback(None)
+        elif cached is not None:
+            path, modified, text = cached
+            if path is None or _modified(path) == modified:
+                return text
+        try:
+            cached = self._find(name, mlist, code)
+        except (TemplateNotFoundError, URLError) as error:
+            defaults[key] = error
+            raise
+        defaults[key] = cached
+        path, modified, text = cached
+        return text
+
+    def _find(self, name, mlist, code):
+        # Find the template, mutating any missing template exception.  Return
+        # the path of the template, its modification time and its contents.
         missing = object()
         default_uri = ALL_TEMPLATES.get(name, missing)
         if default_uri is None:
             # Currently default_uri is never None, but leave this in case
             # of a future change.
-            return ''                                       # pragma: nocover
+            return None, None, ''                           # pragma: nocover
         elif default_uri is missing:
             raise URLError('No such file')
         try:
@@ -216,6 +378,6 @@ class TemplateLoader:
                 raise                                       # pragma: nocover
             path, fp = find(default_uri, mlist, code)
         try:
-            return fp.read()
+            return path, os.fstat(fp.fileno()).st_mtime_ns, fp.read()
         finally:
             fp.close()
@@ -17,12 +17,18 @@
 
 """Test Bans and the ban manager."""
 
+import re
 import unittest
 
 from mailman.app.lifecycle import create_list
+from mailman.config import config
+from mailman.database import lookups
 from mailman.interfaces.bans import IBanManager
 from mailman.interfaces.listmanager import IListManager
+from mailman.model.bans import BanSet
+from mailman.model.mailinglist import MailingList
 from mailman.testing.layers import ConfigLayer
+from sqlalchemy import event
 from zope.component import getUtility
 
 
@@ -63,3 +69,164 @@ class TestMailingListBans(unittest.TestCase):
         self.assertEqual(
             [self._manager.bans[i].email for i in range(count)],
             ['ant@example.com', 'bee@example.com', 'cat@example.com'])
+
+
+class TestBanSet(unittest.TestCase):
+    def test_literal(self):
+        bans = BanSet(['anne@example.com'])
+        self.assertIn('anne@example.com', bans)
+        # Literal bans are matched exactly.
+        self.assertNotIn('ANNE@example.com', bans)
+        self.assertNotIn('anne@example.co', bans)
+
+    def test_patterns(self):
+        bans = BanSet(['^.*@example.com', '^bart', '^cris@'])
+        self.assertIn('anne@EXAMPLE.COM', bans)
+        self.assertIn('Bart@example.org', bans)
+        self.assertIn('cris@example.org', bans)
+        self.assertNotIn('dave@example.org', bans)
+        # Patterns are matched at the start of the address.
+        self.assertNotIn('anne@example.org.bart', bans)
+
+    def test_uncombinable_patterns(self):
+        # Patterns that refer to their groups, or set flags, are matched on
+        # their own.
+        bans = BanSet(['^(a)\\1@', '^(?P<x>b)(?P=x)@', '^(?P<x>c)@',
+                       '^(?s:d.)@', '^e@'])
+        self.assertIn('aa@example.com', bans)
+        self.assertNotIn('ab@example.com', bans)
+        self.assertIn('bb@example.com', bans)
+        self.assertIn('c@example.com', bans)
+        self.assertIn('d\n@example.com', bans)
+        self.assertIn('e@example.com', bans)
+        self.assertNotIn('f@example.com', bans)
+
+    def test_invalid_pattern(self):
+        # An invalid pattern can't be combined into a valid one.
+        with self.assertRaises(re.error):
+            BanSet(['^a)|(b', '^c'])
+
+    def test_reuse_patterns(self):
+        bans = BanSet(['^a', '^b', 'cris@example.com'])
+        again = BanSet(['^a', '^b', 'dave@example.com'], bans)
+        self.assertIs(again._matchers, bans._matchers)
+        self.assertIn('dave@example.com', again)
+        self.assertNotIn('cris@example.com', again)
+        changed = BanSet(['^a', '^c'], bans)
+        self.assertIsNot(changed._matchers, bans._matchers)
+        self.assertIn('c@example.com', changed)
+        self.assertNotIn('b@example.com', changed)
+
+
+class TestCachedBans(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('ant@example.com')
+        self._manager = IBanManager(self._mlist)
+        self._global_manager = IBanManager(None)
+        self._manager.ban('anne@example.com')
+        self._manager.ban('^bart')
+        self._global_manager.ban('cris@example.com')
+        self._global_manager.ban('^dave')
+        config.db.commit()
+        self._statements = []
+        engine = config.db.engine
+        event.listen(engine, 'before_cursor_execute', self._count)
+        self.addCleanup(
+            event.remove, engine, 'before_cursor_execute', self._count)
+
+    def _count(self, connection, cursor, statement, *args):
+        self._statements.append(statement)
+
+    def _bans_version(self):
+        return config.db.store.query(MailingList._bans_version).filter(
+            MailingList._list_id == 'ant.example.com').scalar()
+
+    def test_cached(self):
+        for email in ('anne@example.com', 'bart@example.com',
+                      'cris@example.com', 'dave@example.com'):
+            self.assertTrue(self._manager.is_banned(email))
+        self.assertFalse(self._manager.is_banned('elle@example.com'))
+        # After the first check, only the ban version is read.
+        del self._statements[:]
+        self.assertTrue(self._manager.is_banned('dave@example.com'))
+        self.assertFalse(self._manager.is_banned('elle@example.com'))
+        self.assertEqual(len(self._statements), 2)
+        for statement in self._statements:
+            self.assertIn('bans_version', statement)
+
+    def test_global_bans(self):
+        self.assertFalse(self._global_manager.is_banned('anne@example.com'))
+        self.assertTrue(self._global_manager.is_banned('cris@example.com'))
+        self.assertTrue(self._global_manager.is_banned('dave@example.com'))
+        self._global_manager.unban('^dave')
+        self.assertFalse(self._global_manager.is_banned('dave@example.com'))
+
+    def test_global_bans_cached(self):
+        self.assertTrue(self._global_manager.is_banned('dave@example.com'))
+        # After the first check, only the global ban version is read.
+        del self._statements[:]
+        self.assertTrue(self._global_manager.is_banned('cris@example.com'))
+        self.assertFalse(self._global_manager.is_banned('elle@example.com'))
+        self.assertEqual(len(self._statements), 2)
+        for statement in self._statements:
+            self.assertIn('global_bans_version', statement)
+        # Changing the global bans changes their version.
+        self._global_manager.ban('elle@example.com')
+        config.db.commit()
+        self.assertTrue(self._global_manager.is_banned('elle@example.com'))
+
+    def test_list_ban_versions(self):
+        versions = [self._bans_version()]
+        self._manager.ban('elle@example.com')
+        versions.append(self._bans_version())
+        self._manager.unban('elle@example.com')
+        versions.append(self._bans_version())
+        # Changing the global bans changes every list's version.
+        self._global_manager.ban('elle@example.com')
+        versions.append(self._bans_version())
+        self.assertEqual(len(set(versions)), 4)
+        # Other lists' bans don't change this list's version.
+        IBanManager(create_list('bee@example.com')).ban('fred@example.com')
+        self.assertEqual(self._bans_version(), versions[-1])
+
+    def test_changed_bans(self):
+        self.assertFalse(self._manager.is_banned('elle@example.com'))
+        self.assertFalse(self._manager.is_banned('fred@example.com'))
+        # The bans that were cached are for the list's old ban version.
+        self._manager.ban('elle@example.com')
+        self._global_manager.ban('^fred')
+        config.db.commit()
+        self.assertTrue(self._manager.is_banned('elle@example.com'))
+        self.assertTrue(self._manager.is_banned('fred@example.com'))
+        self._manager.unban('elle@example.com')
+        self._global_manager.unban('^fred')
+        config.db.commit()
+        self.assertFalse(self._manager.is_banned('elle@example.com'))
+        self.assertFalse(self._manager.is_banned('fred@example.com'))
+
+    def test_global_bans_not_older(self):
+        # A list whose bans are cached for its current version still sees
+        # the global bans changed since another list's were cached.
+        bee = IBanManager(create_list('bee@example.com'))
+        config.db.commit()
+        self.assertFalse(bee.is_banned('elle@example.com'))
+        self._global_manager.ban('elle@example.com')
+        config.db.commit()
+        self.assertTrue(self._manager.is_banned('elle@example.com'))
+        self.assertTrue(bee.is_banned('elle@example.com'))
+
+    def test_rolled_back_bans(self):
+        self.assertFalse(self._manager.is_banned('elle@example.com'))
+        self._global_manager.ban('elle@example.com')
+        self.assertTrue(self._manager.is_banned('elle@example.com'))
+        config.db.abort()
+        self.assertEqual(len(lookups.bans), 0)
+        self.assertFalse(self._manager.is_banned('elle@example.com'))
+
+    def test_deleted_list(self):
+        self._manager.is_banned('anne@example.com')
+        self.assertIn('ant.example.com', lookups.bans)
+        getUtility(IListManager).delete(self._mlist)
+        self.assertNotIn('ant.example.com', lookups.bans)
@@ -344,3 +344,60 @@ Message-Id: <first>
             owner_notif.msg['subject'],
             'anne@example.com unsubscribed from Test mailing list due '
             'to bounces')
+
+    def test_process_events(self):
+        # All the pending events are processed together.
+        self._mlist.bounce_score_threshold = 10
+        anne = self._subscribe_and_add_bounce_event('anne@example.com')
+        self._subscribe_and_add_bounce_event(
+            'anne@example.com', create=False, subscribe=False)
+        bart = self._subscribe_and_add_bounce_event('bart@example.com')
+        self._subscribe_and_add_bounce_event('cris@example.com',
+                                             subscribe=False)
+        events = list(self._processor.unprocessed)
+        # Anne's bounces are on different days.
+        with transaction():
+            events[0].timestamp -= timedelta(days=2)
+        self.assertEqual(self._processor.process_events(), 4)
+        self.assertEqual(anne.bounce_score, 2)
+        self.assertEqual(anne.last_bounce_received, events[1].timestamp)
+        self.assertEqual(bart.bounce_score, 1)
+        self.assertEqual(list(self._processor.unprocessed), [])
+        self.assertEqual(self._processor.process_events(), 0)
+
+    def test_process_events_in_batches(self):
+        for i in range(5):
+            self._subscribe_and_add_bounce_event(
+                'person{}@example.com'.format(i))
+        self.assertEqual(self._processor.process_events(batch_size=2), 5)
+        self.assertEqual(list(self._processor.unprocessed), [])
+        for i in range(5):
+            member = self._mlist.members.get_member(
+                'person{}@example.com'.format(i))
+            self.assertEqual(member.bounce_score, 1)
+
+    @configuration('bounces', process_events_batch_size='0')
+    def test_process_events_in_one_batch(self):
+        for i in range(3):
+            self._subscribe_and_add_bounce_event(
+                'person{}@example.com'.format(i))
+        self.assertEqual(self._processor.process_events(), 3)
+        self.assertEqual(list(self._processor.unprocessed), [])
+
+    def test_process_events_for_non_members(self):
+        # Events for addresses which aren't members, or lists which don't
+        # exist, are processed without doing anything.
+        self._subscribe_and_add_bounce_event('anne@example.com',
+                                             subscribe=False)
+        with transaction():
+            ant = create_list('ant@example.com')
+            self._processor.register(ant, 'bart@example.com', self._msg)
+            remove_list(ant)
+        mark = LogFileMark('mailman.bounce')
+        self.assertEqual(self._processor.process_events(), 2)
+        self.assertEqual(list(self._processor.unprocessed), [])
+        log = mark.read()
+        self.assertIn(
+            'Bounce for anne@example.com, who is not a subscriber of '
+            'test.example.com', log)
+        self.assertIn('Bounce for non-existent list ant.example.com', log)
@@ -19,11 +19,21 @@
 
 import unittest
 
+from mailman.app.lifecycle import create_list
+from mailman.config import config
 from mailman.interfaces.languages import ILanguageManager
 from mailman.interfaces.member import DeliveryMode, DeliveryStatus
 from mailman.interfaces.preferences import IPreferences
-from mailman.model.preferences import Preferences
+from mailman.interfaces.usermanager import IUserManager
+from mailman.model.preferences import (
+    EffectivePreferences,
+    MEMBER_PREFERENCES,
+    Preferences,
+    refresh_effective_preferences,
+)
+from mailman.testing.helpers import subscribe
 from mailman.testing.layers import ConfigLayer
+from mailman.utilities.datetime import now
 from zope.component import getUtility
 from zope.interface import Attribute
 from zope.interface.interface import Method
@@ -92,3 +102,93 @@ class TestPreferences(unittest.TestCase):
     def test_type_error(self):
         preferences = Preferences()
         self.assertRaises(TypeError, preferences.absorb, None)
+
+
+class TestEffectivePreferences(unittest.TestCase):
+    """Test that members' effective preferences are kept up to date."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('ant@example.com')
+        self._user_manager = getUtility(IUserManager)
+        self._anne = subscribe(self._mlist, 'Anne')
+        self._bart = subscribe(self._mlist, 'Bart', as_user=True)
+
+    def _check(self, *members):
+        # The effective preferences agree with the member's own lookups.
+        store = config.db.store
+        store.flush()
+        for member in members:
+            effective = store.query(EffectivePreferences).get(member.id)
+            self.assertEqual(
+                effective.email,
+                None if member.address is None else member.address.email)
+            self.assertEqual(effective.list_id, member.list_id)
+            self.assertEqual(effective.role, member.role)
+            if member.address is None:
+                # The member doesn't receive any messages.
+                continue
+            for name in MEMBER_PREFERENCES:
+                value = getattr(member, name)
+                if name == 'preferred_language':
+                    value = (None if effective.preferred_language is None
+                             else value.code)
+                self.assertEqual(getattr(effective, name), value, name)
+
+    def test_subscribe(self):
+        self._check(self._anne, self._bart)
+
+    def test_member_preferences(self):
+        self._anne.preferences.delivery_mode = DeliveryMode.mime_digests
+        self._anne.preferences.preferred_language = 'fr'
+        self._check(self._anne)
+        self.assertEqual(self._anne.preferred_language.code, 'fr')
+
+    def test_address_preferences(self):
+        self._anne.address.preferences.acknowledge_posts = True
+        self._bart.address.preferences.delivery_status = (
+            DeliveryStatus.by_user)
+        self._check(self._anne, self._bart)
+
+    def test_user_preferences(self):
+        self._anne.user.preferences.receive_list_copy = False
+        self._bart.user.preferences.receive_own_postings = False
+        self._check(self._anne, self._bart)
+
+    def test_preferred_address(self):
+        # Bart's deliveries follow his preferred address.
+        address = self._user_manager.create_address('bart@example.org')
+        address.preferences.delivery_mode = DeliveryMode.summary_digests
+        address.verified_on = now()
+        self._bart.user.link(address)
+        self._bart.user.preferred_address = address
+        self._check(self._bart)
+        self.assertEqual(self._bart.address.email, 'bart@example.org')
+        del self._bart.user.preferred_address
+        self._check(self._bart)
+        self.assertIsNone(self._bart.address)
+
+    def test_unlink(self):
+        # Once Anne's address is unlinked, her user's preferences no longer
+        # apply.
+        self._anne.user.preferences.delivery_status = DeliveryStatus.by_user
+        self._check(self._anne)
+        self._anne.user.unlink(self._anne.address)
+        self._check(self._anne)
+        self.assertEqual(self._anne.delivery_status, DeliveryStatus.enabled)
+
+    def test_unsubscribe(self):
+        member_id = self._anne.id
+        self._anne.unsubscribe()
+        config.db.store.flush()
+        self.assertIsNone(
+            config.db.store.query(EffectivePreferences).get(member_id))
+
+    def test_refresh(self):
+        # The effective preferences can be recalculated from scratch.
+        store = config.db.store
+        store.flush()
+        store.query(EffectivePreferences).delete()
+        refresh_effective_preferences(store, [self._anne.id, self._bart.id])
+        self._check(self._anne, self._bart)
@@ -21,7 +21,7 @@ import unittest
 
 from mailman.app.lifecycle import create_list
 from mailman.interfaces.address import IAddress
-from mailman.interfaces.member import DeliveryMode, MemberRole
+from mailman.interfaces.member import DeliveryMode, DeliveryStatus, MemberRole
 from mailman.interfaces.user import IUser
 from mailman.interfaces.usermanager import IUserManager
 from mailman.testing.helpers import set_preferred
@@ -131,6 +131,16 @@ class TestMailingListRoster(unittest.TestCase):
         self.assertEqual(moderator.role, MemberRole.moderator)
         self.assertIsNone(nobody)
 
+    def test_get_administrators(self):
+        self._mlist.subscribe(self._anne, role=MemberRole.owner)
+        self._mlist.subscribe(self._anne, role=MemberRole.moderator)
+        self._mlist.subscribe(self._bart, role=MemberRole.moderator)
+        admins = self._mlist.administrators.get_members(
+            [self._anne.email, self._bart.email, self._cris.email])
+        self.assertEqual(len(admins), 2)
+        self.assertEqual(admins[self._anne.email].role, MemberRole.owner)
+        self.assertEqual(admins[self._bart.email].role, MemberRole.moderator)
+
     def test_address_is_both_owner_and_moderator(self):
         # Anne is both owner and moderator.  The administrators.get_member()
         # method returns the owner.
@@ -141,6 +151,98 @@ class TestMailingListRoster(unittest.TestCase):
         self.assertEqual(admin.role, MemberRole.owner)
 
 
+class TestDeliveryRosters(unittest.TestCase):
+    """Test the rosters of members by their delivery preferences."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('test@example.com')
+        self._user_manager = getUtility(IUserManager)
+
+    def _subscribe(self, email, as_user=False):
+        user = self._user_manager.create_user(email)
+        set_preferred(user)
+        return self._mlist.subscribe(
+            user if as_user else user.preferred_address)
+
+    def test_preference_lookup(self):
+        # The delivery preferences are looked up in the member, the address,
+        # the user and finally the system defaults.
+        anne = self._subscribe('anne@example.com')
+        bart = self._subscribe('bart@example.com')
+        cris = self._subscribe('cris@example.com', as_user=True)
+        dave = self._subscribe('dave@example.com')
+        self._subscribe('elle@example.com')
+        anne.preferences.delivery_mode = DeliveryMode.mime_digests
+        bart.address.preferences.delivery_mode = DeliveryMode.plaintext_digests
+        cris.user.preferences.delivery_mode = DeliveryMode.summary_digests
+        # Dave's membership overrides his user's preference.
+        dave.user.preferences.delivery_mode = DeliveryMode.mime_digests
+        dave.preferences.delivery_mode = DeliveryMode.regular
+        self.assertEqual(
+            sorted(member.address.email
+                   for member in self._mlist.regular_members.members),
+            ['dave@example.com', 'elle@example.com'])
+        self.assertEqual(
+            sorted(member.address.email
+                   for member in self._mlist.digest_members.members),
+            ['anne@example.com', 'bart@example.com', 'cris@example.com'])
+        self.assertEqual(self._mlist.regular_members.member_count, 2)
+        self.assertEqual(self._mlist.digest_members.member_count, 3)
+        # The database agrees with the members' own lookups.
+        for member in self._mlist.members.members:
+            roster = (self._mlist.regular_members
+                      if member.delivery_mode == DeliveryMode.regular
+                      else self._mlist.digest_members)
+            self.assertIn(member, list(roster.members))
+
+    def test_get_recipients(self):
+        self._subscribe('anne@example.com')
+        bart = self._subscribe('bart@example.com')
+        cris = self._subscribe('cris@example.com', as_user=True)
+        dave = self._subscribe('dave@example.com')
+        bart.preferences.delivery_status = DeliveryStatus.by_user
+        cris.user.preferences.delivery_status = DeliveryStatus.by_bounces
+        dave.preferences.delivery_mode = DeliveryMode.mime_digests
+        self.assertEqual(self._mlist.regular_members.get_recipients(),
+                         {'anne@example.com'})
+        self.assertEqual(self._mlist.digest_members.get_recipients(),
+                         {'dave@example.com'})
+
+    def test_get_recipient_modes(self):
+        anne = self._subscribe('Anne@example.com')
+        bart = self._subscribe('bart@example.com', as_user=True)
+        cris = self._subscribe('cris@example.com')
+        self._subscribe('dave@example.com')
+        anne.preferences.delivery_mode = DeliveryMode.mime_digests
+        bart.user.preferences.delivery_mode = DeliveryMode.plaintext_digests
+        cris.preferences.delivery_mode = DeliveryMode.summary_digests
+        cris.preferences.delivery_status = DeliveryStatus.by_user
+        self.assertEqual(
+            sorted(self._mlist.digest_members.get_recipient_modes()), [
+                ('Anne@example.com', DeliveryMode.mime_digests),
+                ('bart@example.com', DeliveryMode.plaintext_digests),
+                ])
+        self.assertEqual(
+            self._mlist.regular_members.get_recipient_modes(),
+            [('dave@example.com', DeliveryMode.regular)])
+
+    def test_user_without_preferred_address(self):
+        # A user subscribed through a preferred address that was since
+        # removed has nowhere to receive messages.
+        cris = self._subscribe('cris@example.com', as_user=True)
+        del cris.user.preferred_address
+        self.assertEqual(self._mlist.regular_members.member_count, 0)
+        self.assertEqual(self._mlist.regular_members.get_recipients(), set())
+
+    def test_nonmembers_are_not_recipients(self):
+        address = self._user_manager.create_address('anne@example.com')
+        self._mlist.subscribe(address, MemberRole.nonmember)
+        self.assertEqual(self._mlist.regular_members.member_count, 0)
+        self.assertEqual(self._mlist.regular_members.get_recipients(), set())
+
+
 class TestMembershipsRoster(unittest.TestCase):
     """Test the memberships roster."""
 
@@ -211,6 +313,30 @@ class TestMembershipsRoster(unittest.TestCase):
             [record.address.email for record in memberships],
             ['anne@example.com', 'anne@example.com'])
 
+    def test_get_members(self):
+        # Anne is subscribed as a user and with her explicit address, Bart
+        # only with an address, and Cris not at all.
+        user_manager = getUtility(IUserManager)
+        bart = user_manager.create_address('bart@example.com')
+        self._ant.subscribe(self._anne)
+        self._ant.subscribe(self._anne.preferred_address)
+        self._ant.subscribe(bart)
+        members = self._ant.members.get_members(
+            ['anne@example.com', 'bart@example.com', 'cris@example.com'])
+        self.assertEqual(sorted(members), [
+            'anne@example.com', 'bart@example.com'])
+        # Like get_member(), get_members() returns the explicit address.
+        for email, member in members.items():
+            self.assertEqual(member, self._ant.members.get_member(email))
+            self.assertTrue(IAddress.providedBy(member.subscriber))
+
+    def test_get_members_as_user(self):
+        self._ant.subscribe(self._anne)
+        members = self._ant.members.get_members(['anne@example.com'])
+        self.assertEqual(members['anne@example.com'].user, self._anne)
+        self.assertEqual(self._bee.members.get_members(
+            ['anne@example.com']), {})
+
     def test_memberships_users(self):
         self._ant.subscribe(self._anne)
         users = list(self._anne.memberships.users)
@@ -617,3 +617,28 @@ class TestSubscriptionService(unittest.TestCase):
             delivery_status=DeliveryStatus.by_user)
         self.assertEqual(len(members), 1)
         self.assertEqual(members[0].address, anne)
+
+    def test_find_members_by_user_preferences(self):
+        # Members subscribed as a user are found by the preferences of the
+        # user and their preferred address.
+        anne = self._user_manager.create_user('anne@example.com')
+        set_preferred(anne)
+        anne.preferences.delivery_mode = DeliveryMode.mime_digests
+        anne_member = self._mlist.subscribe(anne)
+        bart = self._user_manager.create_user('bart@example.com')
+        set_preferred(bart).preferences.delivery_status = (
+            DeliveryStatus.by_user)
+        bart_member = self._mlist.subscribe(bart)
+        members = self._service.find_members(
+            delivery_mode=DeliveryMode.mime_digests)
+        self.assertEqual(list(members), [anne_member])
+        members = self._service.find_members(
+            list_id='test.example.com',
+            delivery_mode=DeliveryMode.regular,
+            delivery_status=DeliveryStatus.by_user)
+        self.assertEqual(list(members), [bart_member])
+        # Changing the preferences is reflected in the results.
+        bart.preferences.delivery_mode = DeliveryMode.mime_digests
+        members = self._service.find_members(
+            delivery_mode=DeliveryMode.mime_digests)
+        self.assertEqual(len(members), 2)
@@ -17,6 +17,8 @@
 
 """Test the template manager."""
 
+import os
+import shutil
 import unittest
 import threading
 
@@ -26,10 +28,13 @@ from mailman.app.lifecycle import create_list
 from mailman.config import config
 from mailman.interfaces.domain import IDomainManager
 from mailman.interfaces.template import ITemplateLoader, ITemplateManager
-from mailman.testing.helpers import wait_for_webservice
+from mailman.model import template
+from mailman.model.template import Template
+from mailman.testing.helpers import configuration, wait_for_webservice
 from mailman.testing.layers import ConfigLayer
-from mailman.utilities.i18n import find
+from mailman.utilities.i18n import find, TemplateNotFoundError
 from requests import HTTPError
+from sqlalchemy import event
 from tempfile import TemporaryDirectory
 from unittest import mock
 from urllib.error import URLError
@@ -308,6 +313,205 @@ class TestTemplateLoader(unittest.TestCase):
         self.assertRaises(URLError, self._loader.get, 'forbidden', self._mlist)
 
 
+class TestTemplateLookupCache(unittest.TestCase):
+    """Test the templates cached by each process."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('test@example.com')
+        self._loader = getUtility(ITemplateLoader)
+        self._manager = getUtility(ITemplateManager)
+        self._statements = []
+        engine = config.db.engine
+        event.listen(engine, 'before_cursor_execute', self._count)
+        self.addCleanup(
+            event.remove, engine, 'before_cursor_execute', self._count)
+
+    def _count(self, connection, cursor, statement, *args):
+        self._statements.append(statement)
+
+    def test_set_template_cached(self):
+        self._manager.set(
+            'list:user:notice:welcome', 'test.example.com',
+            'http://example.com/welcome.txt')
+        with mock.patch('mailman.model.template.protocols.get',
+                        return_value='Welcome') as get:
+            self.assertEqual(
+                self._manager.get(
+                    'list:user:notice:welcome', 'test.example.com'),
+                'Welcome')
+            del self._statements[:]
+            self.assertEqual(
+                self._manager.get(
+                    'list:user:notice:welcome', 'test.example.com'),
+                'Welcome')
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(self._statements, [])
+
+    def test_mailman_contents_not_cached(self):
+        # Template files found through mailman: URIs may be edited in place.
+        self._manager.set(
+            'list:user:notice:welcome', 'test.example.com',
+            'mailman:///list:user:notice:welcome.txt')
+        self._manager.get('list:user:notice:welcome', 'test.example.com')
+        del self._statements[:]
+        with mock.patch('mailman.model.template.protocols.get',
+                        return_value='Welcome') as get:
+            self.assertEqual(
+                self._manager.get(
+                    'list:user:notice:welcome', 'test.example.com'),
+                'Welcome')
+        self.assertEqual(get.call_count, 1)
+        # The template set is still cached though.
+        self.assertEqual(self._statements, [])
+
+    def test_unset_template_cached(self):
+        self.assertIsNone(
+            self._manager.get('list:user:notice:welcome', 'test.example.com'))
+        del self._statements[:]
+        self.assertIsNone(
+            self._manager.get('list:user:notice:welcome', 'test.example.com'))
+        self.assertEqual(self._statements, [])
+
+    def test_set_forgets_unset_template(self):
+        self.assertIsNone(
+            self._manager.get('list:user:notice:welcome', 'test.example.com'))
+        self._manager.set(
+            'list:user:notice:welcome', 'test.example.com',
+            'mailman:///list:user:notice:welcome.txt')
+        self.assertIsNotNone(
+            self._manager.get('list:user:notice:welcome', 'test.example.com'))
+
+    def test_delete_forgets_template(self):
+        self._manager.set(
+            'list:user:notice:welcome', 'test.example.com',
+            'mailman:///list:user:notice:welcome.txt')
+        self._manager.get('list:user:notice:welcome', 'test.example.com')
+        self._manager.delete('list:user:notice:welcome', 'test.example.com')
+        self.assertIsNone(
+            self._manager.get('list:user:notice:welcome', 'test.example.com'))
+
+    def test_set_elsewhere(self):
+        # Another process sets a template.
+        self.assertIsNone(
+            self._manager.get('list:user:notice:welcome', 'test.example.com'))
+        config.db.store.add(Template(
+            'list:user:notice:welcome', 'test.example.com',
+            'mailman:///list:user:notice:welcome.txt', None, ''))
+        template.notify_changed()
+        self.assertIsNotNone(
+            self._manager.get('list:user:notice:welcome', 'test.example.com'))
+
+    def test_set_notified_after_commit(self):
+        # Other processes are only told that a template was set once it's
+        # committed, so any that look in between can't keep the template
+        # set before it.
+        self._manager.set(
+            'list:user:notice:welcome', 'test.example.com',
+            'http://example.com/old.txt')
+        config.db.commit()
+        self._manager.set(
+            'list:user:notice:welcome', 'test.example.com',
+            'http://example.com/new.txt')
+        # Another process looks before the change is committed.
+        template._check_changed()
+        template.uris[('list:user:notice:welcome', 'test.example.com')] = (
+            'http://example.com/old.txt', None, '')
+        config.db.commit()
+        template._check_changed()
+        self.assertNotIn(
+            ('list:user:notice:welcome', 'test.example.com'), template.uris)
+
+    def test_set_not_notified_on_rollback(self):
+        template._check_changed()
+        changed = template._changed
+        self._manager.set(
+            'list:user:notice:welcome', 'test.example.com',
+            'mailman:///list:user:notice:welcome.txt')
+        self.assertIsNotNone(
+            self._manager.get('list:user:notice:welcome', 'test.example.com'))
+        config.db.abort()
+        template._check_changed()
+        self.assertEqual(template._changed, changed)
+        # This process forgets what it cached while the template was set.
+        self.assertIsNone(
+            self._manager.get('list:user:notice:welcome', 'test.example.com'))
+
+    def test_default_template_cached(self):
+        contents = self._loader.get('list:user:notice:welcome', self._mlist)
+        del self._statements[:]
+        with mock.patch('mailman.model.template.find') as find:
+            self.assertEqual(
+                self._loader.get('list:user:notice:welcome', self._mlist),
+                contents)
+        find.assert_not_called()
+        # Looking up the templates set for the list, its domain and the
+        # site doesn't take any queries either.
+        self.assertEqual(
+            [statement for statement in self._statements
+             if 'FROM template' in statement],
+            [])
+
+    def test_default_template_per_language(self):
+        self._loader.get('list:user:notice:welcome', self._mlist)
+        with mock.patch('mailman.model.template.find',
+                        side_effect=find) as mocked_find:
+            self._loader.get(
+                'list:user:notice:welcome', self._mlist, language='fr')
+        self.assertEqual(mocked_find.call_count, 1)
+
+    def test_default_template_personalized(self):
+        # The keywords passed when decorating personalized messages don't
+        # make for different default templates.
+        with mock.patch('mailman.model.template.find',
+                        side_effect=find) as mocked_find:
+            for email in ('anne@example.com', 'bart@example.com'):
+                self._loader.get(
+                    'list:user:notice:welcome', self._mlist,
+                    user_email=email)
+        self.assertEqual(mocked_find.call_count, 1)
+
+    def test_missing_template_cached(self):
+        with mock.patch('mailman.model.template.find',
+                        side_effect=TemplateNotFoundError('footer')) as find:
+            for i in range(2):
+                with self.assertRaises(TemplateNotFoundError):
+                    self._loader.get(
+                        'list:member:regular:footer', self._mlist)
+        # The template and its alternative name were searched for once.
+        self.assertEqual(find.call_count, 2)
+
+    def test_default_template_edited(self):
+        # A default template file edited in place is read again.
+        path = os.path.join(
+            config.TEMPLATE_DIR, 'lists', self._mlist.list_id, 'en',
+            'list:user:notice:welcome.txt')
+        os.makedirs(os.path.dirname(path))
+        self.addCleanup(shutil.rmtree, os.path.join(
+            config.TEMPLATE_DIR, 'lists', self._mlist.list_id))
+        with open(path, 'w') as fp:
+            fp.write('Welcome')
+        self.assertEqual(
+            self._loader.get('list:user:notice:welcome', self._mlist),
+            'Welcome')
+        with open(path, 'w') as fp:
+            fp.write('Hello')
+        modified = os.stat(path).st_mtime_ns + 1000000000
+        os.utime(path, ns=(modified, modified))
+        self.assertEqual(
+            self._loader.get('list:user:notice:welcome', self._mlist),
+            'Hello')
+
+    @configuration('mailman', template_cache_size=0)
+    def test_no_cache(self):
+        self._loader.get('list:user:notice:welcome', self._mlist)
+        with mock.patch('mailman.model.template.find',
+                        side_effect=find) as mocked_find:
+            self._loader.get('list:user:notice:welcome', self._mlist)
+        self.assertEqual(mocked_find.call_count, 1)
+
+
 # Response texts.
 WELCOME_1 = """\
 Welcome to the {fqdn_listname} mailing list!
@@ -26,7 +26,7 @@ from mailman.model.digests import OneLastDigest
 from mailman.model.member import Member
 from mailman.model.preferences import Preferences
 from mailman.model.user import User
-from mailman.utilities.queries import QuerySequence
+from mailman.utilities.queries import KeyedQuerySequence
 from public import public
 from sqlalchemy import or_, select
 from zope.interface import implementer
@@ -103,7 +103,7 @@ class UserManager:
     @dbconnection
     def users(self, store):
         """See `IUserManager`."""
-        return QuerySequence(store, select(User).order_by(User.id))
+        return KeyedQuerySequence(store, select(User), (User.id,))
 
     @dbconnection
     def create_address(self, store, email, display_name=None):
@@ -18,6 +18,7 @@
 """Individualized delivery arc signing after decoration."""
 
 from mailman.config import config
+from mailman.handlers.arc_sign import get_pool, Signature
 from public import public
 
 
@@ -25,9 +26,29 @@ from public import public
 class ARCSigningMixin:
     """ARC Sign a message after decoration.."""
 
+    # See `IndividualDelivery`.
+    pipeline_depth = 0
+
     def arc_sign(self, mlist, msg, msgdata):
-        """ARC sign a message."""
+        """ARC sign a message.
+
+        If the delivery crafts messages ahead of sending them, and signing is
+        offloaded to other processes, the signature is only started here.
+        It's added to the message by `finish()`.
+        """
         if not msgdata.get('arc_signed'):
-            config.handlers['arc-sign'].process(mlist, msg, msgdata)
+            pool = (get_pool()
+                    if config.arc_enabled and self.pipeline_depth > 0
+                    else None)
+            if pool is None:
+                config.handlers['arc-sign'].process(mlist, msg, msgdata)
+            else:
+                msgdata['arc-signature'] = Signature(msg, msgdata, pool)
             # Only sign once.
             msgdata['arc_signed'] = True
+
+    def finish(self, mlist, msg, msgdata):
+        """Add the message's signature, once it has been calculated."""
+        signature = msgdata.pop('arc-signature', None)
+        if signature is not None:
+            signature.apply(msg)
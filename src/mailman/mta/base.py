@@ -22,10 +22,10 @@ import socket
 import logging
 import smtplib
 
-from lazr.config import as_boolean
+from collections import deque
 from mailman.config import config
 from mailman.interfaces.mta import IMailTransportAgentDelivery
-from mailman.mta.connection import as_SecureMode, Connection
+from mailman.mta.connection import connection_pool
 from public import public
 from zope.interface import implementer
 
@@ -40,17 +40,11 @@ class BaseDelivery:
 
     def __init__(self):
         """Create a basic deliverer."""
-        self._connection = Connection(
-            config.mta.smtp_host, int(config.mta.smtp_port),
-            int(config.mta.max_sessions_per_connection),
-            config.mta.smtp_user if config.mta.smtp_user else None,
-            config.mta.smtp_pass if config.mta.smtp_pass else None,
-            as_SecureMode(config.mta.smtp_secure_mode),
-            as_boolean(config.mta.smtp_verify_cert),
-            as_boolean(config.mta.smtp_verify_hostname),
-            )
-
-    def _deliver_to_recipients(self, mlist, msg, msgdata, recipients):
+        # The connection must be given back to the pool after delivery.
+        self._connection = connection_pool().get()
+
+    def _deliver_to_recipients(self, mlist, msg, msgdata, recipients,
+                               content=None):
         """Low-level delivery to a set of recipients.
 
         :param mlist: The mailing list being delivered to.
@@ -61,6 +55,9 @@ class BaseDelivery:
         :type msgdata: dictionary
         :param recipients: The recipients of this message.
         :type recipients: sequence
+        :param content: The already flattened message to send instead of
+            `msg`, if any.
+        :type content: bytes
         :return: delivery failures as defined by `smtplib.SMTP.sendmail`
         :rtype: dictionary
         """
@@ -71,7 +68,8 @@ class BaseDelivery:
         # email address for predictability and testability.
         try:
             refused = self._connection.sendmail(
-                sender, sorted(recipients), msg)
+                sender, sorted(recipients),
+                msg if content is None else content)
         except smtplib.SMTPRecipientsRefused as error:
             log.error('%s recipients refused: %s', message_id, error)
             refused = error.recipients
@@ -131,12 +129,18 @@ class IndividualDelivery(BaseDelivery):
     The core concept here is that for each recipient, the deliver() method
     iterates over the list of registered callbacks, each of which have a
     chance to modify the message before final delivery.
+
+    Up to `pipeline_depth` messages can be crafted ahead of the one being
+    sent, so that work the callbacks started elsewhere, e.g. signing in
+    another process, can go on in the meantime.  Each message is finished by
+    `finish()` just before it's sent.
     """
 
     def __init__(self):
         """See `BaseDelivery`."""
         super().__init__()
         self.callbacks = []
+        self.pipeline_depth = 0
 
     def deliver(self, mlist, msg, msgdata):
         """See `IMailTransportAgentDelivery`.
@@ -147,25 +151,89 @@ class IndividualDelivery(BaseDelivery):
         """
         refused = {}
         recipients = msgdata.get('recipients', set())
+        # See which recipients are members of the mailing list, and squirrel
+        # this information away for use by other modules, such as the
+        # header/footer decorator.
+        members = mlist.members.get_members(recipients)
+        # With more than one recipient, it's worth trying to decorate the
+        # message only once.
+        template = (self.make_template(mlist, msg, msgdata)
+                    if len(recipients) > 1
+                    else None)
+        # The crafted messages waiting to be finished and sent.
+        crafted = deque()
         for recipient in recipients:
             log.debug('IndividualDelivery to: %s', recipient)
-            # Make a copy of the original messages and operator on it, since
-            # we're going to munge it repeatedly for each recipient.
-            message_copy = copy.deepcopy(msg)
             msgdata_copy = msgdata.copy()
             # Squirrel the current recipient away in the message metadata.
             # That way the subclass's _get_sender() override can encode the
             # recipient address in the sender, e.g. for VERP.
             msgdata_copy['recipient'] = recipient
-            # See if the recipient is a member of the mailing list, and if so,
-            # squirrel this information away for use by other modules, such as
-            # the header/footer decorator.  XXX 2012-03-05 this is probably
-            # highly inefficient on the database.
-            member = mlist.members.get_member(recipient)
-            msgdata_copy['member'] = member
-            for callback in self.callbacks:
-                callback(mlist, message_copy, msgdata_copy)
-            status = self._deliver_to_recipients(
-                mlist, message_copy, msgdata_copy, [recipient])
+            msgdata_copy['member'] = members.get(recipient)
+            content = (None
+                       if template is None
+                       else self.render(template, mlist, msgdata_copy))
+            if content is not None:
+                status = self._deliver_to_recipients(
+                    mlist, msg, msgdata_copy, [recipient], content)
+            else:
+                # Make a copy of the original messages and operator on it,
+                # since we're going to munge it repeatedly for each recipient.
+                message_copy = copy.deepcopy(msg)
+                for callback in self.callbacks:
+                    callback(mlist, message_copy, msgdata_copy)
+                crafted.append((message_copy, msgdata_copy))
+                status = {}
+                while len(crafted) > self.pipeline_depth:
+                    status.update(self._finish_and_deliver(
+                        mlist, *crafted.popleft()))
             refused.update(status)
+        while len(crafted) > 0:
+            refused.update(self._finish_and_deliver(
+                mlist, *crafted.popleft()))
         return refused
+
+    def _finish_and_deliver(self, mlist, msg, msgdata):
+        self.finish(mlist, msg, msgdata)
+        return self._deliver_to_recipients(
+            mlist, msg, msgdata, [msgdata['recipient']])
+
+    def finish(self, mlist, msg, msgdata):
+        """Finish crafting a recipient's message, just before it's sent.
+
+        :param mlist: The mailing list being delivered to.
+        :type mlist: `IMailingList`
+        :param msg: The recipient's message.
+        :type msg: `Message`
+        :param msgdata: The recipient's message metadata.
+        :type msgdata: dictionary
+        """
+
+    def make_template(self, mlist, msg, msgdata):
+        """Prepare to render the message for many recipients.
+
+        :param mlist: The mailing list being delivered to.
+        :type mlist: `IMailingList`
+        :param msg: The original message being delivered.
+        :type msg: `Message`
+        :param msgdata: Additional message metadata for this delivery.
+        :type msgdata: dictionary
+        :return: A template for `render()`, or None to craft every
+            recipient's message with the callbacks.  This base class always
+            returns None.
+        """
+        return None
+
+    def render(self, template, mlist, msgdata):
+        """Render the message for one recipient from a template.
+
+        :param template: The template returned by `make_template()`.
+        :param mlist: The mailing list being delivered to.
+        :type mlist: `IMailingList`
+        :param msgdata: The recipient's message metadata.
+        :type msgdata: dictionary
+        :return: The flattened message, or None to craft this recipient's
+            message with the callbacks.  This base class always returns None.
+        :rtype: bytes
+        """
+        return None
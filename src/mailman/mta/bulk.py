@@ -17,8 +17,13 @@
 
 """Bulk message delivery."""
 
+import copy
+import queue
+
+from concurrent.futures import ThreadPoolExecutor
 from mailman.mta.arc_signing import ARCSigningMixin
 from mailman.mta.base import BaseDelivery
+from mailman.mta.connection import connection_pool
 from mailman.mta.decorating import DecoratingMixin
 from public import public
 
@@ -40,18 +45,25 @@ CHUNKMAP = dict(
 class BulkDelivery(BaseDelivery, DecoratingMixin, ARCSigningMixin):
     """Deliver messages to the MSA in as few sessions as possible."""
 
-    def __init__(self, max_recipients=None):
+    def __init__(self, max_recipients=None, max_threads=None):
         """See `BaseDelivery`.
 
         :param max_recipients: The maximum number of recipients per delivery
             chunk.  None, zero or less means to group all recipients into one
             big chunk.
         :type max_recipients: integer
+        :param max_threads: The maximum number of chunks to deliver at the
+            same time, each over its own connection to the SMTP server.  None,
+            one or less means to deliver the chunks one after the other.
+        :type max_threads: integer
         """
         super().__init__()
         self._max_recipients = (max_recipients
                                 if max_recipients is not None
                                 else 0)
+        self._max_threads = (max_threads
+                             if max_threads is not None
+                             else 0)
 
     def chunkify(self, recipients):
         """Split a set of recipients into chunks.
@@ -100,9 +112,50 @@ class BulkDelivery(BaseDelivery, DecoratingMixin, ARCSigningMixin):
         # Message needs to be decorated and arc signed.
         self.decorate(mlist, msg, msgdata)
         self.arc_sign(mlist, msg, msgdata)
+        chunks = list(self.chunkify(msgdata.get('recipients', set())))
+        if self._max_threads > 1 and len(chunks) > 1:
+            return self._deliver_in_parallel(mlist, msg, msgdata, chunks)
         refused = {}
-        for recipients in self.chunkify(msgdata.get('recipients', set())):
+        for recipients in chunks:
             chunk_refused = self._deliver_to_recipients(
                 mlist, msg, msgdata, recipients)
             refused.update(chunk_refused)
         return refused
+
+    def _deliver_in_parallel(self, mlist, msg, msgdata, chunks):
+        # Each thread delivers with its own copy of this agent, which has its
+        # own connection, and its own copy of the message, since flattening a
+        # message temporarily changes its policy.  The database must not be
+        # used from the threads, so the sender is calculated up front.
+        msgdata = msgdata.copy()
+        msgdata['sender'] = self._get_sender(mlist, msg, msgdata)
+        pool = connection_pool()
+        workers = queue.SimpleQueue()
+        agents = []
+        for i in range(min(self._max_threads, len(chunks))):
+            agent = copy.copy(self)
+            if i == 0:
+                workers.put((agent, msg))
+            else:
+                agent._connection = pool.get()
+                workers.put((agent, copy.deepcopy(msg)))
+            agents.append(agent)
+
+        def deliver_chunk(recipients):
+            agent, message = workers.get()
+            try:
+                return agent._deliver_to_recipients(
+                    mlist, message, msgdata, recipients)
+            finally:
+                workers.put((agent, message))
+
+        refused = {}
+        try:
+            with ThreadPoolExecutor(max_workers=len(agents)) as executor:
+                for chunk_refused in executor.map(deliver_chunk, chunks):
+                    refused.update(chunk_refused)
+        finally:
+            # Our own connection is given back by our caller.
+            for agent in agents[1:]:
+                pool.put(agent._connection)
+        return refused
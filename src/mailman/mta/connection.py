@@ -19,13 +19,15 @@
 
 import ssl
 import enum
+import time
 import socket
 import logging
 import smtplib
+import threading
 
 from contextlib import suppress
 from email.message import Message
-from lazr.config import as_boolean
+from lazr.config import as_boolean, as_timedelta
 from mailman.config import config
 from mailman.interfaces.configuration import InvalidConfigurationError
 from public import public
@@ -61,7 +63,7 @@ class Connection:
     def __init__(self, host, port, sessions_per_connection,
                  smtp_user=None, smtp_pass=None,
                  secure_mode=SecureMode.INSECURE,
-                 verify_cert=True, verify_hostname=True):
+                 verify_cert=True, verify_hostname=True, tls_context=None):
         """Create a connection manager.
 
         :param host: The host name of the SMTP server to connect to.
@@ -92,6 +94,9 @@ class Connection:
             specifies the hostname as passed to this constructor.
             RFC 2818 and RFC 6125 rules are followed.
         :type verify_hostname: bool
+        :param tls_context: Optional TLS context to use instead of creating a
+            new one from `verify_cert` and `verify_hostname`.
+        :type tls_context: ssl.SSLContext
 
         With the exception of the parameters specified here, this class
         uses the defaults provided by your version of the Python 'ssl'
@@ -115,10 +120,38 @@ class Connection:
         self._connection = None
         if self.secure_mode == SecureMode.INSECURE:
             self._tls_context = None
+        elif tls_context is not None:
+            self._tls_context = tls_context
         else:
             self._tls_context = self._get_tls_context(self.verify_cert,
                                                       self.verify_hostname)
 
+    @property
+    def is_open(self):
+        """Whether there is an open connection to the SMTP server."""
+        return self._connection is not None
+
+    def check(self):
+        """Check that the open connection is still usable.
+
+        A NOOP command is sent to the SMTP server.  If that fails, the
+        connection is closed.
+
+        :return: True if the connection is open and usable.
+        :rtype: bool
+        """
+        if self._connection is None:
+            return False
+        try:
+            code, response = self._connection.noop()
+        except (socket.error, IOError, smtplib.SMTPException) as error:
+            log.debug('Idle connection failed: %s', error)
+            code = None
+        if code != 250:
+            self.quit()
+            return False
+        return True
+
     def sendmail(self, envsender, recipients, msg):
         """Mimic `smtplib.SMTP.sendmail`."""
         if as_boolean(config.devmode.enabled):
@@ -207,7 +240,8 @@ class Connection:
                 self.quit()
                 raise
 
-    def _get_tls_context(self, verify_cert, verify_hostname):
+    @staticmethod
+    def _get_tls_context(verify_cert, verify_hostname):
         """Create and return a new SSLContext."""
         ssl_context = ssl.create_default_context()
         ssl_context.check_hostname = verify_hostname
@@ -216,3 +250,122 @@ class Connection:
         else:
             ssl_context.verify_mode = ssl.CERT_NONE
         return ssl_context
+
+
+@public
+class ConnectionPool:
+    """A pool of idle connections to the SMTP server.
+
+    Connections are taken from the pool for a delivery and given back to it
+    afterward, so that later deliveries don't have to connect, negotiate TLS
+    and authenticate all over again.  Idle connections are checked before
+    they are reused.
+    """
+
+    def __init__(self, factory, size, idle_timeout):
+        """Create a connection pool.
+
+        :param factory: Called with no arguments to create a new `Connection`.
+        :type factory: callable
+        :param size: The maximum number of idle connections to keep open.  If
+            this is zero, connections are closed as soon as they are given
+            back.
+        :type size: int
+        :param idle_timeout: The number of seconds after which an idle
+            connection is closed instead of being reused.
+        :type idle_timeout: float
+        """
+        self._factory = factory
+        self._size = size
+        self._idle_timeout = idle_timeout
+        # The idle connections, with the time they were given back.
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Take a connection from the pool.
+
+        The most recently used idle connection which still works is returned.
+        If there are none, a new, not yet opened connection is returned.
+
+        :return: The connection.
+        :rtype: `Connection`
+        """
+        while True:
+            with self._lock:
+                if len(self._idle) == 0:
+                    break
+                connection, released = self._idle.pop()
+            if time.monotonic() - released > self._idle_timeout:
+                connection.quit()
+            elif connection.check():
+                return connection
+        return self._factory()
+
+    def put(self, connection):
+        """Give a connection back to the pool.
+
+        :param connection: The connection, which must not be used again by
+            the caller.
+        :type connection: `Connection`
+        """
+        if not connection.is_open:
+            return
+        with self._lock:
+            if len(self._idle) < self._size:
+                self._idle.append((connection, time.monotonic()))
+                return
+        connection.quit()
+
+    def close(self):
+        """Close all the idle connections."""
+        with self._lock:
+            idle = self._idle
+            self._idle = []
+        for connection, released in idle:
+            connection.quit()
+
+
+_pool = None
+_pool_key = None
+
+
+@public
+def connection_pool():
+    """Return the process-wide pool of connections to the SMTP server.
+
+    The pool is created from the `[mta]` configuration.  If that has changed
+    since the pool was created, the old pool is closed and a new one is
+    created.
+
+    :return: The connection pool.
+    :rtype: `ConnectionPool`
+    """
+    global _pool, _pool_key
+    mta = config.mta
+    key = (mta.smtp_host, mta.smtp_port, mta.max_sessions_per_connection,
+           mta.smtp_user, mta.smtp_pass, mta.smtp_secure_mode,
+           mta.smtp_verify_cert, mta.smtp_verify_hostname,
+           mta.connection_pool_size, mta.connection_idle_timeout)
+    if key != _pool_key:
+        if _pool is not None:
+            _pool.close()
+        secure_mode = as_SecureMode(mta.smtp_secure_mode)
+        verify_cert = as_boolean(mta.smtp_verify_cert)
+        verify_hostname = as_boolean(mta.smtp_verify_hostname) and verify_cert
+        # All the pool's connections share one TLS context.
+        tls_context = (
+            None if secure_mode == SecureMode.INSECURE
+            else Connection._get_tls_context(verify_cert, verify_hostname))
+        arguments = (
+            mta.smtp_host, int(mta.smtp_port),
+            int(mta.max_sessions_per_connection),
+            mta.smtp_user if mta.smtp_user else None,
+            mta.smtp_pass if mta.smtp_pass else None,
+            secure_mode, verify_cert, verify_hostname, tls_context)
+        _pool = ConnectionPool(
+            lambda: Connection(*arguments),
+            int(mta.connection_pool_size),
+            as_timedelta(mta.connection_idle_timeout).total_seconds())
+        _pool_key = key
+    return _pool
@@ -26,8 +26,10 @@ from mailman.interfaces.mta import SomeRecipientsFailed
 from mailman.mta.arc_signing import ARCSigningMixin
 from mailman.mta.base import IndividualDelivery
 from mailman.mta.bulk import BulkDelivery
+from mailman.mta.connection import connection_pool
 from mailman.mta.decorating import DecoratingMixin
 from mailman.mta.personalized import PersonalizedMixin
+from mailman.mta.rendering import TemplatingMixin
 from mailman.mta.verp import VERPMixin
 from mailman.utilities.string import expand
 from public import public
@@ -39,7 +41,7 @@ log = logging.getLogger('mailman.smtp')
 
 @public
 class Deliver(VERPMixin, DecoratingMixin, ARCSigningMixin, PersonalizedMixin,
-              IndividualDelivery):
+              TemplatingMixin, IndividualDelivery):
     """Deliver one message to one recipient.
 
     All current individualized features are avaialble to this
@@ -49,6 +51,9 @@ class Deliver(VERPMixin, DecoratingMixin, ARCSigningMixin, PersonalizedMixin,
     * Full Personalization
     * Header/Footer decoration
     * ARC signing
+
+    Where possible, the message is decorated only once, and rendered for each
+    recipient from a template.
     """
 
     def __init__(self):
@@ -59,6 +64,10 @@ class Deliver(VERPMixin, DecoratingMixin, ARCSigningMixin, PersonalizedMixin,
             self.personalize_to,
             self.arc_sign,
             ])
+        # While other processes sign messages, keep them busy with the next
+        # recipients' messages.
+        if config.arc_enabled:
+            self.pipeline_depth = 2 * max(int(config.ARC.sign_processes), 0)
 
 
 @public
@@ -77,7 +86,8 @@ def deliver(mlist, msg, msgdata):
     elif mlist.personalize != Personalization.none:
         agent = Deliver()
     else:
-        agent = BulkDelivery(int(config.mta.max_recipients))
+        agent = BulkDelivery(int(config.mta.max_recipients),
+                             int(config.mta.max_delivery_threads))
     log.debug('Using agent: %s', agent)
     # Keep track of the original recipients and the original sender for
     # logging purposes.
@@ -86,16 +96,17 @@ def deliver(mlist, msg, msgdata):
     # Let the agent attempt to deliver to the recipients.  Record all failures
     # for re-delivery later.
     t0 = time.time()
-    refused = agent.deliver(mlist, msg, msgdata)
-    # At this point we have completed the initial SMTP for this message.
-    # We should close the SMTP connection regardless of the
-    # sessions_per_connection setting because otherwise if there are no more
-    # messages in the queue, the connection is left open until it times out
-    # which can cause problems in the MTA.
-    # XXX It would arguably be better to close only if the queue is empty, but
-    # this means examining the queue here or closing from the outgoing runner,
-    # either of which requires more information than should be available.
-    agent._connection.quit()
+    try:
+        refused = agent.deliver(mlist, msg, msgdata)
+    finally:
+        # At this point we have completed the initial SMTP for this message.
+        # Give the connection back to the pool for the next message.  Unless
+        # pooling is enabled, this closes the connection regardless of the
+        # sessions_per_connection setting because otherwise if there are no
+        # more messages in the queue, the connection is left open until it
+        # times out which can cause problems in the MTA.  The outgoing runner
+        # closes pooled connections when its queue is empty.
+        connection_pool().put(agent._connection)
     t1 = time.time()
     # Log this posting.
     size = getattr(msg, 'original_size', msgdata.get('original_size'))
@@ -26,6 +26,26 @@ from public import public
 from zope.component import getUtility
 
 
+@public
+def personalized_to(recipient, user):
+    """Return the personalized To header for a recipient.
+
+    :param recipient: The recipient's email address.
+    :type recipient: string
+    :param user: The user controlling the recipient's address, if any.
+    :type user: `IUser` or None
+    :return: The To header value.
+    :rtype: string
+    """
+    if user is None:
+        return recipient
+    # Convert the unicode name to an email-safe representation.  Create a
+    # Header instance for the name so that it's properly encoded for email
+    # transport.
+    name = Header(user.display_name).encode()
+    return formataddr((name, recipient))
+
+
 @public
 class PersonalizedMixin:
     """Personalize the message's To header.
@@ -48,20 +68,11 @@ class PersonalizedMixin:
         recipient = msgdata['recipient']
         user_manager = getUtility(IUserManager)
         user = user_manager.get_user(recipient)
-        if user is None:
-            if msg.get('to'):
-                msg.replace_header('To', recipient)
-            else:
-                msg['To'] = recipient
+        to = personalized_to(recipient, user)
+        if msg.get('to'):
+            msg.replace_header('To', to)
         else:
-            # Convert the unicode name to an email-safe representation.
-            # Create a Header instance for the name so that it's properly
-            # encoded for email transport.
-            name = Header(user.display_name).encode()
-            if msg.get('to'):
-                msg.replace_header('To', formataddr((name, recipient)))
-            else:
-                msg['To'] = formataddr((name, recipient))
+            msg['To'] = to
 
 
 @public
@@ -0,0 +1,282 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Rendering one message for many recipients.
+
+Individual delivery crafts a unique message for every recipient, but only a
+few parts of those messages actually differ: the X-Mailman-Copy header, the
+personalized To header, and the member substitutions in the header and footer
+decorations.  Instead of copying, decorating and flattening the whole message
+for every recipient, the message is decorated and flattened once, with unique
+placeholders in those places.  Each recipient's message is then rendered
+straight to bytes by filling in the placeholders.
+
+Anything that can't be rendered this way, e.g. a substitution that would have
+to be MIME encoded, is left to the regular per-recipient delivery.
+"""
+
+import re
+import copy
+import secrets
+
+from email.generator import BytesGenerator
+from email.policy import Compat32
+from io import BytesIO
+from mailman.config import config
+from mailman.handlers.decorate import (
+    MEMBER_SUBSTITUTIONS,
+    member_substitutions,
+)
+from mailman.interfaces.usermanager import IUserManager
+from mailman.mta.personalized import personalized_to
+from public import public
+from zope.component import getUtility
+
+
+# The callbacks that templates know how to apply.
+TEMPLATE_CALLBACKS = frozenset({
+    'arc_sign',
+    'avoid_duplicates',
+    'decorate',
+    'personalize_to',
+    })
+# The encodings that leave substitutions in the body unchanged.
+VERBATIM_ENCODINGS = frozenset({'7bit', '8bit'})
+# smtplib.SMTP.send_message() flattens messages with these line endings.
+CRLF = '\r\n'
+
+
+@public
+class MessageTemplate:
+    """A flattened message, with slots for the per-recipient bytes."""
+
+    def __init__(self, raw, placeholders):
+        """Split a flattened message at its placeholders.
+
+        :param raw: The flattened message.
+        :type raw: bytes
+        :param placeholders: A mapping from the placeholders in `raw` to the
+            names of their slots.
+        :type placeholders: dict
+        """
+        pattern = re.compile(
+            b'|'.join(re.escape(placeholder) for placeholder in placeholders))
+        self._chunks = []
+        self._names = []
+        start = 0
+        for match in pattern.finditer(raw):
+            self._chunks.append(raw[start:match.start()])
+            self._names.append(placeholders[match.group()])
+            start = match.end()
+        self._chunks.append(raw[start:])
+
+    @property
+    def slots(self):
+        """The names of the slots that appear in the message."""
+        return set(self._names)
+
+    def render(self, values):
+        """Render the message.
+
+        :param values: A mapping from every slot name to its bytes.
+        :type values: dict
+        :return: The message, as it would be sent to the SMTP server.
+        :rtype: bytes
+        """
+        parts = [self._chunks[0]]
+        for name, chunk in zip(self._names, self._chunks[1:]):
+            parts.append(values[name])
+            parts.append(chunk)
+        return b''.join(parts)
+
+
+def _verbatim(value):
+    # Would the value appear in a 7bit or 8bit body exactly as it is?
+    return (isinstance(value, str) and value.isascii()
+            and '\r' not in value and '\n' not in value)
+
+
+@public
+class TemplatingMixin:
+    """Render individual messages from a template.
+
+    This is a mixin class for `IndividualDelivery`.  The template is built by
+    running the delivery's callbacks once, for a placeholder recipient.
+    """
+
+    def make_template(self, mlist, msg, msgdata):
+        """Decorate and flatten a message once, for all its recipients.
+
+        :param mlist: The mailing list being delivered to.
+        :type mlist: `IMailingList`
+        :param msg: The original message being delivered.
+        :type msg: `Message`
+        :param msgdata: Additional message metadata for this delivery.
+        :type msgdata: dictionary
+        :return: The template, or None if the message has to be crafted
+            separately for each recipient.
+        :rtype: `MessageTemplate`
+        """
+        for callback in self.callbacks:
+            if (getattr(callback, '__self__', None) is not self or
+                    callback.__name__ not in TEMPLATE_CALLBACKS):
+                return None
+            # Signatures have to be calculated over each recipient's message.
+            if callback.__name__ == 'arc_sign' and config.arc_enabled:
+                return None
+        if not isinstance(msg.policy, Compat32):
+            return None
+        # These would make smtplib.SMTP.send_message() flatten the message
+        # differently, or not at all.
+        if not msgdata.get('sender', '').isascii():
+            return None
+        if len(msg.get_all('resent-date', [])) > 1:
+            return None
+        # Run the callbacks for a recipient whose personal details are all
+        # unique placeholders.
+        token = secrets.token_hex(8)
+        names = ('recipient', 'x-mailman-copy') + MEMBER_SUBSTITUTIONS
+        placeholder_for = {
+            name: 'mm{}{:02d}mm'.format(token, i)
+            for i, name in enumerate(names)
+            }
+        recipient = placeholder_for['recipient']
+        decoration_data = {
+            key: placeholder_for[key]
+            for key in MEMBER_SUBSTITUTIONS
+            }
+        # Substitutions given in the metadata are the same for everyone.
+        decoration_data.update(msgdata.get('decoration-data', {}))
+        message_copy = copy.deepcopy(msg)
+        msgdata_copy = msgdata.copy()
+        msgdata_copy['recipient'] = recipient
+        msgdata_copy['member'] = None
+        msgdata_copy['decoration-data'] = decoration_data
+        msgdata_copy['add-dup-header'] = {recipient}
+        for callback in self.callbacks:
+            callback(mlist, message_copy, msgdata_copy)
+        # Find the header slots.
+        callback_names = {callback.__name__ for callback in self.callbacks}
+        policy = message_copy.policy.clone(linesep=CRLF)
+        placeholders = {}
+        header_names = {}
+        for name, value in message_copy.items():
+            if (value == recipient and name.lower() == 'to' and
+                    'personalize_to' in callback_names):
+                header_names['to'] = name
+            elif (value == 'yes' and name.lower() == 'x-mailman-copy' and
+                    'avoid_duplicates' in callback_names):
+                message_copy.replace_header(
+                    name, placeholder_for['x-mailman-copy'])
+                header_names['x-mailman-copy'] = name
+        for slot, name in header_names.items():
+            value = (recipient if slot == 'to'
+                     else placeholder_for['x-mailman-copy'])
+            placeholders[policy.fold_binary(name, value)] = slot
+        # Find the body slots.  Substitutions given in the metadata override
+        # the member's, and are the same for everyone.
+        substitutions = {
+            decoration_data[key]: key
+            for key in MEMBER_SUBSTITUTIONS
+            if decoration_data[key] == placeholder_for[key]
+            }
+        for part in message_copy.walk():
+            if part.is_multipart():
+                continue
+            payload = part.get_payload(decode=True)
+            charset = part.get_content_charset('us-ascii')
+            cte = part.get('content-transfer-encoding', '7bit').lower()
+            try:
+                text = payload.decode(charset, 'replace')
+                for placeholder, key in substitutions.items():
+                    if placeholder not in text:
+                        continue
+                    # The placeholder has to make it verbatim into the
+                    # flattened message, to be filled in later.
+                    if (cte not in VERBATIM_ENCODINGS or
+                            placeholder.encode(charset) not in payload):
+                        return None
+                    placeholders[placeholder.encode('ascii')] = key
+            except LookupError:
+                return None
+        # Flatten the message exactly as smtplib.SMTP.send_message() would.
+        del message_copy['bcc']
+        del message_copy['resent-bcc']
+        with BytesIO() as fp:
+            BytesGenerator(fp).flatten(message_copy, linesep=CRLF)
+            raw = fp.getvalue()
+        # Every header slot must be in the message's own headers, and the
+        # placeholder recipient must not have made it anywhere else.
+        header_block = raw.partition(b'\r\n\r\n')[0] + b'\r\n'
+        for placeholder, slot in placeholders.items():
+            if slot in header_names and header_block.count(placeholder) != 1:
+                return None
+        if raw.count(recipient.encode('ascii')) != int('to' in header_names):
+            return None
+        template = MessageTemplate(raw, placeholders)
+        # Remember how to render the header slots.
+        template.header_names = header_names
+        template.policy = policy
+        return template
+
+    def render(self, template, mlist, msgdata):
+        """Render the message for one recipient.
+
+        :param template: The template returned by `make_template()`.
+        :type template: `MessageTemplate`
+        :param mlist: The mailing list being delivered to.
+        :type mlist: `IMailingList`
+        :param msgdata: The recipient's message metadata, including the
+            'recipient' and 'member' keys.
+        :type msgdata: dictionary
+        :return: The message for the recipient, or None if it has to be
+            crafted by the callbacks instead.
+        :rtype: bytes
+        """
+        recipient = msgdata['recipient']
+        member = msgdata.get('member')
+        if not recipient.isascii():
+            return None
+        values = {}
+        slots = template.slots
+        if 'x-mailman-copy' in slots:
+            values['x-mailman-copy'] = (
+                template.policy.fold_binary(
+                    template.header_names['x-mailman-copy'], 'yes')
+                if recipient in msgdata.get('add-dup-header', {})
+                else b'')
+        if 'to' in slots:
+            user = (getUtility(IUserManager).get_user(recipient)
+                    if member is None
+                    else member.user)
+            values['to'] = template.policy.fold_binary(
+                template.header_names['to'],
+                personalized_to(recipient, user))
+        substitutions = slots.intersection(MEMBER_SUBSTITUTIONS)
+        if len(substitutions) > 0:
+            if member is None:
+                return None
+            d = member_substitutions(member, recipient)
+            for key in substitutions:
+                if not _verbatim(d[key]):
+                    return None
+                values[key] = d[key].encode('ascii')
+        content = template.render(values)
+        # A substitution at the start of a line could need From-mangling.
+        if b'\nFrom ' in content:
+            return None
+        return content
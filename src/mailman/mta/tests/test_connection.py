@@ -20,13 +20,23 @@
 import unittest
 
 from mailman.config import config
-from mailman.mta.connection import Connection, SecureMode
+from mailman.mta.connection import (
+    Connection,
+    connection_pool,
+    ConnectionPool,
+    SecureMode,
+)
 from mailman.testing.helpers import (
+    configuration,
     LogFileMark,
     specialized_message_from_string as mfs,
 )
 from mailman.testing.layers import SMTPLayer, SMTPSLayer, STARTTLSLayer
-from smtplib import SMTPAuthenticationError, SMTPNotSupportedError
+from smtplib import (
+    SMTPAuthenticationError,
+    SMTPNotSupportedError,
+    SMTPServerDisconnected,
+)
 from unittest.mock import patch
 
 
@@ -214,3 +224,88 @@ Subject: aardvarks
         with self.assertRaises(SMTPNotSupportedError):
             connection.sendmail(
                 'anne@example.com', ['bart@example.com'], msg_text)
+
+
+class TestConnectionPool(unittest.TestCase):
+    layer = SMTPLayer
+
+    def setUp(self):
+        self._msg_text = """\
+From: anne@example.com
+To: bart@example.com
+Subject: aardvarks
+
+"""
+
+    def _factory(self):
+        return Connection(config.mta.smtp_host, int(config.mta.smtp_port), 0)
+
+    def _send(self, connection):
+        connection.sendmail(
+            'anne@example.com', ['bart@example.com'], self._msg_text)
+
+    def test_reuse(self):
+        pool = ConnectionPool(self._factory, 1, 30)
+        self.addCleanup(pool.close)
+        connection = pool.get()
+        self._send(connection)
+        pool.put(connection)
+        self.assertIs(pool.get(), connection)
+        self._send(connection)
+        self.assertEqual(self.layer.smtpd.get_connection_count(), 1)
+
+    def test_unopened_connection_is_not_kept(self):
+        pool = ConnectionPool(self._factory, 1, 30)
+        connection = pool.get()
+        pool.put(connection)
+        self.assertIsNot(pool.get(), connection)
+
+    def test_no_pooling(self):
+        pool = ConnectionPool(self._factory, 0, 30)
+        connection = pool.get()
+        self._send(connection)
+        pool.put(connection)
+        self.assertFalse(connection.is_open)
+        self.assertIsNot(pool.get(), connection)
+
+    def test_pool_size(self):
+        pool = ConnectionPool(self._factory, 1, 30)
+        first = pool.get()
+        second = pool.get()
+        self._send(first)
+        self._send(second)
+        pool.put(first)
+        pool.put(second)
+        # Only the first connection is kept.
+        self.assertTrue(first.is_open)
+        self.assertFalse(second.is_open)
+        pool.close()
+        self.assertFalse(first.is_open)
+
+    def test_idle_timeout(self):
+        pool = ConnectionPool(self._factory, 1, 30)
+        connection = pool.get()
+        self._send(connection)
+        with patch('mailman.mta.connection.time.monotonic',
+                   return_value=0):
+            pool.put(connection)
+        with patch('mailman.mta.connection.time.monotonic',
+                   return_value=31):
+            self.assertIsNot(pool.get(), connection)
+        self.assertFalse(connection.is_open)
+
+    def test_broken_connection_is_replaced(self):
+        pool = ConnectionPool(self._factory, 1, 30)
+        connection = pool.get()
+        self._send(connection)
+        pool.put(connection)
+        with patch.object(connection._connection, 'noop',
+                          side_effect=SMTPServerDisconnected):
+            self.assertIsNot(pool.get(), connection)
+        self.assertFalse(connection.is_open)
+
+    def test_process_pool_follows_configuration(self):
+        pool = connection_pool()
+        self.assertIs(connection_pool(), pool)
+        with configuration('mta', connection_pool_size=2):
+            self.assertIsNot(connection_pool(), pool)
@@ -0,0 +1,333 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Test rendering messages for many recipients from a template."""
+
+import os
+import re
+import copy
+import shutil
+import tempfile
+import unittest
+
+from email.generator import BytesGenerator
+from io import BytesIO
+from mailman.app.lifecycle import create_list
+from mailman.config import config
+from mailman.interfaces.mailinglist import Personalization
+from mailman.interfaces.template import ITemplateManager
+from mailman.interfaces.usermanager import IUserManager
+from mailman.mta.deliver import Deliver
+from mailman.mta.rendering import MessageTemplate
+from mailman.testing.helpers import (
+    specialized_message_from_string as mfs,
+    subscribe,
+)
+from mailman.testing.layers import ConfigLayer
+from zope.component import getUtility
+
+
+def normalize(content):
+    # Generated MIME boundaries are random.
+    return re.sub(r'={15}\d+==', '=====BOUNDARY==', content.decode('ascii'))
+
+
+def flatten(msg):
+    # Flatten the message the way smtplib.SMTP.send_message() does.
+    msg = copy.copy(msg)
+    del msg['bcc']
+    del msg['resent-bcc']
+    with BytesIO() as fp:
+        BytesGenerator(fp).flatten(msg, linesep='\r\n')
+        return fp.getvalue()
+
+
+class CapturingDeliver(Deliver):
+    def __init__(self, templates=True):
+        super().__init__()
+        self.templates = templates
+        self.rendered = 0
+        self.messages = {}
+
+    def make_template(self, mlist, msg, msgdata):
+        if not self.templates:
+            return None
+        return super().make_template(mlist, msg, msgdata)
+
+    def _deliver_to_recipients(self, mlist, msg, msgdata, recipients,
+                               content=None):
+        if content is None:
+            content = flatten(msg)
+        else:
+            self.rendered += 1
+        [recipient] = recipients
+        self.messages[recipient] = content
+        return {}
+
+
+class TestMessageTemplate(unittest.TestCase):
+    def test_render(self):
+        template = MessageTemplate(
+            b'To: @1@\r\n\r\nHello @2@, @2@.\r\n',
+            {b'@1@': 'to', b'@2@': 'name'})
+        self.assertEqual(template.slots, {'to', 'name'})
+        self.assertEqual(
+            template.render(dict(to=b'anne', name=b'Anne')),
+            b'To: anne\r\n\r\nHello Anne, Anne.\r\n')
+
+    def test_no_slots(self):
+        template = MessageTemplate(b'Subject: x\r\n\r\n', {b'@1@': 'to'})
+        self.assertEqual(template.slots, set())
+        self.assertEqual(template.render({}), b'Subject: x\r\n\r\n')
+
+
+class TestRendering(unittest.TestCase):
+    """Test that rendered messages match individually crafted ones."""
+
+    layer = ConfigLayer
+    maxDiff = None
+
+    def setUp(self):
+        self._mlist = create_list('test@example.com')
+        self._mlist.personalize = Personalization.full
+        subscribe(self._mlist, 'Anne', email='anne@example.org')
+        subscribe(self._mlist, 'Bart', email='bart@example.org')
+        # Cris is subscribed as a user, through her preferred address.
+        subscribe(self._mlist, 'Cris', email='cris@example.org',
+                  as_user=True)
+        # Dave has a name that has to be encoded.
+        dave = subscribe(self._mlist, 'Dave', email='dave@example.org')
+        dave.address.display_name = 'Dav\xe9 Person'
+        dave.user.display_name = 'Dav\xe9 Person'
+        # Elle is not a member.
+        getUtility(IUserManager).create_user('elle@example.org', 'Elle')
+        self._recipients = [
+            'anne@example.org', 'bart@example.org', 'cris@example.org',
+            'dave@example.org', 'elle@example.org', 'fred@example.org',
+            ]
+        self._template_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._template_dir)
+        config.push('templates', """
+        [paths.testing]
+        template_dir: {}
+        """.format(self._template_dir))
+        self.addCleanup(config.pop, 'templates')
+        self._set_decoration('footer', """\
+address  : $user_address
+delivered: $user_delivered_to
+language : $user_language
+name     : $user_name
+member   : $member
+list     : $display_name
+""")
+
+    def _set_decoration(self, name, text):
+        path = os.path.join(
+            self._template_dir, 'site', 'en', 'member-{}.txt'.format(name))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(text)
+        getUtility(ITemplateManager).set(
+            'list:member:regular:{}'.format(name), self._mlist.list_id,
+            'mailman:///member-{}.txt'.format(name))
+
+    def _deliver(self, msg, **msgdata):
+        msgdata.setdefault('recipients', self._recipients)
+        rendered = CapturingDeliver()
+        rendered.deliver(self._mlist, msg, msgdata.copy())
+        crafted = CapturingDeliver(templates=False)
+        crafted.deliver(self._mlist, msg, msgdata.copy())
+        self.assertEqual(crafted.rendered, 0)
+        self.assertEqual(sorted(rendered.messages), sorted(crafted.messages))
+        for recipient in crafted.messages:
+            self.assertEqual(
+                normalize(rendered.messages[recipient]),
+                normalize(crafted.messages[recipient]))
+        return rendered
+
+    def test_text_plain(self):
+        msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+
+A message.
+From the start of a line.
+""")
+        agent = self._deliver(msg, **{'add-dup-header': {'bart@example.org'}})
+        # The non-members' footers aren't substituted, and Dave's name has
+        # to be encoded, so their messages have to be crafted individually.
+        self.assertEqual(agent.rendered, 3)
+        self.assertIn(b'\r\nX-Mailman-Copy: yes\r\n',
+                      agent.messages['bart@example.org'])
+        self.assertNotIn(b'X-Mailman-Copy',
+                         agent.messages['anne@example.org'])
+        self.assertIn(b'\r\nTo: Anne Person <anne@example.org>\r\n',
+                      agent.messages['anne@example.org'])
+        self.assertIn(b'\r\nname     : Bart Person\r\n',
+                      agent.messages['bart@example.org'])
+
+    def test_no_to(self):
+        msg = mfs("""\
+From: anne@example.org
+Subject: test
+Message-ID: <ant>
+
+A message.
+""")
+        agent = self._deliver(msg)
+        self.assertEqual(agent.rendered, 3)
+
+    def test_multipart_mixed(self):
+        self._set_decoration('header', 'Dear $user_name_or_address\n')
+        msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+MIME-Version: 1.0
+Content-Type: multipart/mixed; boundary="BOUNDARY"
+
+--BOUNDARY
+Content-Type: text/plain
+
+A message.
+--BOUNDARY
+Content-Type: application/octet-stream
+Content-Transfer-Encoding: base64
+
+AAECAwQFBgcICQ==
+--BOUNDARY--
+""")
+        agent = self._deliver(msg)
+        self.assertEqual(agent.rendered, 3)
+
+    def test_wrapped(self):
+        msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+Content-Type: text/html
+
+<p>A message.</p>
+""")
+        agent = self._deliver(msg)
+        self.assertEqual(agent.rendered, 3)
+
+    def test_non_ascii_substitution(self):
+        self._mlist.personalize = Personalization.individual
+        msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+
+A message.
+""")
+        agent = self._deliver(msg)
+        self.assertEqual(agent.rendered, 3)
+        self.assertIn(b'Content-Transfer-Encoding: base64',
+                      agent.messages['dave@example.org'])
+
+    def test_encoded_header(self):
+        # Dave's name is only used in the To header, where it's encoded.
+        self._set_decoration('footer', 'address: $user_address\n')
+        msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+
+A message.
+""")
+        agent = self._deliver(msg)
+        self.assertEqual(agent.rendered, 4)
+        self.assertIn(b'\r\nTo: =?utf-8?q?Dav=C3=A9_Person?=',
+                      agent.messages['dave@example.org'])
+
+    def test_encoded_decoration(self):
+        # The list's footer is encoded, so nothing can be rendered.
+        self._set_decoration('footer', 'Caf\xe9 $user_name\n')
+        msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+Content-Type: text/plain; charset="utf-8"
+
+A message.
+""")
+        agent = self._deliver(msg)
+        self.assertEqual(agent.rendered, 0)
+
+    def test_decoration_data(self):
+        # Substitutions from the metadata are the same for everyone.
+        msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+
+A message.
+""")
+        agent = self._deliver(
+            msg, **{'decoration-data': dict(user_name='Everybody')})
+        self.assertEqual(agent.rendered, 4)
+        self.assertIn(b'\r\nname     : Everybody\r\n',
+                      agent.messages['anne@example.org'])
+
+    def test_verp(self):
+        self._mlist.personalize = Personalization.none
+        self._set_decoration('footer', 'Footer\n')
+        msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+
+A message.
+""")
+        agent = self._deliver(msg, verp=True)
+        # Without any substitutions, everybody's message can be rendered.
+        self.assertEqual(agent.rendered, 6)
+
+    def test_one_recipient(self):
+        msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+
+A message.
+""")
+        agent = self._deliver(msg, recipients=['anne@example.org'])
+        self.assertEqual(agent.rendered, 0)
+
+    def test_unknown_callback(self):
+        msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+
+A message.
+""")
+        agent = CapturingDeliver()
+        agent.callbacks.append(lambda mlist, msg, msgdata: None)
+        self.assertIsNone(agent.make_template(self._mlist, msg, {}))
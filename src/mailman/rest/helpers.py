@@ -22,6 +22,7 @@ import types
 import falcon
 import hashlib
 
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from contextlib import suppress
 from datetime import datetime, timedelta
 from email.header import Header
@@ -30,12 +31,15 @@ from enum import Enum
 from functools import partial
 from lazr.config import as_boolean
 from mailman.config import config
-from pprint import pformat
+from mailman.utilities.queries import KeyedQuerySequence, QuerySequence
 from public import public
 
 
 CONTENT_TYPE_JSON = 'application/json; charset=UTF-8'
+CONTENT_TYPE_NDJSON = 'application/x-ndjson'
 CONTENT_TYPE_TEXT_PLAIN = 'text/plain'
+# The number of entries in each chunk of a streamed collection.
+STREAM_BATCH_SIZE = 1000
 
 
 class ExtendedEncoder(json.JSONEncoder):
@@ -73,32 +77,82 @@ def bytes_to_str(value):
             return value.decode(encoding)
 
 
+def _members(resource, serialized):
+    # Return the JSON representations of the resource's members in key order,
+    # with None where its etag goes.  Neighbouring members are serialized
+    # together, except for those whose representations are already given.
+    members = []
+    run = {}
+
+    def end_run():
+        if len(run) > 0:
+            members.append(json.dumps(
+                run, cls=ExtendedEncoder, sort_keys=True)[1:-1])
+            run.clear()
+
+    tagged = False
+    for key in sorted(resource):
+        if not tagged and key > 'http_etag':
+            end_run()
+            members.append(None)
+            tagged = True
+        if key in serialized:
+            end_run()
+            members.append('{}: {}'.format(json.dumps(key), serialized[key]))
+        else:
+            run[key] = resource[key]
+    end_run()
+    if not tagged:
+        members.append(None)
+    return members
+
+
+def _etag(resource, serialized=None):
+    # Calculate the tag from the key-sorted JSON representation of the
+    # dictionary, which with the tag added is also returned.  The actual
+    # details aren't so important.  Each member is only serialized once.
+    assert 'http_etag' not in resource, 'Resource already etagged'
+    members = _members(resource, {} if serialized is None else serialized)
+    untagged = '{{{}}}'.format(
+        ', '.join(member for member in members if member is not None))
+    digest = hashlib.sha1(untagged.encode('utf-8')).hexdigest()
+    tag = '"{}"'.format(digest)
+    resource['http_etag'] = tag
+    tagged = '"http_etag": {}'.format(json.dumps(tag))
+    return '{{{}}}'.format(', '.join(
+        tagged if member is None else member for member in members))
+
+
+class _Entries(list):
+    """The entries of a collection, along with their JSON representations."""
+
+    def __init__(self, entries, representations):
+        super().__init__(entries)
+        self.representations = representations
+
+
 @public
 def etag(resource):
     """Calculate the etag and return a JSON representation.
 
     The input is a dictionary representing the resource.  This
     dictionary must not contain an `http_etag` key.  This function
-    calculates the etag by using the sha1 hexdigest of the
-    pretty-printed (and thus key-sorted and predictable) representation
-    of the dictionary.  It then inserts this value under the `http_etag`
-    key, and returns the JSON representation of the modified dictionary.
+    calculates the etag by using the sha1 hexdigest of the key-sorted
+    (and thus predictable) JSON representation of the dictionary.  It
+    then inserts this value under the `http_etag` key, and returns the
+    key-sorted JSON representation of the modified dictionary.
 
     :param resource: The original resource representation.
     :type resource: dictionary
     :return: JSON representation of the modified dictionary.
     :rtype string
     """
-    assert 'http_etag' not in resource, 'Resource already etagged'
-    # Calculate the tag from a predictable (i.e. sorted) representation of the
-    # dictionary.  The actual details aren't so important.  pformat() is
-    # guaranteed to sort the keys, however it returns a str and the hash
-    # library requires a bytes.  Use the safest possible encoding.
-    hashfood = pformat(resource).encode('raw-unicode-escape')
-    etag = hashlib.sha1(hashfood).hexdigest()
-    resource['http_etag'] = '"{}"'.format(etag)
-    return json.dumps(resource, cls=ExtendedEncoder,
-                      sort_keys=as_boolean(config.devmode.enabled))
+    # The entries of a collection have already been serialized.
+    entries = resource.get('entries')
+    if isinstance(entries, _Entries):
+        return _etag(resource, dict(
+            entries='[{}]'.format(', '.join(entries.representations))))
+    return _etag(resource)
 
 
 @public
@@ -166,11 +220,68 @@ class CollectionMixin:
         list_end = page * count
         return list_start, total_size, collection[list_start:list_end]
 
+    def _page_after(self, request, collection):
+        """Method to page through collection result lists by key.
+
+        Use this to return the page of a collection which follows a cursor
+        given in the request's `after` query parameter.  Unlike the slices
+        returned by `_paginate()`, a page costs the same however deep into
+        the collection it is.  The cursor to use for the next page is
+        returned along with the page, or None if this is the last page.  An
+        empty cursor starts at the beginning of the collection, and the
+        `count` query parameter is the size of the pages.
+        """
+        count = request.get_param_as_int('count')
+        # A page must hold at least one item for there to be a cursor to
+        # the next page.
+        if count is not None and count < 1:
+            raise falcon.HTTPInvalidParam(
+                count, 'count should be a positive integer.')
+        if not isinstance(collection, KeyedQuerySequence):
+            raise falcon.HTTPInvalidParam(
+                'Cannot page through this collection by key.', 'after')
+        cursor = request.get_param('after')
+        key = None
+        if cursor:
+            try:
+                key = json.loads(urlsafe_b64decode(cursor))
+            except ValueError:
+                raise falcon.HTTPInvalidParam('Invalid cursor.', 'after')
+            if not isinstance(key, list):
+                raise falcon.HTTPInvalidParam('Invalid cursor.', 'after')
+        try:
+            page, last = collection.page(key, count)
+        except ValueError:
+            raise falcon.HTTPInvalidParam('Invalid cursor.', 'after')
+        if last is None:
+            return page, None
+        return page, urlsafe_b64encode(json.dumps(last).encode()).decode()
+
+    def _entry_etags(self, request):
+        """Whether the entries of a collection should have etags.
+
+        Calculating an etag for every entry of a large collection can be
+        expensive, and bulk clients may not need them.  The request's `etags`
+        query parameter can turn them on or off, otherwise the site's
+        configuration decides.
+        """
+        entry_etags = request.get_param_as_bool('etags')
+        if entry_etags is None:
+            return as_boolean(config.webservice.entry_etags)
+        return entry_etags
+
     def _make_collection(self, request, fields=None):
         """Provide the collection to the REST layer."""
-        start, total_size, collection = self._paginate(
-            request, self._get_collection(request))
-        result = dict(start=start, total_size=total_size)
+        collection = self._get_collection(request)
+        if 'after' in request.params:
+            collection, cursor = self._page_after(request, collection)
+            result = {}
+            if cursor is not None:
+                result['next'] = cursor
+        else:
+            start, total_size, collection = self._paginate(
+                request, collection)
+            result = dict(start=start, total_size=total_size)
         if len(collection) != 0:
             # XXX(maxking): This is not the nicest way to use the mixin class,
             # but this is just meant to minimize the code changes since all the
@@ -181,11 +292,53 @@ class CollectionMixin:
                 as_dict = partial(self._resource_as_dict, fields=fields)  # pragma: nocover  # noqa: E501
             entries = [as_dict(resource) for resource in collection]
             assert None not in entries, entries
-            # Create the collection resource
-            [etag(resource) for resource in entries]
-            result['entries'] = entries
+            # Create the collection resource.  The entries are serialized
+            # here, and their representations reused in the collection's.
+            if self._entry_etags(request):
+                representations = [_etag(entry) for entry in entries]
+            else:
+                representations = [
+                    json.dumps(entry, cls=ExtendedEncoder, sort_keys=True)
+                    for entry in entries]
+            result['entries'] = _Entries(entries, representations)
         return result
 
+    def _stream_collection(self, request, response, fields=None):
+        """Stream the whole collection to the REST layer.
+
+        The entries are sent as newline delimited JSON, one entry per line,
+        as they are read from the collection.  They aren't collected into a
+        single document first, and they don't have etags, so exporting even
+        a very large collection takes constant memory.
+        """
+        collection = self._get_collection(request)
+        if isinstance(collection, QuerySequence):
+            collection = collection.stream(STREAM_BATCH_SIZE)
+        as_dict = self._resource_as_dict
+        if fields is not None:
+            as_dict = partial(self._resource_as_dict, fields=fields)
+
+        def lines():
+            try:
+                batch = []
+                for resource in collection:
+                    batch.append(json.dumps(
+                        as_dict(resource), cls=ExtendedEncoder,
+                        sort_keys=True))
+                    if len(batch) == STREAM_BATCH_SIZE:
+                        yield ('\n'.join(batch) + '\n').encode('utf-8')
+                        batch = []
+                if len(batch) > 0:
+                    yield ('\n'.join(batch) + '\n').encode('utf-8')
+            finally:
+                # The response is only sent after the request's transaction
+                # has been committed, so end the one that reading the
+                # collection began.
+                config.db.abort()
+
+        response.content_type = CONTENT_TYPE_NDJSON
+        response.stream = lines()
+
 
 @public
 class GetterSetter:
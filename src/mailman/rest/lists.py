@@ -172,7 +172,8 @@ class FindLists(_ListBase):
             # Allow pagination.
             page=int,
             count=int,
-            _optional=('role', 'page', 'count'))
+            etags=as_boolean,
+            _optional=('role', 'page', 'count', 'etags'))
         try:
             data = validator(request)
         except ValueError as error:
@@ -182,6 +183,7 @@ class FindLists(_ListBase):
             # Remove any optional pagination query elements.
             data.pop('page', None)
             data.pop('count', None)
+            data.pop('etags', None)
             service = getUtility(ISubscriptionService)
             # Get all membership records for given subscriber.
             memberships = service.find_members(**data)
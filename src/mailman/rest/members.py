@@ -130,17 +130,18 @@ class _MemberBase(CollectionMixin):
 
     def _resource_as_dict(self, member, fields=None):
         """See `CollectionMixin`."""
+        all_fields = self.all_fields
         if fields is None:
-            fields = self.all_fields.keys()
+            fields = all_fields.keys()
 
         response = {}
         for field in fields:
-            value_getter = self.all_fields.get(field, None)
+            value_getter = all_fields.get(field, None)
             if value_getter is None:
                 raise ValueError(
                     'Unknown field "{}" for Member resource.'
                     ' Allowed fields are: {}'.format(
-                        field, ', '.join(self.all_fields.keys())))
+                        field, ', '.join(all_fields.keys())))
             value = value_getter(member)
             if value is not None:
                 response[field] = value
@@ -148,7 +149,7 @@ class _MemberBase(CollectionMixin):
 
     def _get_collection(self, request):
         """See `CollectionMixin`."""
-        return list(getUtility(ISubscriptionService))
+        return getUtility(ISubscriptionService).get_members()
 
     def on_get(self, request, response):
         """/members"""
@@ -156,7 +157,10 @@ class _MemberBase(CollectionMixin):
             fields=list_of_strings_validator,
             count=int,
             page=int,
-            _optional=['fields', 'count', 'page'],
+            after=str,
+            etags=as_boolean,
+            format=str,
+            _optional=['fields', 'count', 'page', 'after', 'etags', 'format'],
             )
         try:
             data = validator(request)
@@ -164,6 +168,13 @@ class _MemberBase(CollectionMixin):
             bad_request(response, str(ex))
             return
         fields = data.get('fields', None)
+        fmt = data.get('format', 'json')
+        if fmt == 'ndjson':
+            self._export(request, response, data, fields)
+            return
+        elif fmt != 'json':
+            bad_request(response, 'Unknown format: {}'.format(fmt))
+            return
 
         try:
             resource = self._make_collection(request, fields)
@@ -172,6 +183,20 @@ class _MemberBase(CollectionMixin):
             return
         okay(response, etag(resource))
 
+    def _export(self, request, response, data, fields):
+        # Stream the whole collection as newline delimited JSON.
+        if any(name in data for name in ('count', 'page', 'after')):
+            bad_request(response, 'Exports cannot be paginated')
+            return
+        unknown = set(fields or ()) - set(self.all_fields)
+        if len(unknown) > 0:
+            bad_request(
+                response, 'Unknown fields for Member resource: {}'.format(
+                    ', '.join(sorted(unknown))))
+            return
+        okay(response)
+        self._stream_collection(request, response, fields)
+
 
 @public
 class MemberCollection(_MemberBase):
@@ -516,11 +541,13 @@ class FindMembers(_MemberBase):
             # Allow pagination.
             page=int,
             count=int,
+            after=str,
+            etags=as_boolean,
             fields=list_of_strings_validator,
             _optional=(
                 'list_id', 'subscriber', 'role', 'moderation_action',
                 'delivery_mode', 'delivery_status',
-                'page', 'count', 'fields'))
+                'page', 'count', 'after', 'etags', 'fields'))
         try:
             data = validator(request)
         except ValueError as error:
@@ -530,6 +557,8 @@ class FindMembers(_MemberBase):
             # handled later.
             data.pop('page', None)
             data.pop('count', None)
+            data.pop('after', None)
+            data.pop('etags', None)
             fields = data.pop('fields', None)
             members = service.find_members(**data)
             resource = _FoundMembers(members, self.api)
@@ -17,6 +17,7 @@
 
 """REST API for held subscription requests."""
 
+from lazr.config import as_boolean
 from mailman.app.moderator import send_rejection
 from mailman.core.i18n import _
 from mailman.interfaces.action import Action
@@ -174,7 +175,9 @@ class SubscriptionRequests(_ModerationBase, CollectionMixin):
             request_type=enum_validator(PendType),
             page=int,
             count=int,
-            _optional=['token_owner', 'page', 'count', 'request_type'],
+            etags=as_boolean,
+            _optional=['token_owner', 'page', 'count', 'etags',
+                       'request_type'],
             )
 
         try:
@@ -184,6 +187,7 @@ class SubscriptionRequests(_ModerationBase, CollectionMixin):
         else:
             data.pop('page', None)
             data.pop('count', None)
+            data.pop('etags', None)
             token_owner = data.pop('token_owner', None)
             pend_type = data.pop('request_type', PendType.subscription)
             pendings = getUtility(IPendings).find(
@@ -18,6 +18,7 @@
 """Additional tests for helpers."""
 
 import json
+import hashlib
 import unittest
 
 from datetime import timedelta
@@ -94,6 +95,40 @@ class TestHelpers(unittest.TestCase):
         resource = dict(interval=Unserializable())
         self.assertRaises(TypeError, helpers.etag, resource)
 
+    def test_etag_is_canonical(self):
+        # The etag doesn't depend on the order of the keys.
+        one = dict(geddy='bass', alex='guitar', neil=['drums', 'lyrics'])
+        two = dict(neil=['drums', 'lyrics'], alex='guitar', geddy='bass')
+        helpers.etag(one)
+        helpers.etag(two)
+        self.assertEqual(one['http_etag'], two['http_etag'])
+        three = dict(geddy='bass', alex='guitar', neil=['lyrics', 'drums'])
+        helpers.etag(three)
+        self.assertNotEqual(one['http_etag'], three['http_etag'])
+
+    def test_etag_json(self):
+        # The returned JSON is that of the tagged resource.
+        resource = dict(interval=timedelta(seconds=2), name='\xe9')
+        data = json.loads(helpers.etag(resource))
+        self.assertEqual(data, dict(
+            interval='0d2.0s', name='\xe9',
+            http_etag=resource['http_etag']))
+        resource = {}
+        data = json.loads(helpers.etag(resource))
+        self.assertEqual(data, dict(http_etag=resource['http_etag']))
+
+    def test_etag_representation(self):
+        # The etag is calculated from the key-sorted JSON representation of
+        # the resource, and the returned JSON is that of the tagged resource,
+        # also with sorted keys.
+        resource = dict(neil='drums', alex=dict(plays='guitar', sings=False),
+                        geddy=['bass', 'vocals'])
+        untagged = json.dumps(resource, sort_keys=True)
+        body = helpers.etag(resource)
+        self.assertEqual(resource['http_etag'], '"{}"'.format(
+            hashlib.sha1(untagged.encode('utf-8')).hexdigest()))
+        self.assertEqual(body, json.dumps(resource, sort_keys=True))
+
     def test_bad_request_content_type(self):
         response = FakeResponse()
         helpers.bad_request(response, body=None)
@@ -17,6 +17,7 @@
 
 """REST membership tests."""
 
+import json
 import unittest
 
 from mailman.app.lifecycle import create_list
@@ -40,7 +41,9 @@ from mailman.testing.helpers import (
 )
 from mailman.testing.layers import ConfigLayer, RESTLayer
 from mailman.utilities.datetime import now
+from requests import request
 from urllib.error import HTTPError
+from urllib.parse import urlencode
 from zope.component import getUtility
 
 
@@ -663,6 +666,97 @@ class TestMembership(unittest.TestCase):
         self.assertEqual(member.delivery_mode, DeliveryMode.plaintext_digests)
         self.assertEqual(member.delivery_status, DeliveryStatus.by_user)
 
+    def _page_after(self, url, count):
+        # Follow the cursors through all the pages of a collection.
+        self_links = []
+        cursor = ''
+        separator = '&' if '?' in url else '?'
+        while True:
+            content, response = call_api('{}{}{}'.format(
+                url, separator, urlencode(dict(count=count, after=cursor))))
+            self.assertNotIn('total_size', content)
+            entries = content.get('entries', [])
+            self.assertLessEqual(len(entries), count)
+            self_links.extend(entry['self_link'] for entry in entries)
+            if 'next' not in content:
+                return self_links
+            cursor = content['next']
+
+    def test_page_members_after(self):
+        # Paging through the members by key returns them in the same order
+        # as fetching them all at once.
+        with transaction():
+            ant = create_list('ant@example.com')
+            for mlist in (self._mlist, ant):
+                subscribe(mlist, 'Anne')
+                subscribe(mlist, 'Bart', MemberRole.owner)
+                subscribe(mlist, 'Cris', MemberRole.moderator)
+                subscribe(mlist, 'Dave', as_user=True)
+                subscribe(mlist, 'Elle', MemberRole.nonmember)
+        for url in ('http://localhost:9001/3.1/members',
+                    'http://localhost:9001/3.1/lists/ant.example.com'
+                    '/roster/member',
+                    'http://localhost:9001/3.1/members/find'
+                    '?subscriber=*person*'):
+            content, response = call_api(url)
+            self_links = [entry['self_link'] for entry in content['entries']]
+            self.assertEqual(len(self_links), content['total_size'])
+            for count in (1, 2, 3, len(self_links)):
+                self.assertEqual(self._page_after(url, count), self_links)
+
+    def test_page_members_after_bad_cursor(self):
+        with self.assertRaises(HTTPError) as cm:
+            call_api('http://localhost:9001/3.1/members?count=2&after=bogus')
+        self.assertEqual(cm.exception.code, 400)
+
+    def _export(self, url):
+        response = request(
+            'GET', url, auth=(config.webservice.admin_user,
+                              config.webservice.admin_pass))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['content-type'],
+                         'application/x-ndjson')
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    def test_export_members(self):
+        # A roster can be exported as newline delimited JSON, with the same
+        # entries as the collection, but without their etags.
+        with transaction():
+            for name in ('Anne', 'Bart', 'Cris'):
+                subscribe(self._mlist, name)
+            subscribe(self._mlist, 'Dave', MemberRole.owner)
+        for url in ('http://localhost:9001/3.1/members',
+                    'http://localhost:9001/3.1/lists/test.example.com'
+                    '/roster/member'):
+            content, response = call_api(url)
+            entries = content['entries']
+            for entry in entries:
+                del entry['http_etag']
+            self.assertEqual(self._export(url + '?format=ndjson'), entries)
+
+    def test_export_members_fields(self):
+        with transaction():
+            subscribe(self._mlist, 'Anne')
+            subscribe(self._mlist, 'Bart')
+        self.assertEqual(
+            self._export('http://localhost:9001/3.1/lists/test.example.com'
+                         '/roster/member?format=ndjson'
+                         '&fields=email&fields=role'),
+            [dict(email='aperson@example.com', role='member'),
+             dict(email='bperson@example.com', role='member')])
+
+    def test_export_no_members(self):
+        self.assertEqual(
+            self._export('http://localhost:9001/3.1/members?format=ndjson'),
+            [])
+
+    def test_export_bad_requests(self):
+        for query in ('format=xml', 'format=ndjson&count=2&page=1',
+                      'format=ndjson&after=', 'format=ndjson&fields=bogus'):
+            with self.assertRaises(HTTPError) as cm:
+                call_api('http://localhost:9001/3.1/members?' + query)
+            self.assertEqual(cm.exception.code, 400)
+
 
 class CustomLayer(ConfigLayer):
     """Custom layer which starts both the REST and LMTP servers."""
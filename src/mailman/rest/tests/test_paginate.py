@@ -17,22 +17,30 @@
 
 """paginate helper tests."""
 
+import json
 import unittest
 
+from datetime import timedelta
 from falcon import HTTPInvalidParam, Request
 from mailman.app.lifecycle import create_list
 from mailman.database.transaction import transaction
-from mailman.rest.helpers import CollectionMixin
+from mailman.interfaces.usermanager import IUserManager
+from mailman.rest.helpers import CollectionMixin, etag, ExtendedEncoder
+from mailman.testing.helpers import configuration
 from mailman.testing.layers import RESTLayer
+from unittest.mock import patch
+from zope.component import getUtility
 
 
 class _FakeRequest(Request):
-    def __init__(self, count=None, page=None):
+    def __init__(self, count=None, page=None, after=None):
         self._params = {}
         if count is not None:
             self._params['count'] = count
         if page is not None:
             self._params['page'] = page
+        if after is not None:
+            self._params['after'] = after
 
 
 class TestPaginateHelper(unittest.TestCase):
@@ -102,6 +110,58 @@ class TestPaginateHelper(unittest.TestCase):
         self.assertEqual(page['total_size'], 5)
         self.assertNotIn('entries', page)
 
+    def test_entry_etags(self):
+        resource = self._get_resource()
+        page = resource._make_collection(_FakeRequest(2, 1))
+        for entry in page['entries']:
+            self.assertIn('http_etag', entry)
+        request = _FakeRequest(2, 1)
+        request._params['etags'] = 'false'
+        page = resource._make_collection(request)
+        for entry in page['entries']:
+            self.assertNotIn('http_etag', entry)
+
+    @configuration('webservice', entry_etags='no')
+    def test_entry_etags_configuration(self):
+        resource = self._get_resource()
+        page = resource._make_collection(_FakeRequest(2, 1))
+        for entry in page['entries']:
+            self.assertNotIn('http_etag', entry)
+        # Clients can still ask for them.
+        request = _FakeRequest(2, 1)
+        request._params['etags'] = 'true'
+        page = resource._make_collection(request)
+        for entry in page['entries']:
+            self.assertIn('http_etag', entry)
+
+    def test_collection_etag(self):
+        class Resource(CollectionMixin):
+            def _get_collection(self, request):
+                return [1, 2, 3]
+            def _resource_as_dict(self, res):                    # noqa: E306
+                return dict(interval=timedelta(days=res))
+        default = ExtendedEncoder.default
+        with patch.object(ExtendedEncoder, 'default', autospec=True,
+                          side_effect=default) as encode:
+            page = Resource()._make_collection(_FakeRequest())
+            self.assertEqual(encode.call_count, 3)
+            body = etag(page)
+            # The entries aren't serialized again for the collection.
+            self.assertEqual(encode.call_count, 3)
+        data = json.loads(body)
+        self.assertEqual(data['http_etag'], page['http_etag'])
+        self.assertEqual(
+            [entry['interval'] for entry in data['entries']],
+            ['1d', '2d', '3d'])
+        self.assertEqual(
+            [entry['http_etag'] for entry in data['entries']],
+            [entry['http_etag'] for entry in page['entries']])
+        # The collection is represented as it would be if its entries were
+        # serialized along with it.
+        page['entries'] = list(page['entries'])
+        self.assertEqual(body, json.dumps(
+            page, cls=ExtendedEncoder, sort_keys=True))
+
     def test_count_as_string_returns_bad_request(self):
         # ?count=two&page=2 are not valid values, so a bad request occurs.
         resource = self._get_resource()
@@ -125,3 +185,91 @@ class TestPaginateHelper(unittest.TestCase):
         resource = self._get_resource()
         self.assertRaises(HTTPInvalidParam, resource._make_collection,
                           _FakeRequest(-1, -1))
+
+
+class TestPageAfterHelper(unittest.TestCase):
+    """Test paging through collections by key."""
+
+    layer = RESTLayer
+
+    def setUp(self):
+        user_manager = getUtility(IUserManager)
+        with transaction():
+            for name in ('anne', 'bart', 'cris', 'dave', 'elle'):
+                user_manager.create_user(
+                    '{}@example.com'.format(name), name.capitalize())
+
+    def _get_resource(self, collection=None):
+        class Resource(CollectionMixin):
+            def _get_collection(self, request):
+                if collection is None:
+                    return getUtility(IUserManager).users
+                return collection
+            def _resource_as_dict(self, res):                    # noqa: E306
+                return {'value': res.display_name}
+        return Resource()
+
+    def _values(self, page):
+        return [entry['value'] for entry in page.get('entries', [])]
+
+    def test_page_after(self):
+        # ?count=2&after= returns the first page and a cursor for the next.
+        resource = self._get_resource()
+        page = resource._make_collection(_FakeRequest(2, after=''))
+        self.assertNotIn('start', page)
+        self.assertNotIn('total_size', page)
+        self.assertEqual(self._values(page), ['Anne', 'Bart'])
+        page = resource._make_collection(_FakeRequest(2, after=page['next']))
+        self.assertEqual(self._values(page), ['Cris', 'Dave'])
+        page = resource._make_collection(_FakeRequest(2, after=page['next']))
+        self.assertEqual(self._values(page), ['Elle'])
+        self.assertNotIn('next', page)
+
+    def test_page_after_exact_fit(self):
+        # When the last page is full, there's no cursor for the next page.
+        resource = self._get_resource()
+        page = resource._make_collection(_FakeRequest(5, after=''))
+        self.assertEqual(len(self._values(page)), 5)
+        self.assertNotIn('next', page)
+
+    def test_page_after_without_count(self):
+        # Without a count, the page has all the rest of the collection.
+        resource = self._get_resource()
+        page = resource._make_collection(_FakeRequest(1, after=''))
+        page = resource._make_collection(_FakeRequest(after=page['next']))
+        self.assertEqual(self._values(page), ['Bart', 'Cris', 'Dave', 'Elle'])
+        self.assertNotIn('next', page)
+
+    def test_page_after_is_stable(self):
+        # Pages start after the last item of the previous page, even if items
+        # before it have been removed since.
+        resource = self._get_resource()
+        page = resource._make_collection(_FakeRequest(2, after=''))
+        with transaction():
+            user_manager = getUtility(IUserManager)
+            user_manager.delete_user(
+                user_manager.get_user('anne@example.com'))
+        page = resource._make_collection(_FakeRequest(2, after=page['next']))
+        self.assertEqual(self._values(page), ['Cris', 'Dave'])
+
+    def test_bad_cursor(self):
+        resource = self._get_resource()
+        for cursor in ('bogus', 'bm90IGpzb24=', 'eyJhIjogMX0=', 'WzEsIDJd'):
+            self.assertRaises(HTTPInvalidParam, resource._make_collection,
+                              _FakeRequest(2, after=cursor))
+
+    def test_negative_count(self):
+        resource = self._get_resource()
+        self.assertRaises(HTTPInvalidParam, resource._make_collection,
+                          _FakeRequest(-1, after=''))
+
+    def test_zero_count(self):
+        resource = self._get_resource()
+        self.assertRaises(HTTPInvalidParam, resource._make_collection,
+                          _FakeRequest(0, after=''))
+
+    def test_not_keyed(self):
+        # Collections which aren't database queries can't be paged by key.
+        resource = self._get_resource(['one', 'two'])
+        self.assertRaises(HTTPInvalidParam, resource._make_collection,
+                          _FakeRequest(1, after=''))
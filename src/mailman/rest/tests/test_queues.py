@@ -21,8 +21,14 @@ import unittest
 
 from mailman.app.lifecycle import create_list
 from mailman.config import config
+from mailman.core.switchboard import Switchboard
 from mailman.database.transaction import transaction
-from mailman.testing.helpers import call_api, get_queue_messages
+from mailman.testing.helpers import (
+    call_api,
+    configuration,
+    get_queue_messages,
+    specialized_message_from_string as mfs,
+)
 from mailman.testing.layers import RESTLayer
 from urllib.error import HTTPError
 
@@ -100,3 +106,18 @@ class TestQueues(unittest.TestCase):
         content, response = call_api(location, method='DELETE')
         self.assertEqual(response.status_code, 204)
         self.assertEqual(len(config.switchboards['bad'].files), 0)
+
+    def test_delete_envelope_file(self):
+        # Queue files in the envelope format are listed and deleted just like
+        # pickled ones.
+        with configuration('runner.bad', queue_format='envelope'):
+            switchboard = Switchboard(
+                'bad', config.switchboards['bad'].queue_directory)
+        filebase = switchboard.enqueue(mfs(TEXT))
+        content, response = call_api('http://localhost:9001/3.0/queues/bad')
+        self.assertEqual(content['files'], [filebase])
+        content, response = call_api(
+            'http://localhost:9001/3.0/queues/bad/' + filebase,
+            method='DELETE')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(config.switchboards['bad'].files), 0)
@@ -60,6 +60,8 @@ class TestSystemConfiguration(unittest.TestCase):
             self_link='http://localhost:9001/3.0/system/configuration/mailman',
             sender_headers='from from_ reply-to sender',
             site_owner='noreply@example.com',
+            template_cache_life='1m',
+            template_cache_size='1000',
             ))
 
     def test_dmarc_system_configuration(self):
@@ -129,6 +131,7 @@ class TestSystemConfiguration(unittest.TestCase):
             'devmode',
             'digests',
             'dmarc',
+            'dns',
             'language.ar',
             'language.ast',
             'language.bg',
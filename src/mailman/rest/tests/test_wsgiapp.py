@@ -22,8 +22,9 @@ import unittest
 
 from mailman.config import config
 from mailman.interfaces.domain import IDomainManager
+from mailman.rest.helpers import child
 from mailman.testing.helpers import call_api
-from mailman.testing.layers import RESTLayer
+from mailman.testing.layers import ConfigLayer, RESTLayer
 from zope.component import getUtility
 
 
@@ -118,3 +119,118 @@ class TestSupportedContentType(unittest.TestCase):
 
     def test_error_response_is_unformly_formatted(self):
         pass
+
+
+class Leaf:
+    def __init__(self, name):
+        self.name = name
+
+
+class Resource:
+    @child()
+    def literal(self, context, segments):
+        return Leaf('literal'), []
+
+    @child(r'^(?P<id>\d+)')
+    def regexp(self, context, segments, id):
+        return Leaf(id), []
+
+    @child(lambda segments: ((), {}, []) if segments[0] == 'x' else None)
+    def callable(self, context, segments):
+        return Leaf('callable'), []
+
+
+class NoChildren:
+    @property
+    def not_a_child(self):
+        raise AssertionError('Properties are not evaluated')
+
+
+class Proxy:
+    def __init__(self, resource):
+        self._resource = resource
+
+    def __getattr__(self, name):
+        return getattr(self._resource, name)
+
+    def __dir__(self):
+        return dir(self._resource)
+
+
+class Tree:
+    @child()
+    def resource(self, context, segments):
+        return Resource()
+
+    @child()
+    def proxy(self, context, segments):
+        return Proxy(Resource())
+
+
+class TestRoutes(unittest.TestCase):
+    layer = ConfigLayer
+
+    # The REST API's modules are imported in the tests, since they can only
+    # be imported once the configuration is loaded.
+
+    def test_compile_routes(self):
+        from mailman.rest.wsgiapp import compile_routes
+        routes = compile_routes(Resource)
+        self.assertEqual([route.name for route in routes],
+                         ['callable', 'literal', 'regexp'])
+        callable_route, literal_route, regexp_route = routes
+        self.assertIsNotNone(callable_route.callable)
+        self.assertEqual(literal_route.literal, 'literal')
+        self.assertEqual(regexp_route.regexp.pattern, r'^(?P<id>\d+)')
+
+    def test_no_routes(self):
+        from mailman.rest.wsgiapp import compile_routes
+        self.assertEqual(compile_routes(NoChildren), ())
+
+    def test_precompiled(self):
+        # The routes of the REST API's resources are compiled when the
+        # application is created.
+        from mailman.rest.lists import AList
+        from mailman.rest.members import AMember
+        from mailman.rest.root import Root
+        from mailman.rest.wsgiapp import make_application
+        router = make_application()._router
+        self.assertIn(Root, router._routes)
+        self.assertIn(AList, router._routes)
+        self.assertIn(AMember, router._routes)
+        # Other classes in the REST API's packages aren't resources.
+        self.assertNotIn(Resource, router._routes)
+
+    def test_precompiled_tree(self):
+        # The routes compiled up front are those of the resources that can
+        # be reached from the root, whatever else has been imported.
+        from mailman.rest.wsgiapp import ObjectRouter
+        router = ObjectRouter(Tree())
+        router.compile()
+        self.assertIn(Tree, router._routes)
+        self.assertIn(Resource, router._routes)
+        self.assertNotIn(NoChildren, router._routes)
+        self.assertNotIn(Proxy, router._routes)
+        resource, method_map, context = router.find('/resource/literal')
+        self.assertEqual(resource.name, 'literal')
+
+    def test_compiled_on_demand(self):
+        from mailman.rest.wsgiapp import ObjectRouter
+        router = ObjectRouter(Resource())
+        self.assertNotIn(Resource, router._routes)
+        resource, method_map, context = router.find('/literal')
+        self.assertEqual(resource.name, 'literal')
+        self.assertIn(Resource, router._routes)
+        resource, method_map, context = router.find('/42')
+        self.assertEqual(resource.name, '42')
+        resource, method_map, context = router.find('/x')
+        self.assertEqual(resource.name, 'callable')
+        self.assertEqual(router.find('/missing'), (None, None, None))
+
+    def test_proxy(self):
+        # A proxy's routes are those of the resource it proxies to.
+        from mailman.rest.wsgiapp import ObjectRouter
+        router = ObjectRouter(Proxy(Resource()))
+        resource, method_map, context = router.find('/literal')
+        self.assertEqual(resource.name, 'literal')
+        self.assertNotIn(Proxy, router._routes)
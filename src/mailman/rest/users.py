@@ -203,7 +203,8 @@ class FindUsers(_UserBase):
                               # Allow pagination.
                               page=int,
                               count=int,
-                              _optional=('page', 'count'))
+                              etags=as_boolean,
+                              _optional=('page', 'count', 'etags'))
         try:
             data = validator(request)
         except ValueError as error:
@@ -22,6 +22,7 @@ import hmac
 import logging
 
 from base64 import b64decode
+from collections import deque
 from falcon import App, HTTPUnauthorized
 from falcon.routing import map_http_methods, set_default_responders
 from mailman.config import config
@@ -82,14 +83,111 @@ def handle_ValueError(exc, request, response, params):
     bad_request(response, str(exc))
 
 
+@public
+class Route:
+    """A child link of a resource class, ready to be matched."""
+
+    def __init__(self, name, matcher):
+        """Compile a child link.
+
+        :param name: The name of the resource's method for the link.
+        :type name: str
+        :param matcher: The method's `__matcher__`, as set by
+            `mailman.rest.helpers.child()`.
+        """
+        self.name = name
+        self.literal = None
+        self.regexp = None
+        self.callable = None
+        if isinstance(matcher, str):
+            # Is the matcher string a regular expression or plain string?  If
+            # it starts with a caret, it's a regexp.
+            if matcher.startswith('^'):
+                self.regexp = re.compile(matcher)
+            else:
+                self.literal = matcher
+        else:
+            self.callable = matcher
+
+
+def _is_proxy(cls):
+    # Does the class make up its attributes as it goes, e.g. by proxying to
+    # another resource?
+    return cls.__dir__ is not object.__dir__
+
+
+@public
+def compile_routes(resource):
+    """Return the child links of a resource, in the order to try them.
+
+    :param resource: The resource class, or for resources whose attributes
+        aren't those of their class, the resource itself.
+    :return: The routes to the resource's children.
+    :rtype: tuple of `Route`
+    """
+    routes = []
+    # dir() sorts the names, which is the order that the links are tried in.
+    for name in dir(resource):
+        if name.startswith('__') and name.endswith('__'):
+            continue
+        matcher = getattr(
+            getattr(resource, name, None), '__matcher__', MISSING)
+        if matcher is not MISSING:
+            routes.append(Route(name, matcher))
+    return tuple(routes)
+
+
+def _referenced_classes(func):
+    # The classes that a function, and the functions nested in it, refer to
+    # by their global names.
+    codes = [func.__code__] if hasattr(func, '__code__') else []
+    while len(codes) > 0:
+        code = codes.pop()
+        for name in code.co_names:
+            value = func.__globals__.get(name)
+            if isinstance(value, type):
+                yield value
+        codes.extend(
+            const for const in code.co_consts if hasattr(const, 'co_names'))
+
+
 class ObjectRouter:
     def __init__(self, root):
         self._root = root
+        # Resource class -> the routes to its children.
+        self._routes = {}
 
     def add_route(self, uri_template, method_map, resource):
         # We don't need this method for object-based routing.
         raise NotImplementedError
 
+    def compile(self):
+        """Compile the routes of the resource tree ahead of time.
+
+        The tree is walked from the root, following the classes that each
+        child link refers to, which are normally those of the resources it
+        returns.  Classes that aren't found this way are compiled the first
+        time one of their resources is routed through.
+        """
+        queue = deque([type(self._root)])
+        while len(queue) > 0:
+            cls = queue.popleft()
+            if cls in self._routes or _is_proxy(cls):
+                continue
+            routes = self._routes[cls] = compile_routes(cls)
+            for route in routes:
+                queue.extend(_referenced_classes(getattr(cls, route.name)))
+
+    def _get_routes(self, resource):
+        cls = type(resource)
+        routes = self._routes.get(cls)
+        if routes is None:
+            if _is_proxy(cls):
+                # The resource's children depend on what it proxies to.
+                return compile_routes(resource)
+            routes = self._routes[cls] = compile_routes(cls)
+        return routes
+
     def find(self, uri, req=None):
         segments = uri.split(SLASH)
         # Since the path is always rooted at /, skip the first segment, which
@@ -102,30 +200,19 @@ class ObjectRouter:
             # Plumb the API through to all child resources.
             api = getattr(resource, 'api', None)
             # See if any of the resource's child links match the next segment.
-            for name in dir(resource):
-                if name.startswith('__') and name.endswith('__'):
-                    continue
-                attribute = getattr(resource, name, MISSING)
-                assert attribute is not MISSING, name
-                matcher = getattr(attribute, '__matcher__', MISSING)
-                if matcher is MISSING:
-                    continue
+            for route in self._get_routes(resource):
                 result = None
-                if isinstance(matcher, str):
-                    # Is the matcher string a regular expression or plain
-                    # string?  If it starts with a caret, it's a regexp.
-                    if matcher.startswith('^'):
-                        cre = re.compile(matcher)
-                        # Search against the entire remaining path.
-                        tmp_segments = segments[:]
-                        tmp_segments.insert(0, this_segment)
-                        remaining_path = SLASH.join(tmp_segments)
-                        mo = cre.match(remaining_path)
-                        if mo:
-                            result = attribute(
-                                context, segments, **mo.groupdict())
-                    elif matcher == this_segment:
-                        result = attribute(context, segments)
+                if route.literal is not None:
+                    if route.literal == this_segment:
+                        result = getattr(resource, route.name)(
+                            context, segments)
+                elif route.regexp is not None:
+                    # Search against the entire remaining path.
+                    remaining_path = SLASH.join([this_segment] + segments)
+                    mo = route.regexp.match(remaining_path)
+                    if mo:
+                        result = getattr(resource, route.name)(
+                            context, segments, **mo.groupdict())
                 else:
                     # The matcher is a callable.  It returns None if it
                     # doesn't match, and if it does, it returns a 3-tuple
@@ -134,12 +221,10 @@ class ObjectRouter:
                     # then called with these arguments.  Note that the matcher
                     # wants to see the full remaining path components, which
                     # includes the current hop.
-                    tmp_segments = segments[:]
-                    tmp_segments.insert(0, this_segment)
-                    matcher_result = matcher(tmp_segments)
+                    matcher_result = route.callable([this_segment] + segments)
                     if matcher_result is not None:
                         positional, keyword, segments = matcher_result
-                        result = attribute(
+                        result = getattr(resource, route.name)(
                             context, segments, *positional, **keyword)
                 # The attribute could return a 2-tuple giving the resource and
                 # remaining path segments, or it could just return the result.
@@ -175,10 +260,14 @@ class ObjectRouter:
 
 class RootedAPI(App):
     def __init__(self, root, *args, **kws):
+        router = ObjectRouter(root)
+        # Compile the routing tables up front, instead of during the first
+        # requests.
+        router.compile()
         super().__init__(
             *args,
             middleware=Middleware(),
-            router=ObjectRouter(root),
+            router=router,
             **kws)
         # Let Falcon parse the form data into the request object's
         # .params attribute.
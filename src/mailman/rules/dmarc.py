@@ -29,6 +29,7 @@ from lazr.config import as_timedelta
 from mailman.config import config
 from mailman.core.i18n import _
 from mailman.interfaces.mailinglist import DMARCMitigateAction
+from mailman.interfaces.resolver import IResolver
 from mailman.interfaces.rules import IRule
 from mailman.utilities.datetime import now
 from mailman.utilities.protocols import get
@@ -36,6 +37,7 @@ from mailman.utilities.string import wrap
 from public import public
 from requests.exceptions import HTTPError
 from urllib.error import URLError
+from zope.component import getUtility
 from zope.interface import implementer
 
 
@@ -46,10 +48,15 @@ DOT = '.'
 EMPTYSTRING = ''
 KEEP_LOOKING = object()
 LOCAL_FILE_NAME = 'public_suffix_list.dat'
+RULE = None
 
 # Map organizational domain suffix rules to a boolean indicating whether the
 # rule is an exception or not.
 suffix_cache = dict()
+# The same rules as a trie of their labels from the right.  Each node maps a
+# label, or '*', to the node for the rules which continue with it, and RULE
+# to the exception flag of the rule which ends there, if there is one.
+suffix_trie = dict()
 
 
 def ensure_current_suffix_list():
@@ -125,6 +132,10 @@ def parse_suffix_list(filename=None):
             parts.reverse()
             key = DOT.join(parts)
             suffix_cache[key] = exception
+            node = suffix_trie
+            for part in parts:
+                node = node.setdefault(part, {})
+            node[RULE] = exception
 
 
 def get_domain(parts, label):
@@ -135,71 +146,54 @@ def get_domain(parts, label):
     return DOT.join(domain)
 
 
+def find_rules(parts, node=None, depth=0):
+    # Yield the number of labels in, and the exception flag of, every suffix
+    # rule which matches the reversed domain name parts.
+    if node is None:
+        node = suffix_trie
+    if depth == len(parts):
+        return
+    for label in {parts[depth], '*'}:
+        child = node.get(label)
+        if child is None:
+            continue
+        if RULE in child:
+            yield depth + 1, child[RULE]
+        yield from find_rules(parts, child, depth + 1)
+
+
 def get_organizational_domain(domain):
     # Given a domain name, this returns the corresponding Organizational
     # Domain which may be the same as the input.
     if len(suffix_cache) == 0:
         parse_suffix_list()
-    hits = []
     parts = domain.lower().split('.')
     parts.reverse()
-    for key in suffix_cache:
-        key_parts = key.split('.')
-        if len(parts) >= len(key_parts):
-            for i in range(len(key_parts) - 1):
-                if parts[i] != key_parts[i] and key_parts[i] != '*':
-                    break
-            else:
-                if (parts[len(key_parts) - 1] == key_parts[-1] or
-                        key_parts[-1] == '*'):
-                    hits.append(key)
+    hits = list(find_rules(parts))
     if not hits:
         return get_domain(parts, 1)
-    label = 0
-    for key in hits:
-        key_parts = key.split('.')
-        if suffix_cache[key]:
-            # It's an exception.
-            return get_domain(parts, len(key_parts) - 1)
-        if len(key_parts) > label:
-            label = len(key_parts)
-    return get_domain(parts, label)
+    exceptions = [length for length, exception in hits if exception]
+    if exceptions:
+        return get_domain(parts, max(exceptions) - 1)
+    return get_domain(parts, max(length for length, exception in hits))
 
 
-def is_reject_or_quarantine(mlist, email, dmarc_domain, org=False):
-    # This takes a mailing list, an email address as in the From: header, the
-    # _dmarc host name for the domain in question, and a flag stating whether
-    # we should check the organizational domains.  It returns one of three
-    # values:
-    # * True if the DMARC policy is reject or quarantine;
-    # * False if is not;
-    # * A special sentinel if we should continue looking
-    resolver = dns.resolver.Resolver()
-    resolver.timeout = as_timedelta(
-        config.dmarc.resolver_timeout).total_seconds()
-    resolver.lifetime = as_timedelta(
-        config.dmarc.resolver_lifetime).total_seconds()
+def get_dmarc_records(dmarc_domain):
+    # Look up the TXT records of a _dmarc host name.  This returns None if the
+    # host name has no TXT records, or else the host name that answered, after
+    # following any CNAMEs, and its TXT records.  The records are None if the
+    # answer didn't include the host name's own.  DNS exceptions other than
+    # for missing records are raised.  The resolver caches the answers, and
+    # that there are no records, for as long as DNS says.
     try:
-        txt_recs = resolver.query(dmarc_domain, dns.rdatatype.TXT)
+        txt_recs = getUtility(IResolver).resolve(
+            dmarc_domain, 'TXT',
+            timeout=as_timedelta(
+                config.dmarc.resolver_timeout).total_seconds(),
+            lifetime=as_timedelta(
+                config.dmarc.resolver_lifetime).total_seconds())
     except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
-        return KEEP_LOOKING
-    except (dns.resolver.NoNameservers):
-        elog.error(
-            'DNSException: No Nameservers available for %s (%s).',
-            email, dmarc_domain)
-        # Typically this means a dnssec validation error.  Clients that don't
-        # perform validation *may* successfully see a _dmarc RR whereas a
-        # validating mailman server won't see the _dmarc RR.  We should
-        # mitigate this email to be safe.
-        return True
-    except DNSException as error:
-        elog.error(
-            'DNSException: Unable to query DMARC policy for %s (%s). %s',
-            email, dmarc_domain, error.__doc__)
-        # While we can't be sure what caused the error, there is potentially
-        # a DMARC policy record that we missed and that a receiver of the mail
-        # might see.  Thus, we should err on the side of caution and mitigate.
-        return True
+        return None
     # Be as robust as possible in parsing the result.
     results_by_name = {}
     cnames = {}
@@ -233,11 +227,43 @@ def is_reject_or_quarantine(mlist, email, dmarc_domain, org=False):
     assert len(want_names) == 1, (
         'Error in CNAME processing for {}; want_names != 1.'.format(
             dmarc_domain))
-    for name in want_names:
-        if name not in results_by_name:
-            continue
+    name = want_names.pop()
+    return name, results_by_name.get(name)
+
+
+def is_reject_or_quarantine(mlist, email, dmarc_domain, org=False):
+    # This takes a mailing list, an email address as in the From: header, the
+    # _dmarc host name for the domain in question, and a flag stating whether
+    # we should check the organizational domains.  It returns one of three
+    # values:
+    # * True if the DMARC policy is reject or quarantine;
+    # * False if is not;
+    # * A special sentinel if we should continue looking
+    try:
+        answer = get_dmarc_records(dmarc_domain)
+    except (dns.resolver.NoNameservers):
+        elog.error(
+            'DNSException: No Nameservers available for %s (%s).',
+            email, dmarc_domain)
+        # Typically this means a dnssec validation error.  Clients that don't
+        # perform validation *may* successfully see a _dmarc RR whereas a
+        # validating mailman server won't see the _dmarc RR.  We should
+        # mitigate this email to be safe.
+        return True
+    except DNSException as error:
+        elog.error(
+            'DNSException: Unable to query DMARC policy for %s (%s). %s',
+            email, dmarc_domain, error.__doc__)
+        # While we can't be sure what caused the error, there is potentially
+        # a DMARC policy record that we missed and that a receiver of the mail
+        # might see.  Thus, we should err on the side of caution and mitigate.
+        return True
+    if answer is None:
+        return KEEP_LOOKING
+    name, records = answer
+    if records is not None:
         dmarcs = [
-            record for record in results_by_name[name]
+            record for record in records
             if record.startswith('v=DMARC1;')
             ]
         if len(dmarcs) == 0:
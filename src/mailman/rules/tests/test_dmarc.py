@@ -18,7 +18,10 @@
 """Tests and mocks for DMARC rule."""
 
 import os
+import time
+import dns.name
 import threading
+import dns.message
 
 from contextlib import ExitStack
 from datetime import timedelta
@@ -40,6 +43,7 @@ from mailman.testing.helpers import (
     wait_for_webservice,
 )
 from mailman.testing.layers import ConfigLayer
+from mailman.utilities import resolver
 from mailman.utilities.datetime import now
 from public import public
 from unittest import TestCase
@@ -197,6 +201,7 @@ def get_dns_resolver(
                 raise NXDOMAIN
             self.response = Answer()
             return self
+        resolve = query
     patcher = patch('dns.resolver.Resolver', Resolver)
     return patcher
 
@@ -223,6 +228,8 @@ class TestDMARCRules(TestCase):
         self.cache = {}
         self.resources.enter_context(
             patch('mailman.rules.dmarc.suffix_cache', self.cache))
+        self.resources.enter_context(
+            patch('mailman.rules.dmarc.suffix_trie', {}))
         use_test_organizational_data(self.resources)
 
     def test_no_data_for_domain(self):
@@ -240,6 +247,23 @@ class TestDMARCRules(TestCase):
             dmarc.get_organizational_domain('ssub.sub.city.kobe.jp'),
             'city.kobe.jp')
 
+    def test_domain_with_trailing_comment(self):
+        self.assertEqual(
+            dmarc.get_organizational_domain('www.example.co.uk'),
+            'example.co.uk')
+
+    def test_domain_is_suffix(self):
+        self.assertEqual(dmarc.get_organizational_domain('kobe.jp'),
+                         'kobe.jp')
+
+    def test_find_rules(self):
+        dmarc.get_organizational_domain('example.com')
+        self.assertEqual(
+            sorted(dmarc.find_rules(['jp', 'kobe', 'city', 'sub'])),
+            [(3, False), (3, True)])
+        self.assertEqual(list(dmarc.find_rules(['uk', 'co'])), [(2, False)])
+        self.assertEqual(list(dmarc.find_rules(['nxtld', 'example'])), [])
+
     def test_straightforward_cname(self):
         # Test that we can recognize an answer with case mismatch in the
         # domain.
@@ -489,6 +513,86 @@ To: ant@example.com
         self.assertFalse(self.cache['jp.kobe.*'])
 
 
+ANSWER = """\
+id 1
+opcode QUERY
+rcode NOERROR
+flags QR AA RD RA
+;QUESTION
+_dmarc.example.biz. IN TXT
+;ANSWER
+_dmarc.example.biz. 600 IN TXT "v=DMARC1; p=reject;"
+"""
+
+NEGATIVE_ANSWER = """\
+id 1
+opcode QUERY
+rcode NXDOMAIN
+flags QR AA RD RA
+;QUESTION
+_dmarc.example.biz. IN TXT
+;ANSWER
+;AUTHORITY
+example.biz. {} IN SOA ns.example.biz. admin.example.biz. 1 7200 3600 1 {}
+"""
+
+
+class TestDMARCPolicyLookup(TestCase):
+    """Test that DMARC policies are cached by the DNS resolver."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('ant@example.com')
+        self._queries = []
+        self._answer = None
+        test = self
+
+        class Resolver:
+            def query(self, domain, data_type):
+                test._queries.append(domain)
+                if isinstance(test._answer, Exception):
+                    raise test._answer
+                return test._answer
+            resolve = query
+
+        patcher = patch('dns.resolver.Resolver', Resolver)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _set_answer(self, ttl=600):
+        class Answer:
+            response = dns.message.from_text(ANSWER)
+            expiration = time.time() + ttl
+        self._answer = Answer()
+
+    def _check(self, domain='_dmarc.example.biz'):
+        return dmarc.is_reject_or_quarantine(
+            self._mlist, 'anne@example.biz', domain)
+
+    def test_cached(self):
+        self._set_answer()
+        self.assertTrue(self._check())
+        self.assertTrue(self._check())
+        self.assertEqual(self._queries, ['_dmarc.example.biz'])
+        self.assertIn(('_dmarc.example.biz', 'TXT'), resolver.cache)
+
+    def test_negative_cached(self):
+        response = dns.message.from_text(NEGATIVE_ANSWER.format(600, 300))
+        name = dns.name.from_text('_dmarc.example.biz.')
+        self._answer = NXDOMAIN(qnames=[name], responses={name: response})
+        self.assertIs(self._check(), dmarc.KEEP_LOOKING)
+        self.assertIs(self._check(), dmarc.KEEP_LOOKING)
+        self.assertEqual(self._queries, ['_dmarc.example.biz'])
+
+    def test_errors_not_cached(self):
+        self._answer = DNSException('no internet')
+        self.assertTrue(self._check())
+        self.assertTrue(self._check())
+        self.assertEqual(len(self._queries), 2)
+        self.assertNotIn(('_dmarc.example.biz', 'TXT'), resolver.cache)
+
+
 # New in Python 3.5.
 try:
     from http import HTTPStatus
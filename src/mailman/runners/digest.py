@@ -21,7 +21,6 @@ import os
 import re
 import logging
 
-from copy import deepcopy
 from email.header import Header
 from email.mime.message import MIMEMessage
 from email.mime.text import MIMEText
@@ -32,15 +31,20 @@ from mailman.core.i18n import _
 from mailman.core.runner import Runner
 from mailman.email.message import Message, MultipartDigestMessage
 from mailman.handlers.decorate import decorate
-from mailman.interfaces.member import DeliveryMode, DeliveryStatus
+from mailman.interfaces.member import DeliveryMode
 from mailman.interfaces.template import ITemplateLoader
 from mailman.utilities.mailbox import Mailbox
 from mailman.utilities.scrubber import scrub
 from mailman.utilities.string import expand, oneline, wrap
 from public import public
+from tempfile import SpooledTemporaryFile
 from zope.component import getUtility
 
 
+# How big the messages of an RFC 1153 digest can get before they are spooled
+# to disk, in bytes.
+SPOOL_SIZE = 1024 * 1024
+
 log = logging.getLogger('mailman.error')
 
 
@@ -175,9 +179,9 @@ class MIMEDigester(Digester):
 
     def add_message(self, msg, count):
         """Add the message to the digest."""
-        # Make a copy of the message object, since the RFC 1153 processing
-        # scrubs out attachments.
-        digest_msg = MIMEMessage(deepcopy(msg))
+        # The message becomes part of the digest, so it gets a Message: n
+        # header.  Digest the message in RFC 1153 format first, if at all.
+        digest_msg = MIMEMessage(msg)
         digest_msg_content = digest_msg.get_payload(0)
         # It would be nice to add Message: n near the beginning, but there's no
         # method for that.  MUAs mostly don't display it anyway, so it doesn't
@@ -217,6 +221,13 @@ class RFC1153Digester(Digester):
         if len(self._header) > 0:
             print(self._header, file=self._text)
             print(file=self._text)
+        # The messages come after the table of contents, which is only
+        # complete once all the messages have been added.  Until then they
+        # are kept in a temporary file, which stays in memory unless the
+        # digest gets big.
+        self._messages = SpooledTemporaryFile(
+            max_size=SPOOL_SIZE, mode='w+', encoding='utf-8',
+            errors='surrogatepass', newline='')
         # Calculate the set of headers we're to keep in the RFC1153 digest.
         self._keepers = set(config.digests.plain_digest_keep_headers.split())
 
@@ -237,26 +248,26 @@ class RFC1153Digester(Digester):
     def add_message(self, msg, count):
         """Add the message to the digest."""
         if count > 1:
-            print(self._separator30, file=self._text)
-            print(file=self._text)
+            print(self._separator30, file=self._messages)
+            print(file=self._messages)
         # Each message section contains a few headers.
         # add the Message: n header first.
-        print('Message: {}'.format(count), file=self._text)
+        print('Message: {}'.format(count), file=self._messages)
         # Then the others.
         for header in config.digests.plain_digest_keep_headers.split():
             if header in msg:
                 value = oneline(msg[header], in_unicode=True)
                 value = wrap('{}: {}'.format(header, value))
                 value = '\n\t'.join(value.split('\n'))
-                print(value, file=self._text)
-        print(file=self._text)
+                print(value, file=self._messages)
+        print(file=self._messages)
         # Get the scrubbed payload.  This is the original payload with all
         # non text/plain parts replaced by notes that they've been removed.
         payload = scrub(msg)
         # Add the payload.
-        print(payload, file=self._text)
+        print(payload, file=self._messages)
         if not payload.endswith('\n'):
-            print(file=self._text)
+            print(file=self._messages)
 
     def finish(self):
         """Finish up the digest, producing the email-ready copy."""
@@ -265,21 +276,24 @@ class RFC1153Digester(Digester):
             # MAS: There is no real place for the digest_footer in an RFC 1153
             # compliant digest, so add it as an additional message with
             # Subject: Digest Footer
-            print(self._separator30, file=self._text)
-            print(file=self._text)
-            print('Subject: ' + _('Digest Footer'), file=self._text)
-            print(file=self._text)
-            print(footer_text, file=self._text)
-            print(file=self._text)
-            print(self._separator30, file=self._text)
-            print(file=self._text)
+            print(self._separator30, file=self._messages)
+            print(file=self._messages)
+            print('Subject: ' + _('Digest Footer'), file=self._messages)
+            print(file=self._messages)
+            print(footer_text, file=self._messages)
+            print(file=self._messages)
+            print(self._separator30, file=self._messages)
+            print(file=self._messages)
         # Add the sign-off.
         sign_off = _('End of ') + self._digest_id
-        print(sign_off, file=self._text)
-        print('*' * len(sign_off), file=self._text)
+        print(sign_off, file=self._messages)
+        print('*' * len(sign_off), file=self._messages)
+        # Put the messages after the table of contents.
+        self._messages.seek(0)
+        with self._messages:
+            text = self._text.getvalue() + self._messages.read()
         # If the digest message can't be encoded by the list character set,
         # fall back to utf-8 with error replacement.
-        text = self._text.getvalue()
         try:
             self._message.set_payload(text.encode(self._charset),
                                       charset=self._charset)
@@ -297,57 +311,71 @@ class DigestRunner(Runner):
         """See `IRunner`."""
         volume = msgdata['volume']
         digest_number = msgdata['digest_number']
+        mime_recipients, rfc1153_recipients = self._recipients(mlist)
+        # Only make the digests that someone will receive.  The RFC 1153
+        # digester only reads the messages, so it goes first, and the MIME
+        # digester can then take the messages as they are.
+        digesters = []
+        if len(rfc1153_recipients) > 0:
+            digesters.append((RFC1153Digester, rfc1153_recipients))
+        if len(mime_recipients) > 0:
+            digesters.append((MIMEDigester, mime_recipients))
         # Backslashes make me cry.
         code = mlist.preferred_language.code
         with Mailbox(msgdata['digest_path']) as mailbox, _.using(code):
-            # Create the digesters.
-            mime_digest = MIMEDigester(mlist, volume, digest_number)
-            rfc1153_digest = RFC1153Digester(mlist, volume, digest_number)
-            # Cruise through all the messages in the mailbox, first building
-            # the table of contents and accumulating Subject: headers and
-            # authors.  The question really is whether it's better from a1
-            # performance and memory footprint to go through the mailbox once
-            # and cache the messages in a list, or to cruise through the
-            # mailbox twice.  We'll do the latter, but it's a complete guess.
+            digesters = [
+                (digester_class(mlist, volume, digest_number), recipients)
+                for digester_class, recipients in digesters
+                ]
+            # Cruise through all the messages in the mailbox once, adding
+            # them to the digests along with their Subject: headers and
+            # authors for the table of contents.  The digesters put the table
+            # of contents before the messages when they finish.
             count = None
-            for count, (key, message) in enumerate(mailbox.iteritems(), 1):
-                mime_digest.add_to_toc(message, count)
-                rfc1153_digest.add_to_toc(message, count)
-            assert count is not None, 'No digest messages?'
-            # Add the table of contents.
-            mime_digest.add_toc(count)
-            rfc1153_digest.add_toc(count)
-            # Cruise through the set of messages a second time, adding them to
-            # the actual digest.
-            for count, (key, message) in enumerate(mailbox.iteritems(), 1):
-                mime_digest.add_message(message, count)
-                rfc1153_digest.add_message(message, count)
+            if len(digesters) > 0:
+                for count, (key, message) in enumerate(
+                        mailbox.iteritems(), 1):
+                    for digester, recipients in digesters:
+                        digester.add_to_toc(message, count)
+                        digester.add_message(message, count)
+                assert count is not None, 'No digest messages?'
             # Finish up the digests.
-            mime = mime_digest.finish()
-            rfc1153 = rfc1153_digest.finish()
-        # Calculate the recipients lists
+            digests = []
+            for digester, recipients in digesters:
+                digester.add_toc(count)
+                digests.append((digester.finish(), recipients))
+        # Send the digests to the virgin queue for final delivery.
+        queue = config.switchboards['virgin']
+        for digest, recipients in digests:
+            queue.enqueue(digest,
+                          recipients=recipients,
+                          listid=mlist.list_id,
+                          isdigest=True)
+        # Remove the digest mbox. (GL #259)
+        os.remove(msgdata['digest_path'])
+
+    def _recipients(self, mlist):
+        """Calculate the recipients of the MIME and RFC 1153 digests."""
         mime_recipients = set()
         rfc1153_recipients = set()
         # When someone turns off digest delivery, they will get one last
         # digest to ensure that there will be no gaps in the messages they
         # receive.
-        digest_members = set(mlist.digest_members.members)
-        for member in digest_members:
-            if member.delivery_status is not DeliveryStatus.enabled:
-                continue
-            # Send the digest to the case-preserved address of the digest
-            # members.
-            email_address = member.address.original_email
-            if member.delivery_mode == DeliveryMode.plaintext_digests:
+        # The digest members with delivery enabled, and their delivery modes,
+        # are found in one query.  Send the digest to the case-preserved
+        # address of the digest members.
+        for email_address, delivery_mode in (
+                mlist.digest_members.get_recipient_modes()):
+            if delivery_mode == DeliveryMode.plaintext_digests:
                 rfc1153_recipients.add(email_address)
             # We currently treat summary_digests the same as mime_digests.
-            elif member.delivery_mode in (DeliveryMode.mime_digests,
-                                          DeliveryMode.summary_digests):
+            elif delivery_mode in (DeliveryMode.mime_digests,
+                                   DeliveryMode.summary_digests):
                 mime_recipients.add(email_address)
             else:
                 raise AssertionError(
                     'Digest member "{}" unexpected delivery mode: {}'.format(
-                        email_address, member.delivery_mode))
+                        email_address, delivery_mode))
         # Add also the folks who are receiving one last digest.
         for address, delivery_mode in mlist.last_digest_recipients:
             if delivery_mode == DeliveryMode.plaintext_digests:
@@ -360,17 +388,4 @@ class DigestRunner(Runner):
                 raise AssertionError(
                     'OLD recipient "{}" unexpected delivery mode: {}'.format(
                         address, delivery_mode))
-        # Send the digests to the virgin queue for final delivery.
-        queue = config.switchboards['virgin']
-        if len(mime_recipients) > 0:
-            queue.enqueue(mime,
-                          recipients=mime_recipients,
-                          listid=mlist.list_id,
-                          isdigest=True)
-        if len(rfc1153_recipients) > 0:
-            queue.enqueue(rfc1153,
-                          recipients=rfc1153_recipients,
-                          listid=mlist.list_id,
-                          isdigest=True)
-        # Remove the digest mbox. (GL #259)
-        os.remove(msgdata['digest_path'])
+        return mime_recipients, rfc1153_recipients
@@ -31,6 +31,7 @@ from mailman.interfaces.mailinglist import Personalization
 from mailman.interfaces.mta import SomeRecipientsFailed
 from mailman.interfaces.pending import IPendings
 from mailman.interfaces.subscriptions import ISubscriptionService
+from mailman.mta.connection import connection_pool
 from mailman.utilities.datetime import now
 from mailman.utilities.modules import find_name
 from public import public
@@ -184,3 +185,13 @@ Error message: {}
                     self._retryq.enqueue(msg, msgdata)
         # We've successfully completed handling of this message.
         return False
+
+    def _snooze(self, filecnt):
+        # Don't hold pooled connections to the SMTP server open while there is
+        # nothing to deliver.
+        if filecnt == 0:
+            connection_pool().close()
+        super()._snooze(filecnt)
+
+    def _clean_up(self):
+        connection_pool().close()
@@ -28,6 +28,13 @@ from public import public
 class RetryRunner(Runner):
     """Retry delivery."""
 
+    def _process_one_file(self, msg, msgdata):
+        # Nothing here depends on the mailing list, the sender or the message
+        # itself, so skip the base class's lookups, which would parse a
+        # message read from an envelope.  The outgoing runner does them all
+        # anyway.
+        self._dispose(None, msg, msgdata)
+
     def _dispose(self, mlist, msg, msgdata):
         # Move the message to the out queue for another try.
         config.switchboards['out'].enqueue(msg, msgdata)
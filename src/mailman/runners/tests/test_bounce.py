@@ -606,3 +606,19 @@ Message-Id: <first>
         # The membership should still exist.
         self.assertIsNotNone(
             self._mlist.members.get_member(self._anne.email))
+
+    def test_events_processed_every_once_in_a_while(self):
+        anne = self._subscribe_and_add_bounce_event(
+            'anne@example.com', subscribe=False, create=False)
+        self._runner.run()
+        self.assertEqual(anne.bounce_score, 1.0)
+        # Bounces registered since the last time are processed once
+        # register_bounces_every has passed.
+        bart = self._subscribe_and_add_bounce_event('bart@example.com')
+        self._runner.run()
+        self.assertEqual(bart.bounce_score, 0)
+        self.assertEqual(len(list(self._processor.unprocessed)), 1)
+        self._runner.lastrun -= self._runner.delay
+        self._runner.run()
+        self.assertEqual(bart.bounce_score, 1.0)
+        self.assertEqual(len(list(self._processor.unprocessed)), 0)
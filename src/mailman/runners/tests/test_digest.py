@@ -29,9 +29,10 @@ from io import StringIO
 from mailman.app.lifecycle import create_list
 from mailman.config import config
 from mailman.email.message import Message
-from mailman.interfaces.member import DeliveryMode
+from mailman.interfaces.member import DeliveryMode, DeliveryStatus
 from mailman.interfaces.template import ITemplateManager
-from mailman.runners.digest import DigestRunner
+from mailman.interfaces.usermanager import IUserManager
+from mailman.runners.digest import DigestRunner, SPOOL_SIZE
 from mailman.testing.helpers import (
     digest_mbox,
     get_queue_messages,
@@ -43,8 +44,10 @@ from mailman.testing.helpers import (
     subscribe,
 )
 from mailman.testing.layers import ConfigLayer
+from mailman.utilities.mailbox import Mailbox
 from string import Template
 from tempfile import TemporaryDirectory
+from unittest.mock import patch
 from zope.component import getUtility
 
 
@@ -368,6 +371,83 @@ multipart/mixed
     text/plain
 """)
 
+    def test_digest_recipients(self):
+        # Digests are sent to the case-preserved addresses of the digest
+        # members with delivery enabled, in the format they prefer.
+        address = getUtility(IUserManager).create_address('Anne@example.com')
+        anne = self._mlist.subscribe(address)
+        anne.preferences.delivery_mode = DeliveryMode.plaintext_digests
+        bart = subscribe(self._mlist, 'Bart', as_user=True)
+        bart.user.preferences.delivery_mode = DeliveryMode.summary_digests
+        cris = subscribe(self._mlist, 'Cris')
+        cris.preferences.delivery_mode = DeliveryMode.mime_digests
+        cris.preferences.delivery_status = DeliveryStatus.by_bounces
+        make_digest_messages(self._mlist)
+        items = get_queue_messages('virgin', expected_count=2)
+        recipients = {
+            item.msg.get_content_type(): item.msgdata['recipients']
+            for item in items
+            }
+        self.assertEqual(recipients, {
+            'text/plain': {'Anne@example.com'},
+            'multipart/mixed': {'bperson@example.com'},
+            })
+
+    def test_only_subscribed_formats(self):
+        # Only the digests that someone receives are made.
+        anne = subscribe(self._mlist, 'Anne')
+        anne.preferences.delivery_mode = DeliveryMode.mime_digests
+        with patch('mailman.runners.digest.RFC1153Digester') as digester:
+            make_digest_messages(self._mlist)
+        digester.assert_not_called()
+        items = get_queue_messages('virgin', expected_count=1)
+        self.assertEqual(items[0].msg.get_content_type(), 'multipart/mixed')
+
+    def test_no_digest_recipients(self):
+        with patch('mailman.runners.digest.MIMEDigester') as mime, \
+                patch('mailman.runners.digest.RFC1153Digester') as rfc1153:
+            make_digest_messages(self._mlist)
+        mime.assert_not_called()
+        rfc1153.assert_not_called()
+        get_queue_messages('virgin', expected_count=0)
+        self.assertEqual(os.listdir(self._mlist.data_path), [])
+
+    def test_mailbox_read_once(self):
+        anne = subscribe(self._mlist, 'Anne')
+        anne.preferences.delivery_mode = DeliveryMode.mime_digests
+        bart = subscribe(self._mlist, 'Bart')
+        bart.preferences.delivery_mode = DeliveryMode.plaintext_digests
+        with patch.object(Mailbox, 'iteritems', autospec=True,
+                          side_effect=Mailbox.iteritems) as iteritems:
+            make_digest_messages(self._mlist)
+        self.assertEqual(iteritems.call_count, 1)
+        self._check_virgin_queue()
+
+    def test_spooled_plain_digest(self):
+        # The messages of a big RFC 1153 digest are spooled to disk, but the
+        # digest is the same.
+        bart = subscribe(self._mlist, 'Bart')
+        bart.preferences.delivery_mode = DeliveryMode.plaintext_digests
+        digests = []
+        for spool_size in (SPOOL_SIZE, 1):
+            mbox = digest_mbox(self._mlist)
+            for i in range(1, 4):
+                mbox.add(mfs("""\
+From: aperson@example.com
+To: test@example.com
+Subject: Test message {0}
+
+Here is message {0}
+""".format(i)))
+            mbox.close()
+            with patch('mailman.runners.digest.SPOOL_SIZE', spool_size):
+                make_digest_messages(self._mlist)
+            items = get_queue_messages('virgin', expected_count=1)
+            digests.append(items[0].msg.get_payload(decode=True))
+        in_memory, spooled = digests
+        self.assertIn(b'Here is message 3', spooled)
+        self.assertEqual(spooled, in_memory)
+
 
 class TestI18nDigest(unittest.TestCase):
     layer = ConfigLayer
@@ -34,6 +34,7 @@ from mailman.interfaces.messages import IMessageStore
 from mailman.interfaces.mta import SomeRecipientsFailed
 from mailman.interfaces.pending import IPendings
 from mailman.interfaces.usermanager import IUserManager
+from mailman.mta.connection import connection_pool
 from mailman.runners.outgoing import OutgoingRunner
 from mailman.testing.helpers import (
     configuration,
@@ -84,6 +85,20 @@ Message-Id: <first>
         self.assertEqual(items[0].msgdata['deliver_after'], deliver_after)
         self.assertEqual(items[0].msg['message-id'], '<first>')
 
+    @configuration('mta', connection_pool_size=1)
+    def test_pooled_connection(self):
+        # Messages delivered by the runner share a connection, which is
+        # closed once the queue is empty.
+        for recipient in ('bart@example.com', 'cate@example.com'):
+            self._outq.enqueue(self._msg, self._msgdata,
+                               recipients=[recipient],
+                               listid='test.example.com')
+        runner = make_testable_runner(OutgoingRunner, 'out')
+        runner.run()
+        self.assertEqual(len(list(SMTPLayer.smtpd.messages)), 2)
+        self.assertEqual(SMTPLayer.smtpd.get_connection_count(), 1)
+        self.assertFalse(connection_pool().get().is_open)
+
 
 captured_mlist = None
 captured_msg = None
@@ -34,6 +34,7 @@ from email import message_from_bytes, message_from_string
 from lazr.config import as_timedelta
 from mailman.bin.master import Loop as Master
 from mailman.config import config
+from mailman.database import lookups
 from mailman.database.transaction import transaction
 from mailman.email.message import Message
 from mailman.interfaces.action import Action
@@ -466,7 +467,7 @@ def subscribe(mlist, first_name, role=MemberRole.member, email=None,
 def reset_the_world():
     """Reset everything:
 
-    * Clear out the database
+    * Clear out the database and the cached lookups
     * Remove all residual queue and digest files
     * Clear the message store
     * Reset the global style manager
@@ -474,8 +475,11 @@ def reset_the_world():
     This should be as thorough a reset of the system as necessary to keep
     tests isolated.
     """
-    # Reset the database between tests.
+    # Reset the database between tests, and forget any cached lookups into
+    # it, or objects kept loaded from it.
+    config.db.keep_loaded(0)
     config.db._reset()
+    lookups.clear()
     # Remove any digest files and members.txt file (for the file-recips
     # handler) in the lists' data directories.
     for dirpath, dirnames, filenames in os.walk(config.LIST_DATA_DIR):
@@ -503,11 +507,20 @@ def reset_the_world():
     getUtility(IStyleManager).populate()
     # Remove all dynamic header-match rules.
     config.chains['header-match'].flush()
-    # Remove cached organizational domain suffix file.
+    # Remove cached organizational domain suffix file, and forget the cached
+    # DNS answers.  Their files are in the cache directory.
     from mailman.rules.dmarc import LOCAL_FILE_NAME
+    from mailman.utilities.resolver import cache as dns_cache
+    dns_cache.clear()
     suffix_file = os.path.join(config.VAR_DIR, LOCAL_FILE_NAME)
     with suppress(FileNotFoundError):
         os.remove(suffix_file)
+    # Forget the cached ARC signatures.
+    from mailman.handlers.arc_sign import signatures
+    signatures.clear()
+    # Forget the cached templates.
+    from mailman.model import template
+    template.clear()
 
 
 @public
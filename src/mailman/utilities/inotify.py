@@ -0,0 +1,109 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Waiting for changes to a directory with Linux's inotify."""
+
+import os
+import ctypes
+import select
+import ctypes.util
+
+from public import public
+
+
+# From <sys/inotify.h>.
+IN_MODIFY = 0x00000002
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library('c') or None, use_errno=True)
+            libc.inotify_init1
+            libc.inotify_add_watch
+        except (OSError, AttributeError):
+            libc = False
+        _libc = libc
+    return _libc
+
+
+@public
+def inotify_available():
+    """Return whether inotify is supported on this platform."""
+    return bool(_get_libc())
+
+
+@public
+class DirectoryWatcher:
+    """Wait for files to be added to, or written to, a directory.
+
+    Events are buffered by the kernel from the moment the watcher is created,
+    so no change is lost between two calls to `wait()`.
+    """
+
+    def __init__(self, directory, mask=IN_MOVED_TO | IN_MODIFY):
+        libc = _get_libc()
+        if not libc:
+            raise OSError('inotify is not available')
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        wd = libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, os.strerror(errno), directory)
+
+    def fileno(self):
+        return self._fd
+
+    def wait(self, timeout):
+        """Wait for a change to the directory.
+
+        :param timeout: The maximum number of seconds to wait.
+        :type timeout: float
+        :return: True if the directory changed since the last call, and False
+            if the timeout expired first.
+        :rtype: bool
+        """
+        readable, writable, errors = select.select([self._fd], [], [], timeout)
+        if len(readable) == 0:
+            return False
+        # Drain all the pending events.  We don't care what they are, only
+        # that something happened.
+        while True:
+            try:
+                if len(os.read(self._fd, 65536)) == 0:
+                    break
+            except BlockingIOError:
+                break
+        return True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,119 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""A bounded cache whose entries expire."""
+
+import time
+
+from collections import OrderedDict
+from public import public
+from threading import Lock
+
+
+@public
+class LRUCache:
+    """A thread-safe mapping of a bounded size whose entries expire.
+
+    When the cache is full, the least recently used entry is evicted to make
+    room for a new one.  Entries are also dropped once they are older than
+    the cache's time to live.
+    """
+
+    def __init__(self, maxsize=1000, ttl=None, clock=time.monotonic):
+        """Create a cache.
+
+        :param maxsize: The maximum number of entries.  A cache with a size
+            of 0 holds nothing.
+        :type maxsize: int
+        :param ttl: The number of seconds that entries live for, or None for
+            entries that don't expire.
+        :type ttl: float
+        :param clock: A function returning the current time in seconds.
+        """
+        self._clock = clock
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self.resize(maxsize, ttl)
+
+    def resize(self, maxsize, ttl=None):
+        """Change the size of the cache and the lifetime of new entries.
+
+        :param maxsize: The new maximum number of entries.
+        :type maxsize: int
+        :param ttl: The new lifetime of entries in seconds, or None.
+        :type ttl: float
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            while len(self._entries) > max(maxsize, 0):
+                self._entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        """Return the value for a key, if it is cached and hasn't expired.
+
+        :param key: The key to look up.
+        :param default: The value to return for a missing key.
+        :return: The cached value, or `default`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires <= self._clock():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            expires = None if self.ttl is None else self._clock() + self.ttl
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        missing = object()
+        return self.get(key, missing) is not missing
+
+    def __len__(self):
+        return len(self._entries)
+
+    def discard(self, key):
+        """Remove a key from the cache, if it's there."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_if(self, predicate):
+        """Remove all the keys that match a predicate.
+
+        :param predicate: A function called with each key, which returns True
+            if the key should be removed.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove everything from the cache."""
+        with self._lock:
+            self._entries.clear()
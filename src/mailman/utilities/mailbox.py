@@ -41,3 +41,23 @@ class Mailbox(MMDF):
         self.unlock()
         # Don't suppress the exception.
         return False
+
+    def append(self, message):
+        """Append a message to the end of the mailbox.
+
+        Unlike `add()`, this doesn't read the whole mailbox first to find
+        the messages already in it, so appending a message to a digest costs
+        the same however big the digest has grown.
+
+        :param message: The message to append.
+        """
+        if self._toc is not None:
+            self.add(message)
+            return
+        # Pretend the mailbox is empty while the message is added, and find
+        # all the messages in it again if they're needed later.
+        self._toc = {}
+        try:
+            self.add(message)
+        finally:
+            self._toc = None
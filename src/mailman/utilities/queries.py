@@ -19,7 +19,7 @@
 
 from collections.abc import Sequence
 from public import public
-from sqlalchemy import func, select
+from sqlalchemy import and_, func, or_, select
 
 
 @public
@@ -74,3 +74,73 @@ class QuerySequence(Sequence):
         if self._query is None:
             return []
         yield from self.session.execute(self._query).scalars()
+
+    def stream(self, batch_size=1000):
+        """Iterate over the results without reading them all at once.
+
+        The results are fetched in batches, from a server-side cursor where
+        the database supports one.
+
+        :param batch_size: The number of results to fetch at a time.
+        :type batch_size: int
+        """
+        if self._query is None:
+            return
+        query = self._query.execution_options(yield_per=batch_size)
+        yield from self.session.execute(query).scalars()
+
+
+@public
+class KeyedQuerySequence(QuerySequence):
+    """A query sequence which can also be paged through by key.
+
+    Paging by offset has to skip all the rows before the page, so it gets
+    slower the further into the results it goes.  Paging by key instead
+    starts each page after the key of the last item on the previous one,
+    which the database can find in an index.
+
+    :param session: SQLAlchemy session object that will be used to query
+        the provided query with sequence like behavior.
+    :param query: The raw Select query from SQLAlchemy, without any ordering.
+    :param keys: The columns or SQL expressions that the results are sorted
+        by.  Together they must uniquely identify a result, and none of them
+        may be NULL.
+    """
+    def __init__(self, session, query, keys):
+        super().__init__(session, query.order_by(*keys))
+        self._keys = keys
+
+    def page(self, after=None, count=None):
+        """Return a page of the results.
+
+        :param after: The key of the result that the page starts after, as
+            returned by a previous call, or None to start at the beginning.
+        :type after: tuple
+        :param count: The maximum number of results on the page, or None
+            for all the rest of the results.
+        :type count: int
+        :return: The results on the page, and the key of the last of them,
+            or None if there are no more results after it.
+        :rtype: 2-tuple of (list, tuple)
+        """
+        query = self._query.add_columns(*self._keys)
+        if after is not None:
+            if len(after) != len(self._keys):
+                raise ValueError('Bad key: {}'.format(after))
+            # (key1, key2, ...) > (after1, after2, ...), spelled out for
+            # databases that can't compare row values.
+            query = query.where(or_(*(
+                and_(*(key == value for key, value in zip(
+                    self._keys[:i], after[:i])),
+                     self._keys[i] > after[i])
+                for i in range(len(self._keys)))))
+        if count is not None:
+            # Read one more result, to know whether there are any more.
+            query = query.limit(count + 1)
+        rows = self.session.execute(query).all()
+        if count is not None and len(rows) > count:
+            rows = rows[:count]
+            last = tuple(rows[-1])[1:]
+        else:
+            last = None
+        return [row[0] for row in rows], last
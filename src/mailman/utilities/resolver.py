@@ -0,0 +1,233 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""A caching DNS resolver."""
+
+import os
+import json
+import time
+import base64
+import shutil
+import hashlib
+import logging
+import dns.name
+import dns.message
+import dns.resolver
+import dns.rdatatype
+import dns.rdataclass
+
+from collections import namedtuple
+from dns.exception import DNSException
+from lazr.config import as_boolean, as_timedelta
+from mailman.config import config
+from mailman.interfaces.configuration import ConfigurationUpdatedEvent
+from mailman.interfaces.resolver import IResolver
+from mailman.utilities.lrucache import LRUCache
+from public import public
+from zope.interface import implementer
+
+
+elog = logging.getLogger('mailman.error')
+
+CACHE_DIR_NAME = 'dns'
+NEGATIVE_ERRORS = dict(
+    NXDOMAIN=dns.resolver.NXDOMAIN,
+    NoAnswer=dns.resolver.NoAnswer,
+    )
+
+# (name, rdtype) -> _Entry
+cache = LRUCache()
+
+
+class _Entry(namedtuple('_Entry', 'expires answer error kwargs')):
+    # A cached answer, or the class and arguments of a negative answer.
+
+    def result(self):
+        if self.error is None:
+            return self.answer
+        # Raise a new exception, rather than growing the traceback of the
+        # cached one every time it's raised.
+        error = self.error(**self.kwargs)
+        error.expiration = self.expires
+        raise error
+
+
+@public
+def handle_ConfigurationUpdatedEvent(event):
+    if isinstance(event, ConfigurationUpdatedEvent):
+        cache.resize(int(event.config.dns.cache_size))
+
+
+@public
+def negative_ttl(error, default):
+    """Return how long a negative answer can be cached for.
+
+    Per RFC 2308, the SOA record of a negative answer says how long it can be
+    cached for.  Negative answers from the cache know how long they have
+    left.
+
+    :param error: The negative answer.
+    :type error: `dns.resolver.NXDOMAIN` or `dns.resolver.NoAnswer`
+    :param default: The number of seconds to return if the answer doesn't
+        say.
+    :type default: float
+    :return: The number of seconds.
+    :rtype: float
+    """
+    expiration = getattr(error, 'expiration', None)
+    if expiration is not None:
+        return expiration - time.time()
+    responses = list(error.kwargs.get('responses', {}).values())
+    if error.kwargs.get('response') is not None:
+        responses.append(error.kwargs['response'])
+    for response in responses:
+        for rrset in response.authority:
+            if rrset.rdtype == dns.rdatatype.SOA:
+                return min(rrset.ttl, next(iter(rrset.items)).minimum)
+    return default
+
+
+def _cache_path(key):
+    # Names come from messages, so they can't be trusted to be safe file
+    # names.
+    file_id = hashlib.sha256('{}/{}'.format(*key).encode('utf-8')).hexdigest()
+    return os.path.join(
+        config.CACHE_DIR, CACHE_DIR_NAME, file_id[0:2], file_id)
+
+
+def _to_wire(response):
+    return base64.b64encode(response.to_wire()).decode('ascii')
+
+
+def _from_wire(text):
+    return dns.message.from_wire(base64.b64decode(text))
+
+
+def _read_entry(key):
+    try:
+        with open(_cache_path(key), encoding='utf-8') as fp:
+            cached = json.load(fp)
+        name, rdtype = key
+        expires = cached['expires']
+        if cached['error'] is None:
+            answer = dns.resolver.Answer(
+                dns.name.from_text(name), dns.rdatatype.from_text(rdtype),
+                dns.rdataclass.IN, _from_wire(cached['response']))
+            answer.expiration = expires
+            return _Entry(expires, answer, None, None)
+        kwargs = {}
+        if 'response' in cached:
+            kwargs['response'] = _from_wire(cached['response'])
+        if 'responses' in cached:
+            responses = {dns.name.from_text(qname): _from_wire(response)
+                         for qname, response in cached['responses']}
+            kwargs['qnames'] = list(responses)
+            kwargs['responses'] = responses
+        return _Entry(expires, None, NEGATIVE_ERRORS[cached['error']], kwargs)
+    except (OSError, ValueError, KeyError, DNSException):
+        return None
+
+
+def _write_entry(key, entry):
+    cached = dict(expires=entry.expires, error=None)
+    if entry.error is None:
+        cached['response'] = _to_wire(entry.answer.response)
+    else:
+        cached['error'] = entry.error.__name__
+        if entry.kwargs.get('response') is not None:
+            cached['response'] = _to_wire(entry.kwargs['response'])
+        if 'responses' in entry.kwargs:
+            cached['responses'] = [
+                (qname.to_text(), _to_wire(response))
+                for qname, response in entry.kwargs['responses'].items()]
+    # Write the cache atomically, since other processes may be reading it.
+    path = _cache_path(key)
+    new_path = '{}.{}.new'.format(path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(new_path, 'w', encoding='utf-8') as fp:
+            json.dump(cached, fp)
+        os.rename(new_path, path)
+    except OSError as error:
+        elog.error('Unable to cache the DNS answer for %s: %s', key, error)
+
+
+@public
+@implementer(IResolver)
+class Resolver:
+    """See `IResolver`."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def _query(self, name, rdtype, timeout, lifetime):
+        resolver = dns.resolver.Resolver()
+        nameservers = config.dns.nameservers.split()
+        if len(nameservers) > 0:
+            resolver.nameservers = nameservers
+            resolver.port = int(config.dns.port)
+        resolver.timeout = (
+            as_timedelta(config.dns.resolver_timeout).total_seconds()
+            if timeout is None else timeout)
+        resolver.lifetime = (
+            as_timedelta(config.dns.resolver_lifetime).total_seconds()
+            if lifetime is None else lifetime)
+        return resolver.resolve(name, dns.rdatatype.from_text(rdtype))
+
+    def _store(self, key, entry):
+        if entry.expires <= time.time():
+            return
+        cache[key] = entry
+        if as_boolean(config.dns.cache_files):
+            _write_entry(key, entry)
+
+    def resolve(self, name, rdtype='TXT', *, timeout=None, lifetime=None):
+        """See `IResolver`."""
+        key = (name.lower().rstrip('.'), rdtype.upper())
+        timestamp = time.time()
+        entry = cache.get(key)
+        if entry is None and as_boolean(config.dns.cache_files):
+            entry = _read_entry(key)
+            if entry is not None:
+                cache[key] = entry
+        if entry is not None and entry.expires > timestamp:
+            self.hits += 1
+            return entry.result()
+        self.misses += 1
+        max_life = as_timedelta(config.dns.cache_max_life).total_seconds()
+        try:
+            answer = self._query(name, rdtype, timeout, lifetime)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as error:
+            ttl = negative_ttl(error, as_timedelta(
+                config.dns.cache_negative_life).total_seconds())
+            self._store(key, _Entry(
+                timestamp + min(ttl, max_life), None, type(error),
+                error.kwargs))
+            raise
+        # The answer's expiration takes the TTLs of any CNAMEs into account.
+        expiration = getattr(answer, 'expiration', None)
+        ttl = max_life if expiration is None else expiration - timestamp
+        self._store(key, _Entry(
+            timestamp + min(ttl, max_life), answer, None, None))
+        return answer
+
+    def clear(self):
+        """See `IResolver`."""
+        cache.clear()
+        shutil.rmtree(
+            os.path.join(config.CACHE_DIR, CACHE_DIR_NAME), ignore_errors=True)
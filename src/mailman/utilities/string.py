@@ -22,6 +22,8 @@ import logging
 from email.errors import HeaderParseError
 from email.header import decode_header, make_header
 from mailman.config import config
+from mailman.utilities.lrucache import LRUCache
+from operator import attrgetter
 from public import public
 from string import Template, whitespace
 from textwrap import dedent, TextWrapper
@@ -32,6 +34,100 @@ NL = '\n'
 
 log = logging.getLogger('mailman.error')
 
+# The standard list-specific substitutions, and how to get them from the
+# mailing list.
+LIST_SUBSTITUTIONS = dict(
+    listname=attrgetter('fqdn_listname'),
+    list_id=attrgetter('list_id'),
+    display_name=attrgetter('display_name'),
+    short_listname=attrgetter('list_name'),
+    domain=attrgetter('mail_host'),
+    description=attrgetter('description'),
+    info=attrgetter('info'),
+    request_email=attrgetter('request_address'),
+    owner_email=attrgetter('owner_address'),
+    language=attrgetter('preferred_language.code'),
+    )
+
+# (template class, template) -> CompiledTemplate
+compiled_templates = LRUCache()
+
+
+@public
+class CompiledTemplate:
+    """A PEP 292 $-string template, split into literals and placeholders.
+
+    Rendering a compiled template gives the same string as the template
+    class's `safe_substitute()`, without parsing the template every time.
+    """
+
+    def __init__(self, template, template_class=Template):
+        """Compile a template.
+
+        :param template: A PEP 292 $-string template.
+        :type template: string
+        :param template_class: The template class whose delimiter and
+            pattern to use.
+        :type template_class: class
+        """
+        # The chunks alternate between literal text and (name, original)
+        # placeholders, starting and ending with literal text.
+        self._chunks = []
+        literal = []
+        start = 0
+        for match in template_class.pattern.finditer(template):
+            literal.append(template[start:match.start()])
+            start = match.end()
+            name = match.group('named') or match.group('braced')
+            if name is not None:
+                self._chunks.append(EMPTYSTRING.join(literal))
+                self._chunks.append((name, match.group()))
+                literal = []
+            elif match.group('escaped') is not None:
+                literal.append(template_class.delimiter)
+            else:
+                # Invalid placeholders are left as they are.
+                literal.append(match.group())
+        literal.append(template[start:])
+        self._chunks.append(EMPTYSTRING.join(literal))
+        self.names = frozenset(name for name, original in self._chunks[1::2])
+
+    def render(self, substitutions):
+        """Substitute the placeholders.
+
+        :param substitutions: The values of the placeholders.  Placeholders
+            that are missing from the mapping are left as they are.
+        :type substitutions: dict
+        :return: The substituted string.
+        :rtype: string
+        """
+        parts = [self._chunks[0]]
+        for i in range(1, len(self._chunks), 2):
+            name, original = self._chunks[i]
+            value = substitutions.get(name, original)
+            parts.append(value if isinstance(value, str) else str(value))
+            parts.append(self._chunks[i + 1])
+        return EMPTYSTRING.join(parts)
+
+
+@public
+def compile_template(template, template_class=Template):
+    """Compile a template, or return the one already compiled for it.
+
+    :param template: A PEP 292 $-string template.
+    :type template: string
+    :param template_class: The template class to use.
+    :type template_class: class
+    :return: The compiled template.
+    :rtype: `CompiledTemplate`
+    """
+    key = (template_class, template)
+    compiled = compiled_templates.get(key)
+    if compiled is None:
+        compiled = CompiledTemplate(template, template_class)
+        compiled_templates[key] = compiled
+    return compiled
+
 
 @public
 def expand(template, mlist=None, extras=None, template_class=Template):
@@ -50,25 +146,17 @@ def expand(template, mlist=None, extras=None, template_class=Template):
     :return: The substituted string.
     :rtype: string
     """
-    substitutions = dict(
-        site_email=config.mailman.site_owner,
-        )
-    if mlist is not None:
-        substitutions.update(dict(
-            listname=mlist.fqdn_listname,
-            list_id=mlist.list_id,
-            display_name=mlist.display_name,
-            short_listname=mlist.list_name,
-            domain=mlist.mail_host,
-            description=mlist.description,
-            info=mlist.info,
-            request_email=mlist.request_address,
-            owner_email=mlist.owner_address,
-            language=mlist.preferred_language.code,
-            ))
-    if extras is not None:
-        substitutions.update(extras)
-    return template_class(template).safe_substitute(substitutions)
+    compiled = compile_template(template, template_class)
+    # Only look up the substitutions that the template uses.
+    substitutions = {}
+    for name in compiled.names:
+        if extras is not None and name in extras:
+            substitutions[name] = extras[name]
+        elif mlist is not None and name in LIST_SUBSTITUTIONS:
+            substitutions[name] = LIST_SUBSTITUTIONS[name](mlist)
+        elif name == 'site_email':
+            substitutions[name] = config.mailman.site_owner
+    return compiled.render(substitutions)
 
 
 @public
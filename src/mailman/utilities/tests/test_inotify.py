@@ -0,0 +1,60 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Test the directory watcher."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mailman.utilities.inotify import DirectoryWatcher, inotify_available
+
+
+@unittest.skipUnless(inotify_available(), 'inotify is not available')
+class TestDirectoryWatcher(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._directory)
+        self._watcher = DirectoryWatcher(self._directory)
+        self.addCleanup(self._watcher.close)
+
+    def test_timeout(self):
+        self.assertFalse(self._watcher.wait(0.01))
+
+    def test_rename_into_directory(self):
+        tmpfile = os.path.join(self._directory, 'entry.tmp')
+        with open(tmpfile, 'w'):
+            pass
+        os.rename(tmpfile, os.path.join(self._directory, 'entry.pck'))
+        self.assertTrue(self._watcher.wait(0))
+        # All the pending events were consumed.
+        self.assertFalse(self._watcher.wait(0))
+
+    def test_append_to_file(self):
+        path = os.path.join(self._directory, 'segment')
+        with open(path, 'w'):
+            pass
+        self._watcher.wait(0)
+        with open(path, 'a') as fp:
+            fp.write('more')
+        self.assertTrue(self._watcher.wait(0))
+
+    def test_missing_directory(self):
+        self.assertRaises(
+            OSError, DirectoryWatcher,
+            os.path.join(self._directory, 'missing'))
@@ -0,0 +1,107 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Test the LRU cache."""
+
+import unittest
+
+from mailman.utilities.lrucache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self._clock = FakeClock()
+        self._cache = LRUCache(3, 10, clock=self._clock)
+
+    def test_get(self):
+        self._cache['a'] = 1
+        self.assertEqual(self._cache.get('a'), 1)
+        self.assertIsNone(self._cache.get('b'))
+        self.assertEqual(self._cache.get('b', 2), 2)
+        self.assertIn('a', self._cache)
+        self.assertNotIn('b', self._cache)
+
+    def test_cached_none(self):
+        self._cache['a'] = None
+        self.assertIn('a', self._cache)
+        self.assertIsNone(self._cache.get('a', 1))
+
+    def test_evict_least_recently_used(self):
+        self._cache['a'] = 1
+        self._cache['b'] = 2
+        self._cache['c'] = 3
+        # Using a makes b the least recently used.
+        self._cache.get('a')
+        self._cache['d'] = 4
+        self.assertEqual(len(self._cache), 3)
+        self.assertNotIn('b', self._cache)
+        for key in 'acd':
+            self.assertIn(key, self._cache)
+
+    def test_expire(self):
+        self._cache['a'] = 1
+        self._clock.now = 5
+        self._cache['b'] = 2
+        self._clock.now = 10
+        self.assertNotIn('a', self._cache)
+        self.assertEqual(self._cache.get('b'), 2)
+        self._clock.now = 15
+        self.assertNotIn('b', self._cache)
+        self.assertEqual(len(self._cache), 0)
+
+    def test_no_expiry(self):
+        cache = LRUCache(3, clock=self._clock)
+        cache['a'] = 1
+        self._clock.now = 1e9
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_discard(self):
+        self._cache['a'] = 1
+        self._cache.discard('a')
+        self._cache.discard('b')
+        self.assertEqual(len(self._cache), 0)
+
+    def test_discard_if(self):
+        self._cache[('ant', 1)] = 1
+        self._cache[('bee', 1)] = 2
+        self._cache[('ant', 2)] = 3
+        self._cache.discard_if(lambda key: key[0] == 'ant')
+        self.assertEqual(len(self._cache), 1)
+        self.assertIn(('bee', 1), self._cache)
+
+    def test_clear(self):
+        self._cache['a'] = 1
+        self._cache.clear()
+        self.assertEqual(len(self._cache), 0)
+
+    def test_resize(self):
+        for i in range(3):
+            self._cache[i] = i
+        self._cache.resize(2, 10)
+        self.assertEqual(len(self._cache), 2)
+        self.assertNotIn(0, self._cache)
+        self._cache.resize(0)
+        self._cache['a'] = 1
+        self.assertEqual(len(self._cache), 0)
@@ -56,3 +56,16 @@ class TestQueries(unittest.TestCase):
         self.assertTrue(query.slice.called)
         query.slice.assert_called_with(5, 10)
         self.assertTrue(session.scalars.called)
+
+    def test_stream_with_none(self):
+        query = QuerySequence(None, None)
+        self.assertEqual(list(query.stream()), [])
+
+    def test_stream(self):
+        query = unittest.mock.Mock()
+        session = unittest.mock.Mock()
+        session.execute.return_value.scalars.return_value = iter([1, 2])
+        seq = QuerySequence(session, query)
+        self.assertEqual(list(seq.stream(10)), [1, 2])
+        query.execution_options.assert_called_with(yield_per=10)
+        session.execute.assert_called_with(query.execution_options())
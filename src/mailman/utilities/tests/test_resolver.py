@@ -0,0 +1,217 @@
+# Copyright (C) 2022 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Test the caching DNS resolver."""
+
+import os
+import time
+import socket
+import unittest
+import dns.rcode
+import dns.rrset
+import dns.message
+import dns.resolver
+import dns.rdatatype
+
+from mailman.config import config
+from mailman.interfaces.resolver import IResolver
+from mailman.testing.helpers import configuration
+from mailman.testing.layers import ConfigLayer
+from mailman.utilities import resolver
+from threading import Event, Thread
+from zope.component import getUtility
+
+
+SOA = 'ns.example.com. admin.example.com. 1 7200 3600 86400 300'
+
+
+class NameServer:
+    """A name server for testing, which answers from a dictionary.
+
+    The dictionary maps a name and record type to a list of TXT strings and
+    their TTL, or to a response code.
+    """
+
+    def __init__(self):
+        self.zone = {}
+        self.queries = []
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.settimeout(0.1)
+        self.port = self._socket.getsockname()[1]
+        self._stopped = Event()
+        self._thread = Thread(target=self._serve)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self._socket.close()
+
+    def _serve(self):
+        while not self._stopped.is_set():
+            try:
+                wire, address = self._socket.recvfrom(65535)
+            except socket.timeout:
+                continue
+            query = dns.message.from_wire(wire)
+            question = query.question[0]
+            name = question.name.to_text(omit_final_dot=True)
+            rdtype = dns.rdatatype.to_text(question.rdtype)
+            self.queries.append((name, rdtype))
+            response = dns.message.make_response(query)
+            answer = self.zone.get((name, rdtype))
+            if isinstance(answer, tuple):
+                records, ttl = answer
+                response.answer.append(dns.rrset.from_text(
+                    question.name, ttl, 'IN', rdtype,
+                    *('"{}"'.format(record) for record in records)))
+            elif answer in (dns.rcode.NXDOMAIN, dns.rcode.NOERROR):
+                # A negative answer, which can be cached for the lesser of
+                # the SOA's TTL and minimum TTL.
+                response.set_rcode(answer)
+                response.authority.append(dns.rrset.from_text(
+                    'example.com.', 600, 'IN', 'SOA', SOA))
+            else:
+                response.set_rcode(answer)
+            self._socket.sendto(response.to_wire(), address)
+
+
+class TestResolver(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._server = NameServer()
+        self._server.start()
+        self.addCleanup(self._server.stop)
+        config.push('test resolver', """\
+        [dns]
+        nameservers: 127.0.0.1
+        port: {}
+        resolver_timeout: 1s
+        resolver_lifetime: 1s
+        """.format(self._server.port))
+        self.addCleanup(config.pop, 'test resolver')
+        self._resolver = getUtility(IResolver)
+        self._hits = self._resolver.hits
+        self._misses = self._resolver.misses
+        self._server.zone.update({
+            ('example.com', 'TXT'): (['v=spf1 -all'], 600),
+            ('_dmarc.example.com', 'TXT'): (
+                ['something else', 'v=DMARC1; p=reject;'], 600),
+            ('missing.example.com', 'TXT'): dns.rcode.NXDOMAIN,
+            ('empty.example.com', 'TXT'): dns.rcode.NOERROR,
+            ('broken.example.com', 'TXT'): dns.rcode.SERVFAIL,
+            })
+
+    def _counts(self):
+        return (self._resolver.hits - self._hits,
+                self._resolver.misses - self._misses)
+
+    def test_cached(self):
+        answer = self._resolver.resolve('example.com')
+        self.assertEqual(answer.rrset[0].strings, (b'v=spf1 -all',))
+        answer = self._resolver.resolve('Example.COM.')
+        self.assertEqual(answer.rrset[0].strings, (b'v=spf1 -all',))
+        self.assertEqual(self._server.queries, [('example.com', 'TXT')])
+        self.assertEqual(self._counts(), (1, 1))
+        entry = resolver.cache.get(('example.com', 'TXT'))
+        self.assertAlmostEqual(entry.expires, time.time() + 600, delta=10)
+
+    def test_zero_ttl_not_cached(self):
+        self._server.zone[('example.com', 'TXT')] = (['v=spf1 -all'], 0)
+        self._resolver.resolve('example.com')
+        self._resolver.resolve('example.com')
+        self.assertEqual(len(self._server.queries), 2)
+        self.assertEqual(self._counts(), (0, 2))
+
+    def test_max_life(self):
+        self._server.zone[('example.com', 'TXT')] = (['v=spf1 -all'], 86400)
+        with configuration('dns', cache_max_life='1h'):
+            self._resolver.resolve('example.com')
+        entry = resolver.cache.get(('example.com', 'TXT'))
+        self.assertAlmostEqual(entry.expires, time.time() + 3600, delta=10)
+
+    def test_nxdomain_cached(self):
+        for i in range(2):
+            with self.assertRaises(dns.resolver.NXDOMAIN):
+                self._resolver.resolve('missing.example.com')
+        self.assertEqual(len(self._server.queries), 1)
+        self.assertEqual(self._counts(), (1, 1))
+        entry = resolver.cache.get(('missing.example.com', 'TXT'))
+        self.assertAlmostEqual(entry.expires, time.time() + 300, delta=10)
+
+    def test_no_answer_cached(self):
+        for i in range(2):
+            with self.assertRaises(dns.resolver.NoAnswer):
+                self._resolver.resolve('empty.example.com')
+        self.assertEqual(len(self._server.queries), 1)
+        self.assertEqual(self._counts(), (1, 1))
+
+    def test_negative_ttl_of_cached_answer(self):
+        with self.assertRaises(dns.resolver.NXDOMAIN):
+            self._resolver.resolve('missing.example.com')
+        with self.assertRaises(dns.resolver.NXDOMAIN) as cm:
+            self._resolver.resolve('missing.example.com')
+        self.assertAlmostEqual(
+            resolver.negative_ttl(cm.exception, 3600), 300, delta=10)
+
+    def test_errors_not_cached(self):
+        for i in range(2):
+            with self.assertRaises(dns.resolver.NoNameservers):
+                self._resolver.resolve('broken.example.com')
+        self.assertEqual(self._server.queries, [
+            ('broken.example.com', 'TXT'),
+            ('broken.example.com', 'TXT'),
+            ])
+        self.assertNotIn(('broken.example.com', 'TXT'), resolver.cache)
+
+    def test_no_cache(self):
+        with configuration('dns', cache_max_life='0s'):
+            self._resolver.resolve('example.com')
+            self._resolver.resolve('example.com')
+        self.assertEqual(len(self._server.queries), 2)
+        self.assertEqual(len(resolver.cache), 0)
+
+    def test_cache_files(self):
+        # With files, the answers are shared by all the runners, and kept
+        # across restarts.
+        with configuration('dns', cache_files='yes'):
+            self._resolver.resolve('example.com')
+            with self.assertRaises(dns.resolver.NXDOMAIN):
+                self._resolver.resolve('missing.example.com')
+            resolver.cache.clear()
+            answer = self._resolver.resolve('example.com')
+            self.assertEqual(answer.rrset[0].strings, (b'v=spf1 -all',))
+            with self.assertRaises(dns.resolver.NXDOMAIN):
+                self._resolver.resolve('missing.example.com')
+        self.assertEqual(len(self._server.queries), 2)
+        self.assertEqual(self._counts(), (2, 2))
+
+    def test_no_cache_files(self):
+        self._resolver.resolve('example.com')
+        self.assertFalse(os.path.exists(
+            os.path.join(config.CACHE_DIR, resolver.CACHE_DIR_NAME)))
+
+    def test_clear(self):
+        with configuration('dns', cache_files='yes'):
+            self._resolver.resolve('example.com')
+            self._resolver.clear()
+            self._resolver.resolve('example.com')
+        self.assertEqual(len(self._server.queries), 2)
@@ -19,7 +19,10 @@
 
 import unittest
 
+from mailman.app.lifecycle import create_list
+from mailman.testing.layers import ConfigLayer
 from mailman.utilities import string
+from unittest.mock import patch
 
 
 class TestString(unittest.TestCase):
@@ -28,3 +31,62 @@ class TestString(unittest.TestCase):
 
     def test_wrap_blank_paragraph(self):
         self.assertEqual(string.wrap('\n\n'), '\n\n')
+
+
+class PercentTemplate(string.Template):
+    delimiter = '%'
+
+
+class TestCompiledTemplate(unittest.TestCase):
+    def test_like_safe_substitute(self):
+        substitutions = dict(a='A', b=2, d='$c')
+        for template in ('', 'plain', '$a', '${a}b', '$a$b $c ${c}',
+                         '$$a $', 'cost: $5', '$d', '${a', 'x$a$$$b$'):
+            self.assertEqual(
+                string.CompiledTemplate(template).render(substitutions),
+                string.Template(template).safe_substitute(substitutions),
+                template)
+
+    def test_template_class(self):
+        compiled = string.CompiledTemplate('%a %%a $a', PercentTemplate)
+        self.assertEqual(compiled.names, {'a'})
+        self.assertEqual(compiled.render(dict(a='A')), 'A %a $a')
+
+    def test_names(self):
+        compiled = string.CompiledTemplate('$a ${b} $$c $a')
+        self.assertEqual(compiled.names, {'a', 'b'})
+
+    def test_compiled_once(self):
+        compiled = string.compile_template('$a and $b')
+        self.assertIs(string.compile_template('$a and $b'), compiled)
+        self.assertIsNot(
+            string.compile_template('$a and $b', PercentTemplate), compiled)
+
+
+class TestExpand(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('ant@example.com')
+
+    def test_list_substitutions(self):
+        self.assertEqual(
+            string.expand('$display_name $listname $language $site_email',
+                          self._mlist),
+            'Ant ant@example.com en noreply@example.com')
+
+    def test_extras_take_precedence(self):
+        self.assertEqual(
+            string.expand('$display_name $site_email $other', self._mlist,
+                          dict(display_name='Bee', site_email='x', other=1)),
+            'Bee x 1')
+
+    def test_unknown_left_alone(self):
+        self.assertEqual(string.expand('$listname $bogus'), '$listname $bogus')
+
+    def test_only_used_substitutions(self):
+        # Only the list attributes that the template uses are looked up.
+        with patch.dict(string.LIST_SUBSTITUTIONS,
+                        {'info': self.fail, 'language': self.fail}):
+            self.assertEqual(
+                string.expand('$short_listname', self._mlist), 'ant')